@@ -1,6 +1,16 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
 
 
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        # Perfil local (SQLite): colación usada por los modelos de SQL Server
+        from .esquema_local import registrar_colacion_sqlite
+        connection_created.connect(registrar_colacion_sqlite, dispatch_uid='api_colacion_sqlite')
+
+        # Marcas de cambio por tabla para el GET condicional de los catálogos
+        from .cambios import conectar_senales
+        conectar_senales()
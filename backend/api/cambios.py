@@ -0,0 +1,128 @@
+# backend/api/cambios.py
+import hashlib
+import time
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+
+from .models import (
+    PerfilesEmpleados, TblClientes, TblConfiguracion, TblDetallesFactura, TblProvedores,
+    TblServicios, TblStockInsumos, TblStockJoyas, TblStockMateriales,
+)
+
+# Marca de cambio por tabla en Tbl_Configuracion: 'cambios.<db_table>' = nanosegundos del último cambio.
+# Se guarda en la base (no en la caché local) para que todos los procesos vean la misma marca.
+_PREFIJO = 'cambios.'
+
+MODELOS_CATALOGO = (
+    TblStockJoyas, TblStockMateriales, TblStockInsumos, TblProvedores,
+    TblServicios, PerfilesEmpleados, TblClientes,
+)
+
+# Los detalles de factura mueven existencias (descontar_existencias / triggers de SQL Server)
+MODELOS_STOCK = (TblStockJoyas, TblStockMateriales, TblStockInsumos)
+
+
+def _clave(modelo):
+    return f'{_PREFIJO}{modelo._meta.db_table}'
+
+
+def registrar_cambio(*modelos):
+    """
+    Sube la marca de las tablas indicadas cuando confirma la transacción en curso
+    (sin transacción, en el acto).
+    - La fila de Tbl_Configuracion no se bloquea dentro de la venta: las ventas
+      simultáneas no hacen cola en ella.
+    - Entre el COMMIT y la subida de la marca un 304 puede servir la versión anterior
+      (una ventana de milisegundos); nunca queda una marca nueva sobre datos sin confirmar.
+    - Si la transacción se revierte la marca no se mueve.
+    Llamarlo en las escrituras que no emiten señales (update(), bulk_update, bulk_create).
+    """
+    transaction.on_commit(partial(_subir_marcas, modelos))
+
+
+def _subir_marcas(modelos):
+    """Una sola sentencia UPDATE para todas las marcas (y crear las que falten)"""
+    valor = str(time.time_ns())
+    claves = {_clave(modelo) for modelo in modelos}
+    if TblConfiguracion.objects.filter(clave__in=claves).update(valor=valor) < len(claves):
+        for clave in claves:
+            TblConfiguracion.objects.get_or_create(clave=clave, defaults={'valor': valor})
+
+
+def marcas(*modelos):
+    """{db_table: ns del último cambio} en una sola consulta (crea las que falten)"""
+    claves = {_clave(modelo): modelo for modelo in modelos}
+    encontradas = dict(
+        TblConfiguracion.objects.filter(clave__in=claves).values_list('clave', 'valor')
+    )
+    faltantes = [modelo for clave, modelo in claves.items() if clave not in encontradas]
+    if faltantes:
+        # Primera vez: cualquier marca sirve mientras cambie en la siguiente escritura
+        _subir_marcas(faltantes)
+        encontradas.update(
+            TblConfiguracion.objects.filter(clave__in=claves).values_list('clave', 'valor')
+        )
+    return {claves[clave]._meta.db_table: int(valor) for clave, valor in encontradas.items()}
+
+
+def _cambio_catalogo(sender, **kwargs):
+    registrar_cambio(sender)
+
+
+def _cambio_detalle(sender, **kwargs):
+    registrar_cambio(*MODELOS_STOCK)
+
+
+def conectar_senales():
+    """save()/delete() del ORM suben la marca solos (ver ApiConfig.ready)"""
+    for modelo in MODELOS_CATALOGO:
+        post_save.connect(_cambio_catalogo, sender=modelo, dispatch_uid=f'cambios_{modelo.__name__}_save')
+        post_delete.connect(_cambio_catalogo, sender=modelo, dispatch_uid=f'cambios_{modelo.__name__}_delete')
+    post_save.connect(_cambio_detalle, sender=TblDetallesFactura, dispatch_uid='cambios_detalle_save')
+    post_delete.connect(_cambio_detalle, sender=TblDetallesFactura, dispatch_uid='cambios_detalle_delete')
+
+
+class RespuestaCondicionalMixin:
+    """
+    GET condicional (ETag / Last-Modified) para ViewSets de catálogo.
+    - ETag y Last-Modified salen de las marcas de `tablas_condicionales` (una consulta),
+      no del cuerpo de la respuesta.
+    - Si el cliente ya tiene esa versión se responde 304 sin consultar la tabla
+      ni pasar por el serializer.
+    - La URL completa (filtros, cursor), el host y el formato pedido entran en el ETag.
+    """
+    # Tablas cuyo cambio cambia la respuesta (la propia y las que se leen vía relaciones)
+    tablas_condicionales = ()
+
+    def list(self, request, *args, **kwargs):
+        return self._condicional(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._condicional(request, super().retrieve, *args, **kwargs)
+
+    def _condicional(self, request, vista, *args, **kwargs):
+        if not self.tablas_condicionales:
+            return vista(request, *args, **kwargs)
+
+        valores = marcas(*self.tablas_condicionales)
+        huella = hashlib.sha1('|'.join([
+            *(f'{tabla}={valor}' for tabla, valor in sorted(valores.items())),
+            request.get_host(), request.get_full_path(), request.accepted_media_type or '',
+        ]).encode()).hexdigest()
+        etag = f'"{huella}"'
+        ultimo_cambio = max(valores.values()) // 1_000_000_000
+
+        response = get_conditional_response(request, etag=etag, last_modified=ultimo_cambio)
+        if response is None:
+            response = vista(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(ultimo_cambio)
+            # El navegador guarda la respuesta pero revalida siempre (If-None-Match)
+            patch_cache_control(response, private=True, no_cache=True)
+            patch_vary_headers(response, ['Accept'])
+        return response
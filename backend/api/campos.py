@@ -0,0 +1,109 @@
+# backend/api/campos.py
+from rest_framework import serializers
+
+
+def _nombres(valor):
+    return {nombre.strip() for nombre in valor.split(',') if nombre.strip()}
+
+
+def parametros_campos(request):
+    """
+    (fields, expand) de la petición: ?fields=a,b y ?expand=x,y (cada uno un set o None).
+    None si no trae ninguno o si no es una lectura (en POST/PUT el serializer valida
+    todos sus campos).
+    """
+    if request is None or request.method not in ('GET', 'HEAD'):
+        return None
+    params = getattr(request, 'query_params', request.GET)
+    fields, expand = params.get('fields'), params.get('expand')
+    if fields is None and expand is None:
+        return None
+    return (
+        None if fields is None else _nombres(fields),
+        None if expand is None else _nombres(expand),
+    )
+
+
+def campos_lista(campos, expandir=()):
+    """
+    Campos de una lista con los de `expandir` siempre incluidos (endpoints que existen
+    para darlos, ej. facturas/completas con sus detalles), aunque ?fields= los deje fuera.
+    Sin ?fields= / ?expand= la lista sale completa, como siempre.
+    """
+    if campos is None or not expandir:
+        return campos
+    fields, expand = campos
+    return fields, (expand or set()) | set(expandir)
+
+
+def campo_incluido(nombre, campos, expandibles=()):
+    """
+    Reglas de ?fields= / ?expand=:
+    - Sin parámetros: todos los campos (la respuesta de siempre, en listas y en el detalle).
+    - ?fields=a,b: solo esos (más los que vengan en ?expand=).
+    - Solo ?expand=x: todos los campos normales y, de los costosos
+      (Meta.campos_expandibles), solo los pedidos. ?expand= vacío quita todos los costosos.
+    """
+    if campos is None:
+        return True
+    fields, expand = campos
+    if fields is not None:
+        return nombre in fields or nombre in (expand or ())
+    return nombre not in expandibles or nombre in expand
+
+
+class CamposDinamicosMixin:
+    """
+    ?fields= / ?expand= para serializers de lectura.
+    Los campos que no se piden se quitan en get_fields(): sus SerializerMethodField
+    y serializers anidados no se evalúan (ni consultas ni lectura de archivos).
+    - Los parámetros salen del request del contexto, o de context['campos']
+      (vistas de función que no pasan el request, ver respuesta_lista).
+    - Solo se aplica al serializer raíz (o al hijo de la lista raíz): los anidados
+      como cliente_info siempre salen completos.
+    - Meta.campos_expandibles: campos costosos. Salen salvo que ?expand= / ?fields=
+      los dejen fuera (?expand= vacío quita todos).
+    - Meta.campos_solo_detalle: nunca salen en listas, aunque se pidan (ej. imagen_base64).
+    """
+
+    def _campos_solicitados(self):
+        if 'campos' in self.context:
+            return self.context['campos']
+        return parametros_campos(self.context.get('request'))
+
+    def _es_raiz(self):
+        padre = self.parent
+        if isinstance(padre, serializers.ListSerializer):
+            padre = padre.parent
+        return padre is None
+
+    def _en_lista(self):
+        return isinstance(self.parent, serializers.ListSerializer)
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if not self._es_raiz():
+            return fields
+        campos = self._campos_solicitados()
+        if self._en_lista():
+            for nombre in getattr(self.Meta, 'campos_solo_detalle', ()):
+                fields.pop(nombre, None)
+        if campos is None:
+            return fields
+        expandibles = getattr(self.Meta, 'campos_expandibles', ())
+        return {
+            nombre: campo for nombre, campo in fields.items()
+            if campo_incluido(nombre, campos, expandibles)
+        }
+
+    def campo_pedido(self, nombre):
+        """True si la petición nombra el campo en ?fields= o ?expand= (campos opcionales)"""
+        if self._en_lista() and nombre in getattr(self.Meta, 'campos_solo_detalle', ()):
+            return False
+        campos = self._campos_solicitados()
+        return campos is not None and any(nombre in grupo for grupo in campos if grupo)
+
+    @classmethod
+    def preparar_queryset(cls, queryset, campos):
+        """Quitar del queryset lo que solo usan campos omitidos (ej. un prefetch_related)"""
+        return queryset
@@ -0,0 +1,66 @@
+# backend/api/configuracion.py
+from django.core.cache import caches
+from django.utils.connection import ConnectionProxy
+
+from .models import TblConfiguracion
+from .periodos import Periodo
+
+# Cómo está guardada Tbl_Facturas.fecha (la fija normalizar_fechas_facturas)
+CLAVE_CONVENCION_FECHAS = 'facturas.fecha.convencion'
+CONVENCION_LOCAL = 'local'
+CONVENCION_UTC = 'utc'
+
+_TTL_CACHE = 300
+
+# Caché de todos los workers (settings.CACHES): guardar() y eliminar() se notan en todos
+cache = ConnectionProxy(caches, 'compartida')
+
+
+def obtener(clave, defecto=None):
+    """Valor de Tbl_Configuracion (con caché corta para no consultar en cada petición)"""
+    clave_cache = f'configuracion:{clave}'
+    valor = cache.get(clave_cache)
+    if valor is None:
+        fila = TblConfiguracion.objects.filter(clave=clave).values_list('valor', flat=True).first()
+        valor = fila if fila is not None else defecto
+        if valor is not None:
+            cache.set(clave_cache, valor, _TTL_CACHE)
+    return valor
+
+
+def guardar(clave, valor):
+    TblConfiguracion.objects.update_or_create(clave=clave, defaults={'valor': str(valor)})
+    cache.delete(f'configuracion:{clave}')
+
+
+def eliminar(clave):
+    TblConfiguracion.objects.filter(clave=clave).delete()
+    cache.delete(f'configuracion:{clave}')
+
+
+def convencion_fechas_facturas():
+    """
+    'utc' (el historial, mientras normalizar_fechas_facturas no termine) o 'local'
+    (hora de Honduras, lo que escribe la aplicación).
+    - Sin fila en Tbl_Configuracion es 'utc': el backfill es el que pasa a 'local'.
+    - 'local' es definitivo (el comando no vuelve a convertir), así que solo ese valor
+      se guarda en la caché; mientras sea 'utc' se lee de la base y todos los procesos
+      cambian juntos en cuanto termina el backfill.
+    """
+    clave_cache = f'configuracion:{CLAVE_CONVENCION_FECHAS}'
+    if cache.get(clave_cache) == CONVENCION_LOCAL:
+        return CONVENCION_LOCAL
+    valor = (
+        TblConfiguracion.objects.filter(clave=CLAVE_CONVENCION_FECHAS).values_list('valor', flat=True).first()
+        or CONVENCION_UTC
+    )
+    if valor == CONVENCION_LOCAL:
+        cache.set(clave_cache, valor, _TTL_CACHE)
+    return valor
+
+
+def periodo_facturas(periodo: Periodo):
+    """Periodo en hora local -> el rango que corresponde a cómo está guardada Tbl_Facturas.fecha"""
+    if convencion_fechas_facturas() == CONVENCION_UTC:
+        return periodo.en_utc()
+    return periodo
@@ -0,0 +1,66 @@
+# backend/api/esquema_local.py
+from django.apps import apps
+from django.db import connections
+from django.test.runner import DiscoverRunner
+
+# Tablas propias del sistema (las de auth/django las crea migrate)
+PREFIJOS_TABLAS = ('Tbl_', 'Perfiles_')
+
+COLACION_SQL_SERVER = 'Modern_Spanish_CI_AS'
+
+
+def _comparar_sin_mayusculas(a, b):
+    a, b = a.lower(), b.lower()
+    return (a > b) - (a < b)
+
+
+def registrar_colacion_sqlite(sender, connection, **kwargs):
+    """
+    Los modelos declaran db_collation='Modern_Spanish_CI_AS' (SQL Server);
+    en SQLite se registra una colación con ese nombre, sin distinguir mayúsculas.
+    """
+    if connection.vendor == 'sqlite':
+        connection.connection.create_collation(COLACION_SQL_SERVER, _comparar_sin_mayusculas)
+
+
+def modelos_esquema_local():
+    """Modelos de api con tabla Tbl_*/Perfiles_* que migrate no crea (managed = False)"""
+    return [
+        modelo for modelo in apps.get_app_config('api').get_models()
+        if not modelo._meta.managed and modelo._meta.db_table.startswith(PREFIJOS_TABLAS)
+    ]
+
+
+def crear_esquema_local(connection, reiniciar=False):
+    """
+    Crear en una base local (SQLite) las tablas de los modelos managed = False.
+    Las que ya existen se dejan como están, salvo con reiniciar=True.
+    Devuelve la lista de tablas creadas.
+    """
+    if connection.vendor != 'sqlite':
+        raise RuntimeError(
+            f'El esquema local solo se crea en SQLite (conexión actual: {connection.vendor})'
+        )
+
+    existentes = set(connection.introspection.table_names())
+    creadas = []
+    with connection.schema_editor() as editor:
+        for modelo in modelos_esquema_local():
+            tabla = modelo._meta.db_table
+            if tabla in existentes:
+                if not reiniciar:
+                    continue
+                editor.delete_model(modelo)
+            editor.create_model(modelo)
+            creadas.append(tabla)
+    return creadas
+
+
+class RunnerEsquemaLocal(DiscoverRunner):
+    """Runner de pruebas que agrega las tablas managed = False a la base de test"""
+
+    def setup_databases(self, **kwargs):
+        configuracion = super().setup_databases(**kwargs)
+        for alias in connections:
+            crear_esquema_local(connections[alias])
+        return configuracion
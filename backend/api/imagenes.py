@@ -0,0 +1,221 @@
+# backend/api/imagenes.py
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+import requests
+from PIL import Image, ImageOps
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .cambios import registrar_cambio
+from .models import TblStockJoyas
+
+# Carpeta dentro de MEDIA_ROOT donde se guarda la copia local de las imágenes de joyas
+CARPETA_JOYAS = 'imagenes_joyas'
+TAMANO_MINIATURA = (300, 300)
+TAMANO_IMAGEN = (1600, 1600)
+
+# Imágenes de referencia de cotizaciones y sus versiones reducidas (WebP)
+CARPETA_COTIZACIONES = 'imagenes_cotizaciones'
+CARPETA_DERIVADOS = os.path.join(CARPETA_COTIZACIONES, 'derivados')
+DERIVADOS_COTIZACION = {
+    'miniatura': (320, 320),
+    'media': (1024, 1024),
+}
+CALIDAD_DERIVADOS = 80
+# Versión de los derivados en el nombre del archivo: cambiar tamaños o calidad cambia la ruta
+VERSION_DERIVADOS = hashlib.sha1(
+    repr((sorted(DERIVADOS_COTIZACION.items()), CALIDAD_DERIVADOS)).encode('utf-8')
+).hexdigest()[:8]
+
+# Carpetas cuyo contenido no cambia para una misma ruta (se sirven con Cache-Control immutable):
+# - derivados: el original nunca se sobrescribe y la ruta lleva VERSION_DERIVADOS
+# - copias de joyas: la ruta es el hash de imagen_url y solo se descarga una vez
+CARPETAS_INMUTABLES = (CARPETA_DERIVADOS, CARPETA_JOYAS)
+
+# Descargas de imágenes de joyas y derivados de cotizaciones: fuera del hilo de la petición
+_ejecutor_imagenes = ThreadPoolExecutor(max_workers=2, thread_name_prefix='imagenes')
+
+
+def _clave_url(url):
+    """Hash estable de la URL: si la URL cambia, cambia la clave y se vuelve a descargar"""
+    return hashlib.sha1(url.strip().encode('utf-8')).hexdigest()
+
+
+def ruta_inmutable(ruta):
+    """True si la ruta (relativa a MEDIA_ROOT) está en una de las CARPETAS_INMUTABLES"""
+    carpeta = os.path.dirname(os.path.normpath(ruta).lstrip('/'))
+    return any(carpeta == os.path.normpath(inmutable) for inmutable in CARPETAS_INMUTABLES)
+
+
+def rutas_imagen_joya(url):
+    """Rutas (en el storage) de la copia local y la miniatura de una imagen_url"""
+    clave = _clave_url(url)
+    return {
+        'imagen': os.path.join(CARPETA_JOYAS, f'{clave}.jpg'),
+        'miniatura': os.path.join(CARPETA_JOYAS, f'{clave}_miniatura.jpg'),
+    }
+
+
+def redimensionar_imagen(contenido, tamano=TAMANO_MINIATURA, formato='JPEG', calidad=85):
+    """Reducir una imagen (bytes) al tamaño máximo indicado, manteniendo la proporción"""
+    with Image.open(BytesIO(contenido)) as imagen:
+        # Las fotos de teléfono traen la rotación en EXIF: aplicarla antes de reducir
+        imagen = ImageOps.exif_transpose(imagen)
+        imagen.thumbnail(tamano)
+        if formato == 'JPEG' and imagen.mode not in ('RGB', 'L'):
+            imagen = imagen.convert('RGB')
+        elif imagen.mode not in ('RGB', 'RGBA', 'L'):
+            imagen = imagen.convert('RGBA')
+        salida = BytesIO()
+        imagen.save(salida, format=formato, quality=calidad)
+    return salida.getvalue()
+
+
+def copias_imagenes_joyas():
+    """Nombres de archivo en CARPETA_JOYAS: un solo listado para toda una respuesta"""
+    try:
+        return set(default_storage.listdir(CARPETA_JOYAS)[1])
+    except FileNotFoundError:
+        return set()
+
+
+def imagen_joya_en_cache(url, copias=None):
+    """
+    Rutas de la copia local si ya fue descargada, o None (no hace peticiones HTTP).
+    copias: resultado de copias_imagenes_joyas() para no consultar el storage por fila.
+    """
+    if not url:
+        return None
+    rutas = rutas_imagen_joya(url)
+    if copias is None:
+        existe = default_storage.exists(rutas['miniatura'])
+    else:
+        existe = os.path.basename(rutas['miniatura']) in copias
+    return rutas if existe else None
+
+
+def cachear_imagen_joya(url, timeout=10):
+    """
+    Descargar imagen_url una sola vez y guardarla bajo MEDIA_ROOT junto con su miniatura.
+    - La copia local se guarda como JPEG de tamaño acotado.
+    - Si ya existe la copia de esa URL no se descarga de nuevo.
+    """
+    if not url:
+        return None
+
+    rutas = imagen_joya_en_cache(url)
+    if rutas:
+        return rutas
+
+    rutas = rutas_imagen_joya(url)
+    response = requests.get(url, timeout=timeout)
+    response.raise_for_status()
+
+    # Generar ambas versiones antes de guardar: valida que el contenido sea una imagen
+    imagen = redimensionar_imagen(response.content, TAMANO_IMAGEN, calidad=90)
+    miniatura = redimensionar_imagen(response.content)
+
+    for ruta in rutas.values():
+        if default_storage.exists(ruta):
+            default_storage.delete(ruta)
+    default_storage.save(rutas['imagen'], ContentFile(imagen))
+    # La miniatura se guarda al final: su existencia marca la entrada como completa
+    default_storage.save(rutas['miniatura'], ContentFile(miniatura))
+    return rutas
+
+
+def _cachear_imagen_joya_en_segundo_plano(url):
+    try:
+        cachear_imagen_joya(url)
+        # imagen_local_url cambia aunque la fila ya se guardó
+        registrar_cambio(TblStockJoyas)
+    except Exception as e:
+        print(f"Error cacheando imagen {url}: {e}")
+    finally:
+        # Conexión propia de este hilo
+        connection.close()
+
+
+def encargar_imagen_joya(url):
+    """
+    Descargar imagen_url en un hilo de fondo cuando se confirme la transacción
+    (al crear o editar una joya); la petición no espera la descarga.
+    """
+    if url and not imagen_joya_en_cache(url):
+        transaction.on_commit(lambda: _ejecutor_imagenes.submit(_cachear_imagen_joya_en_segundo_plano, url))
+
+
+def rutas_derivados_cotizacion(imagen_referencia):
+    """
+    Rutas de la miniatura y la versión media (WebP) de una imagen de cotización.
+    Salen solo del nombre, sin tocar el disco. La extensión forma parte del nombre:
+    x.jpg y x.png de la misma carpeta tienen derivados distintos.
+    """
+    nombre, extension = os.path.splitext(os.path.basename(imagen_referencia))
+    if extension:
+        nombre = f'{nombre}_{extension[1:]}'
+    return {
+        tipo: os.path.join(CARPETA_DERIVADOS, f'{nombre}_{tipo}.{VERSION_DERIVADOS}.webp')
+        for tipo in DERIVADOS_COTIZACION
+    }
+
+
+def generar_derivados_cotizacion(imagen_referencia):
+    """
+    Crear (o reemplazar) la miniatura y la versión media de una imagen ya guardada.
+    Reemplazar solo ocurre con la misma versión, es decir, con el mismo resultado.
+    """
+    with default_storage.open(imagen_referencia, 'rb') as archivo:
+        contenido = archivo.read()
+
+    rutas = rutas_derivados_cotizacion(imagen_referencia)
+    for tipo, tamano in DERIVADOS_COTIZACION.items():
+        derivado = redimensionar_imagen(contenido, tamano, formato='WEBP', calidad=CALIDAD_DERIVADOS)
+        if default_storage.exists(rutas[tipo]):
+            default_storage.delete(rutas[tipo])
+        default_storage.save(rutas[tipo], ContentFile(derivado))
+    return rutas
+
+
+def _generar_derivados_en_segundo_plano(imagen_referencia):
+    try:
+        generar_derivados_cotizacion(imagen_referencia)
+    except Exception as e:
+        print(f"Error generando derivados de {imagen_referencia}: {e}")
+
+
+def guardar_imagen_cotizacion(imagen_file):
+    """
+    Guardar la imagen subida tal cual (como antes) y encargar sus derivados
+    a un hilo de fondo. Devuelve la ruta que se guarda en imagen_referencia.
+    """
+    filename = f"cotizacion_{timezone.now().strftime('%Y%m%d_%H%M%S')}_{imagen_file.name}"
+    saved_path = default_storage.save(os.path.join(CARPETA_COTIZACIONES, filename), imagen_file)
+    _ejecutor_imagenes.submit(_generar_derivados_en_segundo_plano, saved_path)
+    return saved_path
+
+
+def derivados_cotizacion_generados():
+    """Nombres de archivo en CARPETA_DERIVADOS: un solo listado para toda una respuesta"""
+    try:
+        return set(default_storage.listdir(CARPETA_DERIVADOS)[1])
+    except FileNotFoundError:
+        return set()
+
+
+def derivados_cotizacion_existentes(imagen_referencia):
+    """
+    Rutas de los derivados que ya existen (los que faltan quedan en None).
+    Revisa el storage: para generar_derivados_cotizaciones, no para las respuestas.
+    """
+    if not imagen_referencia:
+        return {tipo: None for tipo in DERIVADOS_COTIZACION}
+    return {
+        tipo: ruta if default_storage.exists(ruta) else None
+        for tipo, ruta in rutas_derivados_cotizacion(imagen_referencia).items()
+    }
@@ -0,0 +1,187 @@
+# backend/api/inventario.py
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+
+from .cambios import registrar_cambio
+from .models import TblStockJoyas, TblStockMateriales, TblStockInsumos
+
+# tipo (como llega en la petición) -> modelo con cantidad_existencia
+MODELOS_STOCK = {
+    'material': TblStockMateriales,
+    'insumo': TblStockInsumos,
+}
+
+# tipo_item de los detalles de factura -> modelo del que se descuenta al vender
+MODELOS_DESCUENTO = {
+    'joya': TblStockJoyas,
+    **MODELOS_STOCK,
+}
+
+# Filas por sentencia en bulk_update (SQL Server admite ~2100 parámetros)
+TAMANO_LOTE = 500
+
+# Códigos por UPDATE al descontar: el CASE va en el SET y en el WHERE, en el peor caso
+# (todas las cantidades distintas) 5 parámetros por código
+LOTE_DESCUENTO = 400
+
+
+def _entero(valor):
+    """Entero >= 0 (acepta '12'), o None si el valor no sirve"""
+    if isinstance(valor, bool):
+        return None
+    try:
+        valor = int(valor)
+    except (TypeError, ValueError):
+        return None
+    return valor if valor >= 0 else None
+
+
+def actualizar_existencias(updates):
+    """
+    Fijar cantidad_existencia de muchos ítems a la vez.
+    - updates: [{'tipo': 'material'|'insumo', 'codigo': int, 'cantidad': int}, ...]
+    - Un in_bulk por tipo para cargar los ítems y un bulk_update por tipo para
+      guardarlos, todo en una transacción: o se aplica todo o nada.
+    - Los ítems con tipo, código o cantidad inválidos se devuelven en `errores`
+      y no impiden actualizar los demás. Si un código se repite gana el último.
+    Devuelve (actualizados, errores).
+    """
+    cambios = {tipo: {} for tipo in MODELOS_STOCK}
+    errores = []
+
+    for posicion, update in enumerate(updates):
+        if not isinstance(update, dict):
+            errores.append({'posicion': posicion, 'tipo': None, 'codigo': None,
+                            'error': 'Cada update debe ser un objeto con tipo, codigo y cantidad'})
+            continue
+        tipo = str(update.get('tipo') or '').lower()
+        codigo = _entero(update.get('codigo'))
+        cantidad = _entero(update.get('cantidad'))
+
+        if tipo not in MODELOS_STOCK:
+            errores.append({'posicion': posicion, 'tipo': update.get('tipo'), 'codigo': update.get('codigo'),
+                            'error': 'Tipo de ítem no válido'})
+        elif codigo is None:
+            errores.append({'posicion': posicion, 'tipo': tipo, 'codigo': update.get('codigo'),
+                            'error': 'Código de ítem no válido'})
+        elif cantidad is None:
+            errores.append({'posicion': posicion, 'tipo': tipo, 'codigo': codigo,
+                            'error': 'La cantidad debe ser un entero no negativo'})
+        else:
+            cambios[tipo][codigo] = (posicion, cantidad)
+
+    actualizados = 0
+    with transaction.atomic():
+        for tipo, por_codigo in cambios.items():
+            if not por_codigo:
+                continue
+            modelo = MODELOS_STOCK[tipo]
+
+            # in_bulk parte la lista de códigos en lotes según el límite de parámetros
+            items = modelo.objects.only('cantidad_existencia').in_bulk(list(por_codigo))
+
+            modificados = []
+            for codigo, (posicion, cantidad) in por_codigo.items():
+                item = items.get(codigo)
+                if item is None:
+                    errores.append({'posicion': posicion, 'tipo': tipo, 'codigo': codigo,
+                                    'error': 'Ítem no encontrado'})
+                    continue
+                item.cantidad_existencia = cantidad
+                modificados.append(item)
+
+            modelo.objects.bulk_update(modificados, ['cantidad_existencia'], batch_size=TAMANO_LOTE)
+            actualizados += len(modificados)
+            if modificados:
+                # bulk_update no emite señales: subir a mano la marca del catálogo (GET condicional)
+                registrar_cambio(modelo)
+
+    errores.sort(key=lambda error: error['posicion'])
+    return actualizados, errores
+
+
+class ExistenciaInsuficiente(Exception):
+    """Un ítem vendido no existe o no tiene existencia suficiente"""
+
+    def __init__(self, tipo, codigos):
+        self.tipo = tipo
+        self.codigos = codigos
+        super().__init__(
+            f'Existencia insuficiente o ítem no encontrado ({tipo}): {", ".join(map(str, codigos))}'
+        )
+
+
+def descontado_por_trigger(tipo):
+    """True si el trigger de la base ya descuenta este tipo al insertar el detalle"""
+    return tipo.upper() in getattr(settings, 'INVENTARIO_DESCUENTO_TRIGGER', ())
+
+
+def _faltantes(modelo, cantidades, codigos):
+    """Códigos que no existen o no alcanzan (sin existencia registrada tampoco se puede vender)"""
+    # in_bulk parte la lista de códigos en lotes según el límite de parámetros
+    existencias = modelo.objects.only('cantidad_existencia').in_bulk(codigos)
+    faltantes = []
+    for codigo in codigos:
+        item = existencias.get(codigo)
+        if item is None or item.cantidad_existencia is None or item.cantidad_existencia < cantidades[codigo]:
+            faltantes.append(codigo)
+    return faltantes
+
+
+def _pedido(cantidades, lote):
+    """CASE WHEN codigo IN (...) THEN n ...: un WHEN por cantidad distinta, no por código"""
+    por_cantidad = defaultdict(list)
+    for codigo in lote:
+        por_cantidad[cantidades[codigo]].append(codigo)
+    return Case(
+        *[When(pk__in=codigos, then=Value(cantidad)) for cantidad, codigos in por_cantidad.items()],
+        output_field=IntegerField()
+    )
+
+
+def descontar_existencias(tipo, cantidades):
+    """
+    Descontar stock de varios ítems de un tipo, por lotes de LOTE_DESCUENTO códigos:
+        UPDATE ... SET cantidad_existencia = cantidad_existencia - CASE ... END
+        WHERE codigo IN (...) AND cantidad_existencia >= CASE ... END
+    La condición se evalúa en la base fila por fila: la existencia nunca queda en
+    negativo (ni choca con un CHECK >= 0) y dos ventas simultáneas del mismo ítem
+    se ordenan por el bloqueo del UPDATE.
+    - cantidades: {codigo: cantidad} (sumar antes las líneas repetidas).
+    - Si el UPDATE afecta menos filas que ítems del lote, el lote se deshace y se
+      lanza ExistenciaInsuficiente con los códigos que faltan; llamar dentro de
+      transaction.atomic() para deshacer la venta completa.
+    - Los tipos de INVENTARIO_DESCUENTO_TRIGGER ya los descontó el trigger al
+      insertar los detalles: no se actualizan, solo se revisa que no quedaran en negativo.
+    Devuelve cuántos ítems se descontaron.
+    """
+    if not cantidades:
+        return 0
+
+    modelo = MODELOS_DESCUENTO[tipo]
+    codigos = list(cantidades)
+
+    if descontado_por_trigger(tipo):
+        faltantes = _faltantes(modelo, dict.fromkeys(codigos, 0), codigos)
+        if faltantes:
+            raise ExistenciaInsuficiente(tipo, faltantes)
+    else:
+        for inicio in range(0, len(codigos), LOTE_DESCUENTO):
+            lote = codigos[inicio:inicio + LOTE_DESCUENTO]
+            pedido = _pedido(cantidades, lote)
+            # Punto de guardado: si el lote no alcanza se deshace y se leen las existencias reales
+            with transaction.atomic():
+                descontados = modelo.objects.filter(
+                    pk__in=lote,
+                    cantidad_existencia__gte=pedido
+                ).update(cantidad_existencia=F('cantidad_existencia') - pedido)
+                if descontados < len(lote):
+                    transaction.set_rollback(True)
+            if descontados < len(lote):
+                raise ExistenciaInsuficiente(tipo, _faltantes(modelo, cantidades, lote))
+
+    registrar_cambio(modelo)
+    return len(codigos)
@@ -0,0 +1,160 @@
+# backend/api/lectura_rapida.py
+import decimal
+import re
+
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.encoding import force_str
+from rest_framework import serializers
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+# Campos cuyo to_representation() devuelve el mismo valor que trae la base (int(x) / str(x))
+_SIN_CONVERSION = (serializers.IntegerField, serializers.CharField)
+
+_DISPLAY = re.compile(r'get_(\w+)_display')
+
+
+def _decimal(campo):
+    """
+    DecimalField.to_representation con el exponente y el contexto calculados una vez
+    (DRF copia el contexto decimal en cada valor). None si el campo usa otra salida.
+    """
+    coerce_to_string = getattr(campo, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING)
+    if not coerce_to_string or campo.localize or campo.normalize_output or campo.decimal_places is None:
+        return None
+    exponente = decimal.Decimal('.1') ** campo.decimal_places
+    contexto = decimal.getcontext().copy()
+    if campo.max_digits is not None:
+        contexto.prec = campo.max_digits
+    rounding = campo.rounding
+
+    def convertir(valor):
+        if not isinstance(valor, decimal.Decimal):
+            valor = decimal.Decimal(str(valor).strip())
+        return f'{valor.quantize(exponente, rounding=rounding, context=contexto):f}'
+    return convertir
+
+
+def _representacion(campo):
+    """to_representation del campo, con el None -> None de Serializer.to_representation"""
+    if type(campo) in _SIN_CONVERSION:
+        return None
+    convertir = None
+    if isinstance(campo, serializers.DecimalField):
+        convertir = _decimal(campo)
+    convertir = convertir or campo.to_representation
+
+    def representar(valor):
+        return None if valor is None else convertir(valor)
+    return representar
+
+
+def _display(campo, modelo, nombre_modelo):
+    """El mismo texto que get_<campo>_display() (Model._get_FIELD_display)"""
+    opciones = dict(modelo._meta.get_field(nombre_modelo).flatchoices)
+    convertir = _representacion(campo)
+
+    def representar(valor):
+        texto = force_str(opciones.get(valor, valor), strings_only=True)
+        return texto if convertir is None else convertir(texto)
+    return representar
+
+
+def _derivar(campo, modelo):
+    """(columna de values(), conversión) de un campo del serializer"""
+    if isinstance(campo, (serializers.SerializerMethodField, serializers.BaseSerializer)):
+        raise ImproperlyConfigured(
+            f'El campo "{campo.field_name}" no se puede leer con values(); '
+            f'declárelo en Meta.lectura_rapida'
+        )
+    if isinstance(campo, serializers.PrimaryKeyRelatedField) and '.' not in campo.source:
+        # values('fk') trae la PK relacionada, lo mismo que el campo con PKOnlyObject
+        if campo.pk_field is not None:
+            return campo.source, _representacion(campo.pk_field)
+        return campo.source, None
+    display = _DISPLAY.fullmatch(campo.source)
+    if display:
+        nombre_modelo = display.group(1)
+        return nombre_modelo, _display(campo, modelo, nombre_modelo)
+    return campo.source.replace('.', '__'), _representacion(campo)
+
+
+class LectorValores:
+    """
+    Lectura de listas sin instanciar modelos ni el serializer por fila.
+    - Las filas salen de queryset.values() y cada campo tiene su conversión
+      precalculada (la del propio campo de DRF), así el JSON es el mismo que con
+      serializer_class(queryset, many=True).data.
+    - Los campos que el serializer calcula en Python (SerializerMethodField,
+      to_representation propio) se declaran en Meta.lectura_rapida:
+      {'campo': (('columna', ...), funcion)}; la función recibe esas columnas.
+    - Respeta ?fields= / ?expand= (los campos salen del serializer armado con el contexto).
+    """
+
+    def __init__(self, serializer_class, context=None):
+        # El hijo de una lista: los campos costosos y los de solo detalle quedan como en el serializer
+        serializer = serializer_class(many=True, context=context or {}).child
+        modelo = serializer_class.Meta.model
+        declarados = getattr(serializer_class.Meta, 'lectura_rapida', {})
+
+        self.campos = []
+        columnas = []
+        for campo in serializer._readable_fields:
+            if campo.field_name in declarados:
+                claves, funcion = declarados[campo.field_name]
+                # Una sola columna: se pasa directo, sin armar la lista de argumentos
+                clave = claves[0] if len(claves) == 1 else tuple(claves)
+                self.campos.append((campo.field_name, clave, funcion))
+                columnas.extend(claves)
+            else:
+                clave, funcion = _derivar(campo, modelo)
+                self.campos.append((campo.field_name, clave, funcion))
+                columnas.append(clave)
+        self.columnas = list(dict.fromkeys(columnas))
+
+    def valores(self, queryset, *extras):
+        """
+        queryset.values() con las columnas de los campos.
+        extras: columnas que necesita otro (ej. la llave de PaginacionCursor), no salen en la respuesta.
+        """
+        return queryset.values(*dict.fromkeys([*self.columnas, *extras]))
+
+    def representar(self, filas):
+        campos = self.campos
+        datos = []
+        for fila in filas:
+            item = {}
+            for nombre, clave, funcion in campos:
+                if funcion is None:
+                    item[nombre] = fila[clave]
+                elif type(clave) is tuple:
+                    item[nombre] = funcion(*[fila[c] for c in clave])
+                else:
+                    item[nombre] = funcion(fila[clave])
+            datos.append(item)
+        return datos
+
+
+def columnas_orden(orden):
+    """Columnas de un orden de PaginacionCursor ('-pk' o tupla) para incluirlas en values()"""
+    if isinstance(orden, str):
+        orden = (orden,)
+    return [campo.lstrip('-') for campo in orden]
+
+
+class LecturaRapidaMixin:
+    """
+    list() con LectorValores en lugar del serializer (ver arriba).
+    Se activa por endpoint agregando el mixin al ViewSet; retrieve y escrituras no cambian.
+    """
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        lector = LectorValores(self.get_serializer_class(), self.get_serializer_context())
+        orden = getattr(self, 'orden_cursor', None) or '-pk'
+        filas = lector.valores(queryset, *columnas_orden(orden))
+
+        pagina = self.paginate_queryset(filas)
+        if pagina is not None:
+            return self.get_paginated_response(lector.representar(pagina))
+        return Response(lector.representar(filas))
@@ -0,0 +1,39 @@
+# backend/api/management/commands/cachear_imagenes_joyas.py
+from django.core.management.base import BaseCommand
+
+from api.cambios import registrar_cambio
+from api.imagenes import cachear_imagen_joya, imagen_joya_en_cache
+from api.models import TblStockJoyas
+
+
+class Command(BaseCommand):
+    help = 'Descarga una sola vez las imagen_url de las joyas y genera sus miniaturas en MEDIA_ROOT'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--timeout', type=int, default=10, help='Timeout por descarga (segundos)')
+
+    def handle(self, *args, **options):
+        urls = (
+            TblStockJoyas.objects.exclude(imagen_url__isnull=True).exclude(imagen_url='')
+            .values_list('imagen_url', flat=True).distinct()
+        )
+
+        descargadas = existentes = errores = 0
+        for url in urls.iterator():
+            if imagen_joya_en_cache(url):
+                existentes += 1
+                continue
+            try:
+                cachear_imagen_joya(url, timeout=options['timeout'])
+                descargadas += 1
+            except Exception as e:
+                errores += 1
+                self.stderr.write(f'Error con {url}: {e}')
+
+        if descargadas:
+            # imagen_local_url cambió en el listado de joyas
+            registrar_cambio(TblStockJoyas)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Imágenes descargadas: {descargadas}, ya en caché: {existentes}, con error: {errores}'
+        ))
@@ -0,0 +1,34 @@
+# backend/api/management/commands/crear_esquema_local.py
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from api.esquema_local import crear_esquema_local
+
+
+class Command(BaseCommand):
+    help = (
+        'Crea en una base SQLite local todas las tablas Tbl_* (incluidas las managed = False) '
+        'para benchmarks y pruebas. Usar con --settings=backend.settings_benchmark'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default')
+        parser.add_argument('--reiniciar', action='store_true',
+                            help='Borrar y volver a crear las tablas que ya existan')
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        if connection.vendor != 'sqlite':
+            raise CommandError(
+                'Este comando solo trabaja sobre SQLite; use --settings=backend.settings_benchmark'
+            )
+
+        # Tablas de Django y tablas managed de api (sin migraciones en este perfil)
+        call_command('migrate', database=options['database'], run_syncdb=True,
+                     interactive=False, verbosity=0)
+
+        creadas = crear_esquema_local(connection, reiniciar=options['reiniciar'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Esquema local listo en {connection.settings_dict["NAME"]}: {len(creadas)} tablas creadas'
+        ))
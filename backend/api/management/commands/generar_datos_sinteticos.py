@@ -0,0 +1,452 @@
+# backend/api/management/commands/generar_datos_sinteticos.py
+import calendar
+import random
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Max
+from PIL import Image
+
+from api import configuracion
+from api.cambios import MODELOS_CATALOGO, registrar_cambio
+from api.imagenes import CARPETA_COTIZACIONES
+from api.models import (
+    PerfilesEmpleados, TblClientes, TblEmpleados, TblProvedores, TblServicios,
+    TblStockJoyas, TblStockMateriales, TblStockInsumos, TblFacturas, TblDetallesFactura,
+    TblOrdenesTrabajo, TblCotizaciones, TblGastos,
+)
+from api.periodos import hoy_local
+from api.resumen_ventas import reconstruir_resumen
+
+# Volúmenes predefinidos (--tamano); cada opción explícita los sobreescribe
+TAMANOS = {
+    'pequeno': {
+        'clientes': 500, 'empleados': 5, 'proveedores': 20, 'joyas': 200, 'servicios': 15,
+        'materiales': 100, 'insumos': 100, 'facturas': 2000, 'cotizaciones': 500, 'gastos_mes': 10,
+    },
+    'mediano': {
+        'clientes': 5000, 'empleados': 10, 'proveedores': 100, 'joyas': 2000, 'servicios': 30,
+        'materiales': 500, 'insumos': 500, 'facturas': 100000, 'cotizaciones': 10000, 'gastos_mes': 25,
+    },
+    'grande': {
+        'clientes': 50000, 'empleados': 20, 'proveedores': 200, 'joyas': 10000, 'servicios': 50,
+        'materiales': 2000, 'insumos': 2000, 'facturas': 1000000, 'cotizaciones': 100000, 'gastos_mes': 40,
+    },
+}
+
+# Mezclas observadas en el negocio
+TIPOS_VENTA = (('VENTA', 70), ('FABRICACION', 18), ('REPARACION', 12))
+ESTADOS_PAGO = (('PAGADA', 75), ('PENDIENTE', 20), ('CANCELADA', 5))
+METODOS_PAGO = (('EFECTIVO', 55), ('TARJETA', 35), ('TRANSFERENCIA', 10))
+# Tipos de ítem por tipo de venta (polimorfismo de Tbl_Detalles_Factura)
+ITEMS_POR_VENTA = {
+    'VENTA': (('JOYA', 80), ('MATERIAL', 10), ('INSUMO', 10)),
+    'FABRICACION': (('SERVICIO', 35), ('MATERIAL', 45), ('INSUMO', 20)),
+    'REPARACION': (('SERVICIO', 60), ('INSUMO', 30), ('MATERIAL', 10)),
+}
+# Líneas por factura: media ~5 (5M detalles por 1M facturas)
+LINEAS_POR_FACTURA = ((1, 8), (2, 10), (3, 12), (4, 15), (5, 15), (6, 14), (7, 13), (8, 13))
+# Temporada: Día del Amor (feb), Día de la Madre (may) y diciembre
+PESO_MES = {1: 6, 2: 10, 3: 7, 4: 7, 5: 12, 6: 7, 7: 7, 8: 7, 9: 8, 10: 7, 11: 9, 12: 16}
+# Lunes..Domingo; el sábado es el día fuerte
+PESO_DIA_SEMANA = (12, 12, 13, 14, 17, 22, 10)
+ESTADOS_COTIZACION = (('ACTIVA', 40), ('CONVERTIDA', 30), ('VENCIDA', 25), ('CANCELADA', 5))
+TIPOS_GASTO = (('Alquiler', 3), ('Servicios públicos', 5), ('Materia prima', 30), ('Salarios', 10),
+               ('Mantenimiento', 8), ('Publicidad', 6), ('Transporte', 8), ('Otros', 10))
+
+NOMBRES = ('María', 'José', 'Ana', 'Carlos', 'Lucía', 'Luis', 'Sofía', 'Jorge', 'Daniela', 'Miguel',
+           'Valeria', 'Fernando', 'Gabriela', 'Ricardo', 'Andrea', 'Óscar', 'Karla', 'Héctor')
+APELLIDOS = ('Martínez', 'López', 'Hernández', 'Rodríguez', 'García', 'Flores', 'Reyes', 'Mejía',
+             'Castillo', 'Zelaya', 'Sánchez', 'Aguilar', 'Romero', 'Ramírez', 'Cruz', 'Pineda')
+CIUDADES = ('Tegucigalpa', 'San Pedro Sula', 'La Ceiba', 'Choluteca', 'Comayagua', 'Danlí', 'Siguatepeque')
+TIPOS_JOYA = ('Anillo', 'Collar', 'Pulsera', 'Aretes', 'Cadena', 'Dije', 'Reloj')
+MATERIALES_JOYA = ('Oro 18k', 'Oro 14k', 'Plata 925', 'Oro blanco', 'Platino')
+SERVICIOS = ('Fabricación', 'Reparación de cadena', 'Soldadura', 'Grabado', 'Engaste', 'Pulido',
+             'Cambio de broche', 'Ajuste de talla', 'Baño de oro', 'Limpieza')
+TIPOS_MATERIAL = ('Oro', 'Plata', 'Platino', 'Piedra preciosa', 'Perla')
+CATEGORIAS_INSUMO = ('Soldadura', 'Pulido', 'Químicos', 'Empaque', 'Herramienta')
+
+
+def _elegir(rng, opciones):
+    valores, pesos = zip(*opciones)
+    return rng.choices(valores, weights=pesos)[0]
+
+
+def _sesgado(rng, n):
+    """Índice en [0, n) con sesgo: pocos clientes/ítems concentran muchas ventas"""
+    return min(int(n * rng.random() ** 2.5), n - 1)
+
+
+def _dinero(valor):
+    return Decimal(valor).quantize(Decimal('0.01'))
+
+
+class _Calendario:
+    """Días del rango ponderados por mes y día de la semana; horas en horario de tienda"""
+
+    def __init__(self, rng, inicio, fin):
+        self.rng = rng
+        dias = [inicio + timedelta(days=n) for n in range((fin - inicio).days + 1)]
+        self.dias = dias
+        self.pesos = [PESO_MES[d.month] * PESO_DIA_SEMANA[d.weekday()] for d in dias]
+
+    def fechas(self, cantidad):
+        dias = self.rng.choices(self.dias, weights=self.pesos, k=cantidad)
+        return [
+            datetime.combine(dia, datetime.min.time())
+            + timedelta(hours=self.rng.randint(9, 18), minutes=self.rng.randint(0, 59),
+                        seconds=self.rng.randint(0, 59))
+            for dia in dias
+        ]
+
+
+class Command(BaseCommand):
+    help = (
+        'Genera datos sintéticos relacionados (clientes, inventario, facturas con detalles, órdenes, '
+        'cotizaciones con imágenes y gastos) con bulk_create por lotes. Pensado para el perfil local: '
+        '--settings=backend.settings_benchmark'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tamano', choices=TAMANOS, default='pequeno')
+        for nombre in TAMANOS['pequeno']:
+            parser.add_argument(f'--{nombre.replace("_", "-")}', type=int, dest=nombre)
+        parser.add_argument('--anios', type=int, default=3, help='Años de historial de facturas')
+        parser.add_argument('--imagenes', type=int, default=20, help='Imágenes distintas para cotizaciones')
+        parser.add_argument('--lote', type=int, default=5000, help='Filas por bulk_create')
+        parser.add_argument('--semilla', type=int, default=42)
+        parser.add_argument('--forzar', action='store_true',
+                            help='Permitir generar datos fuera de SQLite (nunca en producción)')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite' and not options['forzar']:
+            raise CommandError(
+                'La base de datos no es SQLite. Use --settings=backend.settings_benchmark '
+                '(o --forzar sobre una base de pruebas)'
+            )
+
+        self.rng = random.Random(options['semilla'])
+        self.lote = options['lote']
+        volumen = {**TAMANOS[options['tamano']],
+                   **{k: v for k, v in options.items() if k in TAMANOS['pequeno'] and v is not None}}
+        fin = hoy_local()
+        self.calendario = _Calendario(self.rng, fin - timedelta(days=365 * options['anios']), fin)
+        self.hoy = fin
+
+        inicio = time.perf_counter()
+        self.catalogos(volumen)
+        self.clientes(volumen['clientes'])
+        imagenes = self.imagenes(options['imagenes'])
+        self.facturas(volumen['facturas'])
+        self.cotizaciones(volumen['cotizaciones'], imagenes)
+        self.gastos(volumen['gastos_mes'], options['anios'])
+
+        # Los datos nuevos quedan en hora local; el resumen diario se recalcula de una vez
+        configuracion.guardar(configuracion.CLAVE_CONVENCION_FECHAS, configuracion.CONVENCION_LOCAL)
+        filas = reconstruir_resumen()
+        # bulk_create no emite señales: invalidar los ETag de los catálogos
+        registrar_cambio(*MODELOS_CATALOGO)
+        self.stdout.write(self.style.SUCCESS(
+            f'Datos generados en {time.perf_counter() - inicio:.1f} s (resumen diario: {filas} filas)'
+        ))
+
+    # ---------- utilidades ----------
+
+    def _insertar(self, modelo, objetos, fechas=()):
+        """
+        bulk_create por lotes; devuelve las PK en el mismo orden de `objetos`.
+        fechas: campos auto_now_add (o FechaHoraLocalField) con valores generados.
+        bulk_create los sella con la hora actual, así que en la misma transacción
+        se vuelven a escribir con un UPDATE por fila (executemany, sin pasar por pre_save).
+        """
+        if not objetos:
+            return []
+        pk = modelo._meta.pk.attname
+        anterior = modelo.objects.aggregate(maximo=Max(pk))['maximo'] or 0
+        generadas = [[getattr(obj, campo) for campo in fechas] for obj in objetos]
+        with transaction.atomic():
+            modelo.objects.bulk_create(objetos, batch_size=self.lote)
+            if getattr(objetos[0], pk) is None:
+                # Backends que no devuelven PK en bulk_create: son las siguientes en orden
+                llaves = modelo.objects.filter(**{f'{pk}__gt': anterior}).order_by(pk).values_list(pk, flat=True)
+                for obj, llave in zip(objetos, llaves):
+                    setattr(obj, pk, llave)
+            if fechas:
+                for obj, valores in zip(objetos, generadas):
+                    for campo, valor in zip(fechas, valores):
+                        setattr(obj, campo, valor)
+                self._escribir_fechas(modelo, objetos, fechas)
+        return [getattr(obj, pk) for obj in objetos]
+
+    def _escribir_fechas(self, modelo, objetos, fechas):
+        """UPDATE ... WHERE pk = %s con executemany: bulk_update arma un CASE por fila y es mucho más lento"""
+        campos = [modelo._meta.get_field(campo) for campo in fechas]
+        columna_pk = modelo._meta.pk.column
+        nombre = connection.ops.quote_name
+        sql = 'UPDATE {} SET {} WHERE {} = %s'.format(
+            nombre(modelo._meta.db_table),
+            ', '.join(f'{nombre(campo.column)} = %s' for campo in campos),
+            nombre(columna_pk),
+        )
+        filas = [
+            [campo.get_db_prep_value(getattr(obj, campo.attname), connection) for campo in campos] + [obj.pk]
+            for obj in objetos
+        ]
+        with connection.cursor() as cursor:
+            cursor.executemany(sql, filas)
+
+    def _informar(self, texto, cantidad, inicio):
+        self.stdout.write(f'{texto}: {cantidad} ({time.perf_counter() - inicio:.1f} s)')
+
+    def _persona(self):
+        return self.rng.choice(NOMBRES), f'{self.rng.choice(APELLIDOS)} {self.rng.choice(APELLIDOS)}'
+
+    # ---------- catálogos ----------
+
+    def catalogos(self, volumen):
+        inicio = time.perf_counter()
+        rng = self.rng
+        if not PerfilesEmpleados.objects.exists():
+            PerfilesEmpleados.objects.bulk_create([
+                PerfilesEmpleados(codigo_perfil=1, perfil='Administrador', rol='admin'),
+                PerfilesEmpleados(codigo_perfil=2, perfil='Vendedor', rol='ventas'),
+                PerfilesEmpleados(codigo_perfil=3, perfil='Joyero', rol='taller'),
+            ])
+        perfiles = list(PerfilesEmpleados.objects.values_list('codigo_perfil', flat=True))
+
+        empleados = []
+        for n in range(volumen['empleados']):
+            nombre, apellido = self._persona()
+            empleados.append(TblEmpleados(
+                codigo_perfil_id=rng.choice(perfiles), nombre=nombre, apellido=apellido,
+                usuario=f'sintetico{n}_{rng.randint(1000, 9999)}', contrasena='sintetico',
+                telefono=rng.randint(30000000, 99999999), salario=_dinero(rng.uniform(12000, 35000))
+            ))
+        self.empleados = self._insertar(TblEmpleados, empleados)
+
+        proveedores = self._insertar(TblProvedores, [
+            TblProvedores(nombre=f'Proveedor {n + 1}', telefono=rng.randint(20000000, 99999999),
+                          direccion=rng.choice(CIUDADES))
+            for n in range(volumen['proveedores'])
+        ])
+
+        joyas = []
+        for n in range(volumen['joyas']):
+            tipo, material = rng.choice(TIPOS_JOYA), rng.choice(MATERIALES_JOYA)
+            costo = rng.lognormvariate(8, 0.7)
+            joyas.append(TblStockJoyas(
+                nombre=f'{tipo} {material} #{n + 1}'[:50], tipo=tipo, material=material,
+                peso=_dinero(rng.uniform(1, 40)), descripcion=f'{tipo} de {material}',
+                costo=_dinero(costo), precio_venta=_dinero(costo * rng.uniform(1.4, 2.2)),
+                cantidad_existencia=rng.randint(0, 15)
+            ))
+        self.joyas = self._insertar(TblStockJoyas, joyas)
+        self.precio_joya = {pk: joya.precio_venta for pk, joya in zip(self.joyas, joyas)}
+
+        self.servicios = self._insertar(TblServicios, [
+            TblServicios(nombre_servicio=f'{rng.choice(SERVICIOS)} {n + 1}'[:50],
+                         precio_base=_dinero(rng.uniform(150, 4000)))
+            for n in range(volumen['servicios'])
+        ])
+
+        self.materiales = self._insertar(TblStockMateriales, [
+            TblStockMateriales(
+                codigo_provedor_id=proveedores[_sesgado(rng, len(proveedores))],
+                nombre=f'{rng.choice(TIPOS_MATERIAL)} {n + 1}'[:50], tipo_material=rng.choice(TIPOS_MATERIAL),
+                peso=_dinero(rng.uniform(1, 500)), cantidad_existencia=rng.randint(0, 500),
+                costo=_dinero(rng.uniform(50, 3000))
+            )
+            for n in range(volumen['materiales'])
+        ])
+
+        self.insumos = self._insertar(TblStockInsumos, [
+            TblStockInsumos(
+                codigo_provedor_id=proveedores[_sesgado(rng, len(proveedores))],
+                nombre=f'{rng.choice(CATEGORIAS_INSUMO)} {n + 1}'[:50], categoria=rng.choice(CATEGORIAS_INSUMO),
+                cantidad_existencia=rng.randint(0, 300), unidad_medida=rng.choice(('unidad', 'g', 'ml')),
+                costo=_dinero(rng.uniform(5, 600))
+            )
+            for n in range(volumen['insumos'])
+        ])
+        self._informar('Catálogos', sum(volumen[k] for k in ('joyas', 'servicios', 'materiales', 'insumos')), inicio)
+
+    def clientes(self, cantidad):
+        inicio = time.perf_counter()
+        rng = self.rng
+        base = TblClientes.objects.aggregate(maximo=Max('id_cliente'))['maximo'] or 0
+        self.lista_clientes = []
+        for desde in range(0, cantidad, self.lote):
+            objetos = []
+            for n in range(desde, min(desde + self.lote, cantidad)):
+                nombre, apellido = self._persona()
+                objetos.append(TblClientes(
+                    numero_identidad=f'S{base + n:012d}', nombre=nombre, apellido=apellido,
+                    rtn=f'{rng.randint(10**13, 10**14 - 1)}' if rng.random() < 0.3 else None,
+                    direccion=rng.choice(CIUDADES), telefono=rng.randint(30000000, 99999999),
+                    correo=f'cliente{base + n}@correo.hn' if rng.random() < 0.6 else None
+                ))
+            self.lista_clientes.extend(self._insertar(TblClientes, objetos))
+        self._informar('Clientes', cantidad, inicio)
+
+    def imagenes(self, cantidad):
+        """Unas cuantas imágenes JPEG reales que comparten las cotizaciones"""
+        rutas = []
+        for n in range(cantidad):
+            color = tuple(self.rng.randint(0, 255) for _ in range(3))
+            buffer = BytesIO()
+            Image.new('RGB', (1200, 900), color).save(buffer, format='JPEG', quality=85)
+            ruta = f'{CARPETA_COTIZACIONES}/sintetica_{n + 1}.jpg'
+            if not default_storage.exists(ruta):
+                default_storage.save(ruta, ContentFile(buffer.getvalue()))
+            rutas.append(ruta)
+        return rutas
+
+    # ---------- facturas, detalles y órdenes ----------
+
+    def _lineas(self, tipo_venta):
+        rng = self.rng
+        lineas = []
+        for _ in range(_elegir(rng, LINEAS_POR_FACTURA)):
+            tipo_item = _elegir(rng, ITEMS_POR_VENTA[tipo_venta])
+            if tipo_item == 'JOYA' and self.joyas:
+                codigo = self.joyas[_sesgado(rng, len(self.joyas))]
+                cantidad, precio = 1, self.precio_joya[codigo]
+            elif tipo_item == 'SERVICIO' and self.servicios:
+                codigo = self.servicios[_sesgado(rng, len(self.servicios))]
+                cantidad, precio = 1, _dinero(rng.uniform(150, 4000))
+            elif tipo_item == 'MATERIAL' and self.materiales:
+                codigo = self.materiales[_sesgado(rng, len(self.materiales))]
+                cantidad, precio = rng.randint(1, 5), _dinero(rng.uniform(80, 3500))
+            elif tipo_item == 'INSUMO' and self.insumos:
+                codigo = self.insumos[_sesgado(rng, len(self.insumos))]
+                cantidad, precio = rng.randint(1, 10), _dinero(rng.uniform(10, 700))
+            else:
+                continue
+            descuento = _dinero(precio * cantidad * Decimal('0.1')) if rng.random() < 0.08 else Decimal('0')
+            lineas.append((tipo_item, codigo, cantidad, precio, descuento))
+        return lineas
+
+    def facturas(self, cantidad):
+        inicio = time.perf_counter()
+        rng = self.rng
+        clientes = self.lista_clientes or list(TblClientes.objects.values_list('id_cliente', flat=True))
+        total_detalles = total_ordenes = 0
+
+        for desde in range(0, cantidad, self.lote):
+            tamano = min(self.lote, cantidad - desde)
+            facturas, lineas_facturas = [], []
+            for fecha in sorted(self.calendario.fechas(tamano)):
+                tipo_venta = _elegir(rng, TIPOS_VENTA)
+                lineas = self._lineas(tipo_venta)
+                subtotal = sum((precio * cant - desc for _, _, cant, precio, desc in lineas), Decimal('0'))
+                isv = _dinero(subtotal * Decimal('0.15'))
+                # Lo reciente tiene más probabilidad de seguir pendiente
+                estado = 'PENDIENTE' if (self.hoy - fecha.date()).days < 15 and rng.random() < 0.5 \
+                    else _elegir(rng, ESTADOS_PAGO)
+                pagada = estado == 'PAGADA'
+                facturas.append(TblFacturas(
+                    id_cliente_id=clientes[_sesgado(rng, len(clientes))],
+                    id_empleado_id=rng.choice(self.empleados), fecha=fecha,
+                    direccion=rng.choice(CIUDADES), telefono=str(rng.randint(30000000, 99999999)),
+                    subtotal=subtotal, descuento=Decimal('0'), isv=isv, total=subtotal + isv,
+                    tipo_venta=tipo_venta, estado_pago=estado,
+                    metodo_pago=_elegir(rng, METODOS_PAGO) if pagada else None,
+                    fecha_pago=fecha + timedelta(days=rng.randint(0, 20)) if pagada else None,
+                ))
+                lineas_facturas.append(lineas)
+
+            numeros = self._insertar(TblFacturas, facturas, fechas=('fecha',))
+
+            detalles, ordenes = [], []
+            for numero, factura, lineas in zip(numeros, facturas, lineas_facturas):
+                detalles.extend(
+                    TblDetallesFactura(
+                        numero_factura_id=numero, tipo_item=tipo_item, codigo_item=codigo,
+                        descripcion=f'{tipo_item.title()} {codigo}', cantidad=cant,
+                        precio_unitario=precio, descuento=desc
+                    )
+                    for tipo_item, codigo, cant, precio, desc in lineas
+                )
+                if factura.tipo_venta != 'VENTA':
+                    ordenes.append(self._orden(numero, factura))
+
+            self._insertar(TblDetallesFactura, detalles)
+            self._insertar(TblOrdenesTrabajo, ordenes, fechas=('fecha_inicio',))
+            total_detalles += len(detalles)
+            total_ordenes += len(ordenes)
+            self.stdout.write(f'  facturas {desde + tamano}/{cantidad}')
+
+        self.ultima_factura = TblFacturas.objects.aggregate(maximo=Max('numero_factura'))['maximo'] or 0
+        self._informar(f'Facturas (detalles: {total_detalles}, órdenes: {total_ordenes})', cantidad, inicio)
+
+    def _orden(self, numero, factura):
+        rng = self.rng
+        dias = (self.hoy - factura.fecha.date()).days
+        if factura.estado_pago == 'CANCELADA':
+            estado = 'CANCELADA'
+        elif dias > 30:
+            estado = 'COMPLETADA'
+        else:
+            estado = rng.choice(('PENDIENTE', 'EN_PROCESO', 'COMPLETADA'))
+        return TblOrdenesTrabajo(
+            numero_factura_id=numero, id_empleado_id=factura.id_empleado_id,
+            tipo_orden=factura.tipo_venta if rng.random() < 0.9 else 'AJUSTE',
+            descripcion=f'{factura.tipo_venta.title()} para factura #{numero}',
+            fecha_inicio=factura.fecha, fecha_estimada=factura.fecha.date() + timedelta(days=rng.randint(3, 21)),
+            estado=estado, costo_mano_obra=_dinero(rng.uniform(200, 3000))
+        )
+
+    # ---------- cotizaciones y gastos ----------
+
+    def cotizaciones(self, cantidad, imagenes):
+        inicio = time.perf_counter()
+        rng = self.rng
+        clientes = self.lista_clientes
+        for desde in range(0, cantidad, self.lote):
+            objetos = []
+            for fecha in self.calendario.fechas(min(self.lote, cantidad - desde)):
+                estado = _elegir(rng, ESTADOS_COTIZACION)
+                subtotal = _dinero(rng.lognormvariate(8, 0.8))
+                isv = _dinero(subtotal * Decimal('0.15'))
+                convertida = estado == 'CONVERTIDA' and self.ultima_factura
+                objetos.append(TblCotizaciones(
+                    id_cliente_id=clientes[_sesgado(rng, len(clientes))],
+                    id_empleado_id=rng.choice(self.empleados), fecha_creacion=fecha,
+                    fecha_vencimiento=fecha.date() + timedelta(days=rng.choice((15, 30, 45))),
+                    direccion=rng.choice(CIUDADES), telefono=str(rng.randint(30000000, 99999999)),
+                    subtotal=subtotal, descuento=Decimal('0'), isv=isv, total=subtotal + isv,
+                    tipo_servicio=_elegir(rng, TIPOS_VENTA), estado=estado,
+                    numero_factura_conversion_id=rng.randint(1, self.ultima_factura) if convertida else None,
+                    fecha_conversion=fecha + timedelta(days=rng.randint(1, 10)) if convertida else None,
+                    # Las de fabricación suelen traer foto de referencia
+                    imagen_referencia=rng.choice(imagenes) if imagenes and rng.random() < 0.4 else None,
+                ))
+            self._insertar(TblCotizaciones, objetos, fechas=('fecha_creacion',))
+        self._informar('Cotizaciones', cantidad, inicio)
+
+    def gastos(self, por_mes, anios):
+        inicio = time.perf_counter()
+        rng = self.rng
+        objetos = []
+        anio, mes = self.hoy.year - anios, self.hoy.month
+        while (anio, mes) <= (self.hoy.year, self.hoy.month):
+            ultimo = calendar.monthrange(anio, mes)[1]
+            for _ in range(por_mes):
+                dia = date(anio, mes, rng.randint(1, ultimo))
+                if dia > self.hoy:
+                    continue
+                objetos.append(TblGastos(
+                    fecha_gasto=dia, tipo_gasto=_elegir(rng, TIPOS_GASTO),
+                    descripcion='Gasto generado', monto=_dinero(rng.lognormvariate(7, 1)),
+                    proveedor=f'Proveedor {rng.randint(1, 50)}' if rng.random() < 0.6 else None,
+                    id_empleado=rng.choice(self.empleados)
+                ))
+            anio, mes = (anio + 1, 1) if mes == 12 else (anio, mes + 1)
+        self._insertar(TblGastos, objetos)
+        self._informar('Gastos', len(objetos), inicio)
@@ -0,0 +1,39 @@
+# backend/api/management/commands/generar_derivados_cotizaciones.py
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from api.imagenes import derivados_cotizacion_existentes, generar_derivados_cotizacion
+from api.models import TblCotizaciones
+
+
+class Command(BaseCommand):
+    help = 'Genera la miniatura y la versión media (WebP) de las imágenes de cotizaciones que no las tengan'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--todas', action='store_true', help='Regenerar también las que ya existen')
+
+    def handle(self, *args, **options):
+        imagenes = (
+            TblCotizaciones.objects.exclude(imagen_referencia__isnull=True).exclude(imagen_referencia='')
+            .values_list('imagen_referencia', flat=True).distinct()
+        )
+
+        generadas = omitidas = errores = 0
+        for imagen in imagenes.iterator():
+            if not default_storage.exists(imagen):
+                errores += 1
+                self.stderr.write(f'No existe el archivo {imagen}')
+                continue
+            if not options['todas'] and all(derivados_cotizacion_existentes(imagen).values()):
+                omitidas += 1
+                continue
+            try:
+                generar_derivados_cotizacion(imagen)
+                generadas += 1
+            except Exception as e:
+                errores += 1
+                self.stderr.write(f'Error con {imagen}: {e}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Derivados generados: {generadas}, ya existentes: {omitidas}, con error: {errores}'
+        ))
@@ -0,0 +1,322 @@
+# backend/api/management/commands/medir_endpoints.py
+import io
+import json
+import platform
+import statistics
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+from datetime import datetime
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+from api.management.commands.generar_datos_sinteticos import TAMANOS
+from api.models import (
+    TblClientes, TblEmpleados, TblStockJoyas, TblServicios, TblStockMateriales, TblStockInsumos,
+    TblFacturas, TblDetallesFactura, TblCotizaciones, TblOrdenesTrabajo, TblProvedores,
+)
+
+BASELINE_POR_DEFECTO = Path(settings.BASE_DIR) / 'benchmark_baseline.json'
+
+# (nombre, método, ruta). Los POST se ejecutan dentro de una transacción que se revierte,
+# así el volumen de datos es el mismo en cada iteración y en cada corrida
+RUTAS = (
+    ('joyas', 'GET', '/api/joyas/'),
+    ('facturas-completas', 'GET', '/api/facturas/completas/'),
+    ('cotizaciones', 'GET', '/api/cotizaciones/'),
+    ('ordenes-trabajo', 'GET', '/api/ordenes-trabajo/'),
+    ('dashboard-kpis', 'GET', '/api/dashboard/kpis/'),
+    ('proveedores-estadisticas', 'GET', '/api/proveedores/estadisticas/'),
+    ('facturas-crear-completa', 'POST', '/api/facturas/crear-completa/'),
+    ('facturas-crear-simple', 'POST', '/api/facturas/crear-simple/'),
+)
+
+# Volumen de la base medida (se guarda junto con los resultados)
+MODELOS_VOLUMEN = {
+    'facturas': TblFacturas, 'detalles': TblDetallesFactura, 'cotizaciones': TblCotizaciones,
+    'ordenes': TblOrdenesTrabajo, 'clientes': TblClientes, 'joyas': TblStockJoyas,
+    'proveedores': TblProvedores,
+}
+
+
+def percentil(valores, p):
+    """Percentil p (0-100) con interpolación lineal entre muestras ordenadas"""
+    ordenados = sorted(valores)
+    if len(ordenados) == 1:
+        return ordenados[0]
+    posicion = (len(ordenados) - 1) * p / 100
+    abajo = int(posicion)
+    arriba = min(abajo + 1, len(ordenados) - 1)
+    return ordenados[abajo] + (ordenados[arriba] - ordenados[abajo]) * (posicion - abajo)
+
+
+def exitosa(resultado):
+    """True si todas las peticiones medidas de la ruta respondieron 2xx"""
+    return all(200 <= status < 300 for status in resultado['status'])
+
+
+def _cargas_utiles():
+    """Cuerpos de los POST armados con registros reales de la base medida"""
+    cliente = TblClientes.objects.order_by('pk').first()
+    empleado = TblEmpleados.objects.order_by('pk').first()
+    joya = TblStockJoyas.objects.order_by('pk').first()
+    servicio = TblServicios.objects.order_by('pk').first()
+    material = TblStockMateriales.objects.order_by('pk').first()
+    insumo = TblStockInsumos.objects.order_by('pk').first()
+    if not all((cliente, empleado, joya, servicio, material, insumo)):
+        return {}
+
+    encabezado = {
+        'id_cliente': cliente.pk, 'id_empleado': empleado.pk,
+        'direccion': cliente.direccion or 'Tegucigalpa', 'telefono': str(cliente.telefono or '99990000'),
+        'tipo_venta': 'VENTA', 'observaciones': 'benchmark',
+    }
+    completa = {
+        **encabezado,
+        'detalles': [
+            {'tipo_item': 'JOYA', 'codigo_item': joya.pk, 'descripcion': joya.nombre or 'Joya',
+             'cantidad': 1, 'precio_unitario': '1500.00'},
+            {'tipo_item': 'SERVICIO', 'codigo_item': servicio.pk,
+             'descripcion': servicio.nombre_servicio or 'Servicio', 'cantidad': 1, 'precio_unitario': '250.00'},
+            {'tipo_item': 'MATERIAL', 'codigo_item': material.pk, 'descripcion': material.nombre or 'Material',
+             'cantidad': 1, 'precio_unitario': '800.00'},
+            {'tipo_item': 'INSUMO', 'codigo_item': insumo.pk, 'descripcion': insumo.nombre or 'Insumo',
+             'cantidad': 2, 'precio_unitario': '35.00'},
+        ],
+    }
+    simple = {
+        **encabezado,
+        'subtotal': '2335.00', 'descuento': '0', 'isv': '350.25', 'total': '2685.25',
+        'productos': [
+            {'codigo': joya.pk, 'producto': joya.nombre or 'Joya', 'descripcion': 'benchmark',
+             'cantidad': 1, 'precio': '1500.00'},
+        ],
+        'materiales': [
+            {'codigo_material': material.pk, 'tipo': material.nombre or 'Material', 'peso': 1, 'costo': '800.00'},
+        ],
+    }
+    return {'facturas-crear-completa': completa, 'facturas-crear-simple': simple}
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide en proceso las rutas más usadas de la API (latencia p50/p90/p95/p99, peticiones '
+        'por segundo, consultas SQL y pico de memoria) y compara con una línea base guardada. '
+        'Usar con --settings=backend.settings_benchmark'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tamanos', nargs='+', choices=TAMANOS,
+                            help='Regenerar la base con cada tamaño de generar_datos_sinteticos y medir '
+                                 '(sin esta opción se mide la base actual)')
+        parser.add_argument('--rutas', nargs='+', metavar='RUTA', choices=[r[0] for r in RUTAS],
+                            help='Medir solo estas rutas')
+        parser.add_argument('--iteraciones', type=int, default=30, help='Peticiones medidas por ruta')
+        parser.add_argument('--calentamiento', type=int, default=3, help='Peticiones previas sin medir')
+        parser.add_argument('--tiempo-max', type=float, default=60.0,
+                            help='Segundos máximos por ruta (se corta con al menos 5 muestras)')
+        parser.add_argument('--sin-cache', action='store_true',
+                            help='Vaciar la caché antes de cada petición (mide el cálculo, no el acierto)')
+        parser.add_argument('--baseline', default=str(BASELINE_POR_DEFECTO), help='Archivo JSON de la línea base')
+        parser.add_argument('--guardar-baseline', action='store_true',
+                            help='Guardar estos resultados como la nueva línea base')
+        parser.add_argument('--tolerancia', type=float, default=0.2,
+                            help='Variación relativa de latencia/memoria aceptada frente a la línea base')
+        parser.add_argument('--estricto', action='store_true', help='Terminar con error si hay regresiones')
+        parser.add_argument('--salida', help='Escribir también el reporte completo en este archivo JSON')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError(
+                'Mida sobre la base local: use --settings=backend.settings_benchmark'
+            )
+
+        rutas = [r for r in RUTAS if not options['rutas'] or r[0] in options['rutas']]
+        reporte = {
+            'fecha': datetime.now().isoformat(timespec='seconds'),
+            'entorno': {
+                'python': platform.python_version(), 'django': django.get_version(),
+                'plataforma': platform.platform(), 'base': connection.vendor,
+            },
+            'opciones': {k: options[k] for k in ('iteraciones', 'calentamiento', 'sin_cache')},
+            'tamanos': {},
+        }
+
+        for tamano in options['tamanos'] or ['actual']:
+            if tamano != 'actual':
+                self._preparar_base(tamano)
+            volumen = {nombre: modelo.objects.count() for nombre, modelo in MODELOS_VOLUMEN.items()}
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f'\nTamaño {tamano}: ' + ', '.join(f'{n}={c}' for n, c in volumen.items())
+            ))
+
+            cargas = _cargas_utiles()
+            resultados, fallidas = {}, {}
+            for nombre, metodo, ruta in rutas:
+                if metodo == 'POST' and nombre not in cargas:
+                    self.stdout.write(self.style.WARNING(f'  {nombre}: sin datos para armar la petición'))
+                    continue
+                resultado = self._medir(metodo, ruta, cargas.get(nombre), options)
+                self._imprimir(nombre, resultado)
+                # Una página de error no es una medición: no entra en el reporte ni en la línea base
+                if exitosa(resultado):
+                    resultados[nombre] = resultado
+                else:
+                    fallidas[nombre] = resultado['status']
+            reporte['tamanos'][tamano] = {'volumen': volumen, 'rutas': resultados, 'fallidas': fallidas}
+
+        regresiones = self._comparar(reporte, options)
+        fallidas = [
+            f'[{tamano}] {nombre} (status {",".join(map(str, estados))})'
+            for tamano, datos in reporte['tamanos'].items()
+            for nombre, estados in datos['fallidas'].items()
+        ]
+
+        if options['salida']:
+            Path(options['salida']).write_text(json.dumps(reporte, indent=2, ensure_ascii=False), encoding='utf-8')
+        if options['guardar_baseline']:
+            if fallidas:
+                self.stdout.write(self.style.ERROR('\nLínea base NO guardada: hay rutas con error'))
+            else:
+                Path(options['baseline']).write_text(json.dumps(reporte, indent=2, ensure_ascii=False), encoding='utf-8')
+                self.stdout.write(self.style.SUCCESS(f'\nLínea base guardada en {options["baseline"]}'))
+
+        if fallidas:
+            raise CommandError(f'Rutas que no respondieron 2xx: {"; ".join(fallidas)}')
+        if regresiones and options['estricto']:
+            raise CommandError(f'{regresiones} regresiones frente a la línea base')
+
+    def _preparar_base(self, tamano):
+        self.stdout.write(f'Generando base de tamaño {tamano}...')
+        call_command('crear_esquema_local', reiniciar=True, stdout=io.StringIO())
+        call_command('generar_datos_sinteticos', tamano=tamano, stdout=io.StringIO())
+        self._limpiar_caches()
+
+    def _limpiar_caches(self):
+        for alias in caches:
+            caches[alias].clear()
+
+    def _peticion(self, client, metodo, ruta, carga, sin_cache):
+        """Hace una petición completa (incluido el contenido streaming); devuelve el status"""
+        if sin_cache:
+            self._limpiar_caches()
+        # Las vistas registran con print(); no mezclar eso con el reporte
+        with redirect_stdout(io.StringIO()):
+            if metodo == 'GET':
+                response = client.get(ruta)
+            else:
+                with transaction.atomic():
+                    response = client.post(ruta, data=carga, content_type='application/json')
+                    transaction.set_rollback(True)
+            if response.streaming:
+                for _ in response.streaming_content:
+                    pass
+            else:
+                response.content
+        return response.status_code
+
+    def _medir(self, metodo, ruta, carga, options):
+        client = Client(raise_request_exception=False)
+        pedir = lambda: self._peticion(client, metodo, ruta, carga, options['sin_cache'])
+
+        for _ in range(options['calentamiento']):
+            pedir()
+
+        # Latencia: sin trazas de memoria ni captura de consultas, que agregan costo propio
+        tiempos, estados = [], set()
+        inicio_ruta = time.perf_counter()
+        for n in range(options['iteraciones']):
+            inicio = time.perf_counter()
+            estados.add(pedir())
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+            if n >= 4 and time.perf_counter() - inicio_ruta > options['tiempo_max']:
+                break
+
+        # Consultas y pico de memoria en una petición aparte
+        tracemalloc.start()
+        try:
+            base_memoria = tracemalloc.get_traced_memory()[0]
+            with CaptureQueriesContext(connection) as consultas:
+                estados.add(pedir())
+            pico = tracemalloc.get_traced_memory()[1] - base_memoria
+        finally:
+            tracemalloc.stop()
+
+        total_s = sum(tiempos) / 1000
+        return {
+            'metodo': metodo,
+            'ruta': ruta,
+            'status': sorted(estados),
+            'muestras': len(tiempos),
+            'p50_ms': round(percentil(tiempos, 50), 2),
+            'p90_ms': round(percentil(tiempos, 90), 2),
+            'p95_ms': round(percentil(tiempos, 95), 2),
+            'p99_ms': round(percentil(tiempos, 99), 2),
+            'max_ms': round(max(tiempos), 2),
+            'media_ms': round(statistics.fmean(tiempos), 2),
+            'peticiones_por_s': round(len(tiempos) / total_s, 2) if total_s else None,
+            'consultas': len(consultas),
+            'pico_memoria_kb': round(pico / 1024, 1),
+        }
+
+    def _imprimir(self, nombre, r):
+        linea = (
+            f"  {nombre:<26} p50={r['p50_ms']:>9.2f}ms p95={r['p95_ms']:>9.2f}ms p99={r['p99_ms']:>9.2f}ms "
+            f"{r['peticiones_por_s'] or 0:>8.1f} req/s consultas={r['consultas']:<4} "
+            f"memoria={r['pico_memoria_kb']:>9.1f}KB status={','.join(map(str, r['status']))}"
+        )
+        estilo = (lambda texto: texto) if exitosa(r) else self.style.ERROR
+        self.stdout.write(estilo(linea))
+
+    def _comparar(self, reporte, options):
+        """Compara contra la línea base; devuelve el número de regresiones"""
+        archivo = Path(options['baseline'])
+        if not archivo.exists():
+            self.stdout.write(f'\nSin línea base en {archivo} (use --guardar-baseline para crearla)')
+            return 0
+
+        base = json.loads(archivo.read_text(encoding='utf-8'))
+        tolerancia = options['tolerancia']
+        regresiones = 0
+        self.stdout.write(self.style.MIGRATE_HEADING(f'\nComparación con la línea base del {base.get("fecha")}'))
+
+        for tamano, datos in reporte['tamanos'].items():
+            rutas_base = base.get('tamanos', {}).get(tamano, {}).get('rutas', {})
+            for nombre, actual in datos['rutas'].items():
+                anterior = rutas_base.get(nombre)
+                # Líneas base viejas pueden traer rutas medidas con error: no sirven para comparar
+                if anterior is None or not exitosa(anterior):
+                    continue
+
+                problemas, mejoras = [], []
+                for campo in ('p50_ms', 'p95_ms', 'pico_memoria_kb'):
+                    if not anterior[campo]:
+                        continue
+                    cambio = actual[campo] / anterior[campo] - 1
+                    if cambio > tolerancia:
+                        problemas.append(f'{campo} +{cambio:.0%}')
+                    elif cambio < -tolerancia:
+                        mejoras.append(f'{campo} {cambio:.0%}')
+                # Las consultas son deterministas: cualquier aumento cuenta
+                if actual['consultas'] > anterior['consultas']:
+                    problemas.append(f"consultas {anterior['consultas']} -> {actual['consultas']}")
+                elif actual['consultas'] < anterior['consultas']:
+                    mejoras.append(f"consultas {anterior['consultas']} -> {actual['consultas']}")
+
+                detalle = f"  [{tamano}] {nombre}: p95 {anterior['p95_ms']} -> {actual['p95_ms']} ms"
+                if problemas:
+                    regresiones += 1
+                    self.stdout.write(self.style.ERROR(f"{detalle}  REGRESIÓN: {', '.join(problemas)}"))
+                elif mejoras:
+                    self.stdout.write(self.style.SUCCESS(f"{detalle}  mejora: {', '.join(mejoras)}"))
+                else:
+                    self.stdout.write(f'{detalle}  sin cambios')
+        return regresiones
@@ -0,0 +1,62 @@
+# backend/api/management/commands/medir_lectura_rapida.py
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.lectura_rapida import LectorValores
+from api.management.commands.medir_endpoints import percentil
+from api.renderers import RendererJSONRapido
+from api.serializers import ClienteSerializer, OrdenTrabajoSerializer, StockMaterialSerializer
+
+SERIALIZERS = {
+    'clientes': ClienteSerializer,
+    'ordenes-trabajo': OrdenTrabajoSerializer,
+    'materiales': StockMaterialSerializer,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara el serializer de DRF con LectorValores (api/lectura_rapida.py) al listar: '
+        'tiempos (consulta + armado de la lista) y que el JSON sea idéntico. '
+        'Usar con --settings=backend.settings_benchmark'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--filas', type=int, default=2000, help='Filas por lista')
+        parser.add_argument('--iteraciones', type=int, default=10)
+
+    def handle(self, *args, **options):
+        renderer = RendererJSONRapido()
+
+        for nombre, serializer_class in SERIALIZERS.items():
+            queryset = serializer_class.Meta.model.objects.order_by('-pk')[:options['filas']]
+            lector = LectorValores(serializer_class)
+
+            def original():
+                return serializer_class(queryset, many=True).data
+
+            def rapido():
+                return lector.representar(lector.valores(queryset))
+
+            esperado = renderer.render(original())
+            if renderer.render(rapido()) != esperado:
+                raise CommandError(f'{nombre}: LectorValores no produce el mismo JSON que {serializer_class.__name__}')
+
+            t_original = self._medir(original, options['iteraciones'])
+            t_rapido = self._medir(rapido, options['iteraciones'])
+            self.stdout.write(
+                f'  {nombre:<16} {queryset.count():>6} filas | '
+                f'serializer p50={percentil(t_original, 50):9.2f}ms p95={percentil(t_original, 95):9.2f}ms | '
+                f'values() p50={percentil(t_rapido, 50):8.2f}ms p95={percentil(t_rapido, 95):8.2f}ms | '
+                f'{percentil(t_original, 50) / percentil(t_rapido, 50):5.1f}x'
+            )
+
+    def _medir(self, funcion, iteraciones):
+        funcion()
+        tiempos = []
+        for _ in range(iteraciones):
+            inicio = time.perf_counter()
+            funcion()
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+        return tiempos
@@ -0,0 +1,72 @@
+# backend/api/management/commands/medir_renderers.py
+import io
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from api.campos import campos_lista
+from api.management.commands.medir_endpoints import percentil
+from api.parsers import ParserJSONRapido
+from api.querysets import facturas_con_relaciones
+from api.renderers import RendererJSONRapido, orjson
+from api.serializers import FacturaSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara el JSONRenderer/JSONParser de DRF con los de orjson (api/renderers.py) '
+        'sobre los datos de facturas/completas: tiempos y que el JSON sea idéntico. '
+        'Usar con --settings=backend.settings_benchmark'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--facturas', type=int, default=2000, help='Facturas (con detalles) a codificar')
+        parser.add_argument('--iteraciones', type=int, default=20)
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            raise CommandError('orjson no está instalado: RendererJSONRapido usa el JSONRenderer de DRF')
+
+        facturas = facturas_con_relaciones().order_by('-numero_factura')[:options['facturas']]
+        # El mismo contenido que facturas/completas (con detalles)
+        context = {'campos': campos_lista(None, expandir=('detalles',))}
+        data = FacturaSerializer(facturas, many=True, context=context).data
+        if not data:
+            raise CommandError('No hay facturas; genere datos con generar_datos_sinteticos')
+
+        drf, rapido = JSONRenderer(), RendererJSONRapido()
+        esperado = drf.render(data)
+        if rapido.render(data) != esperado:
+            raise CommandError('RendererJSONRapido no produce el mismo JSON que JSONRenderer')
+        if ParserJSONRapido().parse(io.BytesIO(esperado)) != JSONParser().parse(io.BytesIO(esperado)):
+            raise CommandError('ParserJSONRapido no produce los mismos datos que JSONParser')
+
+        self.stdout.write(
+            f'{len(data)} facturas, {sum(len(f["detalles"]) for f in data)} detalles, '
+            f'{len(esperado) / 1024:.0f} KB de JSON (idéntico con ambos renderers)'
+        )
+
+        casos = (
+            ('render', lambda: drf.render(data), lambda: rapido.render(data)),
+            ('parse', lambda: JSONParser().parse(io.BytesIO(esperado)),
+             lambda: ParserJSONRapido().parse(io.BytesIO(esperado))),
+        )
+        for nombre, original, nuevo in casos:
+            t_original = self._medir(original, options['iteraciones'])
+            t_nuevo = self._medir(nuevo, options['iteraciones'])
+            self.stdout.write(
+                f'  {nombre:<7} DRF p50={percentil(t_original, 50):8.2f}ms p95={percentil(t_original, 95):8.2f}ms | '
+                f'orjson p50={percentil(t_nuevo, 50):8.2f}ms p95={percentil(t_nuevo, 95):8.2f}ms | '
+                f'{percentil(t_original, 50) / percentil(t_nuevo, 50):5.1f}x'
+            )
+
+    def _medir(self, funcion, iteraciones):
+        funcion()
+        tiempos = []
+        for _ in range(iteraciones):
+            inicio = time.perf_counter()
+            funcion()
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+        return tiempos
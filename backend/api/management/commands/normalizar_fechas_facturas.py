@@ -0,0 +1,120 @@
+# backend/api/management/commands/normalizar_fechas_facturas.py
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api import configuracion
+from api.models import TblFacturas
+from api.periodos import ahora_local, utc_a_local
+from api.resumen_ventas import reconstruir_resumen
+from dashboard.cache import invalidar_kpis
+
+# Progreso del backfill, para poder interrumpirlo y continuar
+CLAVE_ULTIMA = 'facturas.fecha.backfill.ultima'
+
+# Una fecha en hora local no puede estar en el futuro: las facturas con fecha posterior
+# a ahora_local() + margen se guardaron en UTC (hasta 6 horas adelante)
+MARGEN_FUTURO = timedelta(hours=1)
+
+
+class Command(BaseCommand):
+    help = (
+        'Deja Tbl_Facturas.fecha en hora local de Honduras y registra la convención en '
+        'Tbl_Configuracion. Procesa por lotes y se puede interrumpir y volver a ejecutar.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--origen', choices=[configuracion.CONVENCION_UTC, configuracion.CONVENCION_LOCAL],
+            help='Cómo están guardadas hoy las facturas existentes (obligatorio la primera vez)'
+        )
+        parser.add_argument('--lote', type=int, default=1000, help='Facturas por transacción')
+        parser.add_argument(
+            '--espera', type=float, default=10,
+            help='Segundos que se esperan tras el cambio a hora local antes de la última revisión'
+        )
+
+    def handle(self, *args, **options):
+        lote = options['lote']
+        ultima = configuracion.obtener(CLAVE_ULTIMA)
+
+        if ultima is None:
+            origen = options['origen']
+            if configuracion.convencion_fechas_facturas() == configuracion.CONVENCION_LOCAL:
+                # Convertir de nuevo restaría otras 6 horas a todo el historial
+                if origen == configuracion.CONVENCION_UTC:
+                    raise CommandError('Las fechas ya están en hora local; no se vuelven a convertir')
+                corregidas = self._corregir_recientes()
+                self.stdout.write(self.style.SUCCESS(
+                    f'Las fechas ya están en hora local ({corregidas} facturas recientes corregidas)'
+                ))
+                return
+            if origen is None:
+                raise CommandError('Indique --origen utc o --origen local')
+
+            if origen == configuracion.CONVENCION_LOCAL:
+                self._terminar(options['espera'])
+                self.stdout.write(self.style.SUCCESS('Convención registrada: hora local'))
+                return
+
+            configuracion.guardar(configuracion.CLAVE_CONVENCION_FECHAS, configuracion.CONVENCION_UTC)
+            configuracion.guardar(CLAVE_ULTIMA, 0)
+            ultima = 0
+
+        # Mientras la convención sea 'utc' las facturas nuevas también se guardan en UTC
+        # (FechaHoraLocalField): se convierte hasta alcanzar la última, sin tope fijo
+        ultima = int(ultima)
+        convertidas = 0
+
+        while True:
+            facturas = list(
+                TblFacturas.objects.filter(numero_factura__gt=ultima)
+                .order_by('numero_factura').only('numero_factura', 'fecha')[:lote]
+            )
+            if not facturas:
+                break
+
+            for factura in facturas:
+                if factura.fecha is not None:
+                    factura.fecha = utc_a_local(factura.fecha)
+
+            # El lote y el avance se guardan juntos: al reanudar no se convierte dos veces
+            with transaction.atomic():
+                TblFacturas.objects.bulk_update(facturas, ['fecha'], batch_size=500)
+                ultima = facturas[-1].numero_factura
+                configuracion.guardar(CLAVE_ULTIMA, ultima)
+
+            convertidas += len(facturas)
+            self.stdout.write(f'Convertidas {convertidas} facturas (hasta #{ultima})')
+
+        convertidas += self._terminar(options['espera'])
+        self.stdout.write(self.style.SUCCESS(f'Fechas normalizadas a hora local: {convertidas} facturas'))
+
+    def _terminar(self, espera):
+        with transaction.atomic():
+            configuracion.guardar(configuracion.CLAVE_CONVENCION_FECHAS, configuracion.CONVENCION_LOCAL)
+            configuracion.eliminar(CLAVE_ULTIMA)
+
+        # Una venta que leyó la convención antes del cambio puede confirmar después del
+        # último lote con la fecha en UTC: esperar a que terminen y corregirlas
+        if espera:
+            time.sleep(espera)
+        corregidas = self._corregir_recientes()
+
+        with transaction.atomic():
+            # El resumen diario agrupa por día local según la convención: recalcularlo con la nueva
+            reconstruir_resumen()
+            invalidar_kpis()
+        return corregidas
+
+    def _corregir_recientes(self):
+        """Facturas guardadas en UTC después del último lote (fecha en el futuro local)"""
+        facturas = list(
+            TblFacturas.objects.filter(fecha__gt=ahora_local() + MARGEN_FUTURO).only('numero_factura', 'fecha')
+        )
+        for factura in facturas:
+            factura.fecha = utc_a_local(factura.fecha)
+        TblFacturas.objects.bulk_update(facturas, ['fecha'], batch_size=500)
+        return len(facturas)
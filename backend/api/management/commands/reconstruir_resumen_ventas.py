@@ -0,0 +1,12 @@
+# backend/api/management/commands/reconstruir_resumen_ventas.py
+from django.core.management.base import BaseCommand
+
+from api.resumen_ventas import reconstruir_resumen
+
+
+class Command(BaseCommand):
+    help = 'Recalcula Tbl_Resumen_Ventas_Diarias a partir de Tbl_Facturas'
+
+    def handle(self, *args, **options):
+        filas = reconstruir_resumen()
+        self.stdout.write(self.style.SUCCESS(f'Resumen de ventas reconstruido: {filas} filas'))
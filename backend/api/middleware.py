@@ -0,0 +1,295 @@
+# backend/api/middleware.py
+import hashlib
+import logging
+import time
+import zlib
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:  # Brotli es opcional: sin el paquete solo se ofrece gzip
+    brotli = None
+
+logger = logging.getLogger('api.sql')
+
+# Valores por defecto; se sobreescriben con settings.SQL_PRESUPUESTO
+PRESUPUESTO_POR_DEFECTO = {
+    'activo': False,        # sin activar, Django quita el middleware al arrancar
+    'consultas': 50,        # máximo de consultas por petición
+    'tiempo_ms': 500,       # máximo de tiempo total en base de datos
+    'estricto': False,      # True: lanzar PresupuestoSQLExcedido (útil en tests)
+    'por_vista': {},        # {'nombre-de-url': {'consultas': 10, ...}}
+}
+
+
+class PresupuestoSQLExcedido(Exception):
+    """Una petición hizo más consultas (o pasó más tiempo en BD) que su presupuesto"""
+
+
+class _RegistroConsultas:
+    """execute_wrapper que guarda SQL y duración de cada consulta de la petición"""
+
+    def __init__(self):
+        self.consultas = []
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.consultas.append((sql, (time.perf_counter() - inicio) * 1000))
+
+    def resumen(self):
+        total_ms = sum(duracion for _, duracion in self.consultas)
+        lenta_sql, lenta_ms = max(self.consultas, key=lambda c: c[1], default=('', 0.0))
+        # Misma sentencia con distintos parámetros = típico N+1
+        repetidas = Counter(sql for sql, _ in self.consultas)
+        duplicadas = sum(veces - 1 for veces in repetidas.values() if veces > 1)
+        mas_repetida, veces = repetidas.most_common(1)[0] if repetidas else ('', 0)
+        return {
+            'consultas': len(self.consultas),
+            'tiempo_ms': round(total_ms, 2),
+            'lenta_ms': round(lenta_ms, 2),
+            'lenta_sql': lenta_sql,
+            'duplicadas': duplicadas,
+            'mas_repetida': mas_repetida if veces > 1 else '',
+            'mas_repetida_veces': veces if veces > 1 else 0,
+        }
+
+
+def _configuracion():
+    return {**PRESUPUESTO_POR_DEFECTO, **getattr(settings, 'SQL_PRESUPUESTO', {})}
+
+
+def _presupuesto(request):
+    configurado = _configuracion()
+    match = getattr(request, 'resolver_match', None)
+    nombre = match.url_name if match else None
+    return {**configurado, **configurado['por_vista'].get(nombre, {})}, nombre
+
+
+class InstrumentacionSQLMiddleware:
+    """
+    Mide las consultas SQL de cada petición (todas las conexiones):
+    - Cabeceras: X-DB-Queries, X-DB-Time-ms, X-DB-Slowest-ms, X-DB-Duplicates.
+    - Una línea en el logger 'api.sql' con el resumen (extra={'sql': {...}}).
+    - Si se pasa del presupuesto (settings.SQL_PRESUPUESTO) registra un warning,
+      o lanza PresupuestoSQLExcedido si 'estricto' es True.
+    - Solo con SQL_PRESUPUESTO['activo'] (por defecto DEBUG): expone tiempos y
+      consultas de la base, no va en producción.
+    En respuestas streaming las cabeceras salen antes que los datos: no se ponen,
+    y el resumen se registra al terminar de enviar, con las consultas de todos los lotes.
+    """
+
+    def __init__(self, get_response):
+        if not _configuracion()['activo']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        registro = _RegistroConsultas()
+        with self._midiendo(registro):
+            response = self.get_response(request)
+
+        if response.streaming and not getattr(response, 'is_async', False):
+            response.streaming_content = self._medir_stream(response.streaming_content, registro, request, response)
+            return response
+
+        datos = registro.resumen()
+        response['X-DB-Queries'] = str(datos['consultas'])
+        response['X-DB-Time-ms'] = f"{datos['tiempo_ms']:.2f}"
+        response['X-DB-Slowest-ms'] = f"{datos['lenta_ms']:.2f}"
+        response['X-DB-Duplicates'] = str(datos['duplicadas'])
+        self._registrar(request, response, datos)
+        return response
+
+    def _midiendo(self, registro):
+        pila = ExitStack()
+        for alias in connections:
+            pila.enter_context(connections[alias].execute_wrapper(registro))
+        return pila
+
+    def _medir_stream(self, contenido, registro, request, response):
+        # Las consultas de cada lote se ejecutan al iterar, fuera de get_response()
+        with self._midiendo(registro):
+            yield from contenido
+        self._registrar(request, response, registro.resumen())
+
+    def _registrar(self, request, response, datos):
+        presupuesto, vista = _presupuesto(request)
+        excedido = (
+            datos['consultas'] > presupuesto['consultas']
+            or datos['tiempo_ms'] > presupuesto['tiempo_ms']
+        )
+        mensaje = (
+            f"{request.method} {request.path} vista={vista} status={response.status_code} "
+            f"consultas={datos['consultas']} tiempo_ms={datos['tiempo_ms']} "
+            f"lenta_ms={datos['lenta_ms']} duplicadas={datos['duplicadas']}"
+        )
+        extra = {'sql': {'metodo': request.method, 'ruta': request.path, 'vista': vista,
+                         'status': response.status_code, **datos}}
+
+        if excedido:
+            logger.warning('Presupuesto SQL excedido: %s', mensaje, extra=extra)
+            if presupuesto['estricto']:
+                raise PresupuestoSQLExcedido(
+                    f"{mensaje} (presupuesto: {presupuesto['consultas']} consultas, "
+                    f"{presupuesto['tiempo_ms']} ms; más repetida x{datos['mas_repetida_veces']}: "
+                    f"{datos['mas_repetida'][:200]})"
+                )
+        else:
+            logger.info(mensaje, extra=extra)
+
+
+# Valores por defecto; se sobreescriben con settings.COMPRESION
+COMPRESION_POR_DEFECTO = {
+    'minimo_bytes': 1024,       # respuestas más pequeñas no compensan la compresión
+    'nivel_gzip': 6,
+    'calidad_brotli': 5,        # rápida para respuestas dinámicas
+    'calidad_brotli_cache': 9,  # más lenta pero se hace una vez por ETag
+    'cache_segundos': 3600,     # cuerpos ya comprimidos de respuestas con ETag
+}
+
+# Tipos que vale la pena comprimir (las imágenes ya vienen comprimidas)
+TIPOS_COMPRIMIBLES = (
+    'application/json', 'application/msgpack', 'text/', 'application/javascript', 'application/xml',
+)
+
+
+def _codificacion_aceptada(accept_encoding):
+    """'br' o 'gzip' según Accept-Encoding (respeta q=0); None si no acepta ninguna"""
+    calidades = {}
+    for parte in accept_encoding.split(','):
+        nombre, _, parametros = parte.strip().partition(';')
+        q = 1.0
+        parametros = parametros.strip()
+        if parametros.startswith('q='):
+            try:
+                q = float(parametros[2:])
+            except ValueError:
+                q = 0.0
+        calidades[nombre.strip().lower()] = q
+
+    ofrecidas = ('br', 'gzip') if brotli is not None else ('gzip',)
+    candidatas = [
+        (calidades.get(nombre, calidades.get('*', 0.0)), -orden, nombre)
+        for orden, nombre in enumerate(ofrecidas)
+    ]
+    q, _, nombre = max(candidatas)
+    return nombre if q > 0 else None
+
+
+class _Compresor:
+    """Misma interfaz para gzip y brotli: comprimir(bytes) -> bytes y terminar() -> bytes"""
+
+    def __init__(self, codificacion, nivel):
+        self.codificacion = codificacion
+        if codificacion == 'br':
+            self._brotli = brotli.Compressor(quality=nivel)
+        else:
+            # wbits=31: formato gzip (cabecera y CRC), no deflate crudo
+            self._zlib = zlib.compressobj(nivel, zlib.DEFLATED, 31)
+
+    def comprimir(self, datos, vaciar=False):
+        if self.codificacion == 'br':
+            salida = self._brotli.process(datos)
+            return salida + self._brotli.flush() if vaciar else salida
+        salida = self._zlib.compress(datos)
+        return salida + self._zlib.flush(zlib.Z_SYNC_FLUSH) if vaciar else salida
+
+    def terminar(self):
+        if self.codificacion == 'br':
+            return self._brotli.finish()
+        return self._zlib.flush()
+
+
+class CompresionMiddleware:
+    """
+    Compresión negociada (Brotli si está instalado, si no gzip) de respuestas JSON/texto:
+    - Solo a partir de 'minimo_bytes' y si el cliente la acepta (Accept-Encoding).
+    - Streaming (facturas/completas): cada lote se comprime y se envía al salir
+      del generador, sin juntar la respuesta completa en memoria.
+    - Respuestas con ETag (catálogos, ver api/cambios.py): el cuerpo comprimido se
+      guarda en caché por ETag y codificación; mientras la marca no cambie no se
+      vuelve a comprimir.
+    Va arriba en MIDDLEWARE: debe ver la respuesta ya terminada por las demás.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.config = {**COMPRESION_POR_DEFECTO, **getattr(settings, 'COMPRESION', {})}
+
+    def __call__(self, request):
+        response = self.get_response(request)
+
+        tipo = response.get('Content-Type', '')
+        if (
+            response.status_code != 200
+            or response.has_header('Content-Encoding')
+            or not tipo.startswith(TIPOS_COMPRIMIBLES)
+        ):
+            return response
+
+        # La respuesta depende de Accept-Encoding aunque esta vez no se comprima
+        patch_vary_headers(response, ('Accept-Encoding',))
+        codificacion = _codificacion_aceptada(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if codificacion is None:
+            return response
+
+        if response.streaming:
+            if getattr(response, 'is_async', False):
+                return response
+            response.streaming_content = self._comprimir_stream(response.streaming_content, codificacion)
+            del response['Content-Length']
+        else:
+            if len(response.content) < self.config['minimo_bytes']:
+                return response
+            comprimido = self._comprimir(response, codificacion)
+            if len(comprimido) >= len(response.content):
+                return response
+            response.content = comprimido
+            response['Content-Length'] = str(len(comprimido))
+
+        # Mismo contenido, otros bytes: el ETag pasa a débil (If-None-Match compara débil)
+        etag = response.get('ETag')
+        if etag and not etag.startswith('W/'):
+            response['ETag'] = f'W/{etag}'
+        response['Content-Encoding'] = codificacion
+        return response
+
+    def _nivel(self, codificacion, para_cache=False):
+        if codificacion == 'br':
+            return self.config['calidad_brotli_cache' if para_cache else 'calidad_brotli']
+        return self.config['nivel_gzip']
+
+    def _comprimir(self, response, codificacion):
+        etag = response.get('ETag')
+        if not etag:
+            compresor = _Compresor(codificacion, self._nivel(codificacion))
+            return compresor.comprimir(response.content) + compresor.terminar()
+
+        # El ETag identifica el cuerpo (marca de la tabla + URL + formato); se agrega
+        # un hash del contenido por si dos respuestas distintas compartieran ETag
+        huella = hashlib.sha1(etag.encode() + hashlib.sha1(response.content).digest()).hexdigest()
+        clave = f'compresion:{codificacion}:{huella}'
+        comprimido = cache.get(clave)
+        if comprimido is None:
+            compresor = _Compresor(codificacion, self._nivel(codificacion, para_cache=True))
+            comprimido = compresor.comprimir(response.content) + compresor.terminar()
+            cache.set(clave, comprimido, self.config['cache_segundos'])
+        return comprimido
+
+    def _comprimir_stream(self, contenido, codificacion):
+        compresor = _Compresor(codificacion, self._nivel(codificacion))
+        for fragmento in contenido:
+            if fragmento:
+                # Vaciar por fragmento: el cliente recibe cada lote sin esperar al final
+                yield compresor.comprimir(fragmento, vaciar=True)
+        yield compresor.terminar()
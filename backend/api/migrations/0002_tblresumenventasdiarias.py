@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-18 10:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TblResumenVentasDiarias',
+            fields=[
+                ('id_resumen', models.AutoField(primary_key=True, serialize=False)),
+                ('fecha', models.DateField()),
+                ('tipo_venta', models.CharField(max_length=20)),
+                ('estado_pago', models.CharField(max_length=20)),
+                ('cantidad', models.IntegerField(default=0)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+            ],
+            options={
+                'db_table': 'Tbl_Resumen_Ventas_Diarias',
+                'unique_together': {('fecha', 'tipo_venta', 'estado_pago')},
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.6 on 2026-10-18 15:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_tblresumenventasdiarias'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TblConfiguracion',
+            fields=[
+                ('clave', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('valor', models.CharField(max_length=200)),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'Tbl_Configuracion',
+            },
+        ),
+    ]
@@ -7,6 +7,32 @@
 # Feel free to rename the models, but don't rename db_table values or field names.
 from django.db import models
 
+from .periodos import ahora_local, ahora_utc
+
+
+class FechaHoraLocalField(models.DateTimeField):
+    """
+    Igual que DateTimeField(auto_now_add=True), pero siempre con la hora local
+    de Honduras: no depende de la zona horaria del servidor que guarda.
+    Sigue la convención de Tbl_Facturas.fecha (api/configuracion.py): mientras
+    el historial esté en UTC (normalizar_fechas_facturas sin terminar) guarda UTC,
+    así el backfill convierte por igual las facturas viejas y las nuevas.
+    """
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('editable', False)
+        kwargs.setdefault('blank', True)
+        super().__init__(*args, **kwargs)
+
+    def pre_save(self, model_instance, add):
+        if add:
+            # configuracion importa los modelos
+            from .configuracion import CONVENCION_LOCAL, convencion_fechas_facturas
+
+            valor = ahora_local() if convencion_fechas_facturas() == CONVENCION_LOCAL else ahora_utc()
+            setattr(model_instance, self.attname, valor)
+            return valor
+        return super().pre_save(model_instance, add)
+
 
 class PerfilesEmpleados(models.Model):
     codigo_perfil = models.IntegerField(primary_key=True)
@@ -192,7 +218,7 @@ class TblFacturas(models.Model):
     numero_factura = models.AutoField(primary_key=True)
     id_cliente = models.ForeignKey(TblClientes, models.DO_NOTHING, db_column='id_cliente')
     id_empleado = models.ForeignKey(TblEmpleados, models.DO_NOTHING, db_column='id_empleado')
-    fecha = models.DateTimeField(auto_now_add=True)
+    fecha = FechaHoraLocalField()
     direccion = models.CharField(max_length=200, db_collation='Modern_Spanish_CI_AS', blank=True, null=True)
     telefono = models.CharField(max_length=15, db_collation='Modern_Spanish_CI_AS', blank=True, null=True)
     rtn = models.CharField(max_length=20, db_collation='Modern_Spanish_CI_AS', blank=True, null=True)
@@ -291,6 +317,36 @@ class TblGastos(models.Model):
         return f"Gasto #{self.id_gasto} - {self.tipo_gasto}"
 
 
+# Resumen diario de ventas (se mantiene al crear/pagar/anular facturas, ver api/resumen_ventas.py)
+class TblResumenVentasDiarias(models.Model):
+    id_resumen = models.AutoField(primary_key=True)
+    fecha = models.DateField()
+    tipo_venta = models.CharField(max_length=20)
+    estado_pago = models.CharField(max_length=20)
+    cantidad = models.IntegerField(default=0)
+    total = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+
+    class Meta:
+        db_table = 'Tbl_Resumen_Ventas_Diarias'
+        unique_together = (('fecha', 'tipo_venta', 'estado_pago'),)
+
+    def __str__(self):
+        return f"Resumen {self.fecha} - {self.tipo_venta} - {self.estado_pago}"
+
+
+# Parámetros del sistema guardados junto a los datos (ver api/configuracion.py)
+class TblConfiguracion(models.Model):
+    clave = models.CharField(primary_key=True, max_length=100)
+    valor = models.CharField(max_length=200)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'Tbl_Configuracion'
+
+    def __str__(self):
+        return f"{self.clave} = {self.valor}"
+
+
 
 
 # =============================================
@@ -0,0 +1,81 @@
+# backend/api/pagination.py
+from rest_framework.pagination import CursorPagination
+from rest_framework.response import Response
+
+from .campos import campos_lista, parametros_campos
+from .lectura_rapida import LectorValores, columnas_orden
+from .streaming import respuesta_streaming
+
+
+class PaginacionCursor(CursorPagination):
+    """
+    Paginación por cursor (keyset): cada página filtra por la última llave vista
+    (WHERE llave < @cursor) en lugar de usar OFFSET, así que cuesta lo mismo
+    en la primera página que en lo más profundo del historial.
+    - Es opcional: solo pagina si la petición trae ?cursor= o ?page_size=.
+      Sin esos parámetros la respuesta sigue siendo la lista completa.
+    - La llave sale de `orden_cursor` en la vista; por defecto la PK descendente.
+      DRF filtra solo por el primer campo y salta los empates con un offset, lo que
+      exige un orden total: si el orden no incluye la PK se agrega al final.
+    """
+    ordering = '-pk'
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if self.cursor_query_param not in params and self.page_size_query_param not in params:
+            return None
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_ordering(self, request, queryset, view):
+        orden = getattr(view, 'orden_cursor', None) or self.ordering
+        orden = (orden,) if isinstance(orden, str) else tuple(orden)
+
+        # Desempate por PK: sin él las filas con la misma fecha pueden saltarse o repetirse
+        pk = queryset.model._meta.pk.name
+        if not {campo.lstrip('-') for campo in orden} & {'pk', pk}:
+            direccion = '-' if orden[0].startswith('-') else ''
+            orden += (f'{direccion}{pk}',)
+        return orden
+
+
+def respuesta_lista(request, queryset, serializer_class, orden_cursor='-pk', streaming=False,
+                    lectura_rapida=False, expandir=(), **kwargs):
+    """
+    Respuesta de lista para vistas de función con la misma paginación opcional
+    y los mismos ?fields= / ?expand= que los ViewSets. kwargs se pasan al serializer (ej. context).
+    - Sin paginar y con streaming=True (o ?stream=1) la lista se escribe por lotes
+      en un StreamingHttpResponse en lugar de armarse completa en memoria
+      (JSON, o MessagePack si se pidió Accept: application/msgpack).
+    - lectura_rapida=True arma la lista desde queryset.values() (ver api/lectura_rapida.py);
+      el streaming sigue usando el serializer.
+    - expandir: campos costosos que este endpoint incluye siempre, aun con ?fields= (ver campos_lista).
+    """
+    # ?fields= / ?expand= (ver api/campos.py): estas vistas no pasan el request al serializer
+    campos = campos_lista(parametros_campos(request), expandir)
+    kwargs['context'] = {**kwargs.get('context', {}), 'campos': campos}
+    if hasattr(serializer_class, 'preparar_queryset'):
+        queryset = serializer_class.preparar_queryset(queryset, campos)
+
+    streaming = streaming or request.query_params.get('stream') in ('1', 'true')
+    paginador = PaginacionCursor()
+    paginador.ordering = orden_cursor
+
+    if lectura_rapida and not streaming:
+        lector = LectorValores(serializer_class, kwargs.get('context'))
+        filas = lector.valores(queryset, *columnas_orden(orden_cursor))
+        pagina = paginador.paginate_queryset(filas, request)
+        if pagina is None:
+            return Response(lector.representar(filas))
+        return paginador.get_paginated_response(lector.representar(pagina))
+
+    pagina = paginador.paginate_queryset(queryset, request)
+    if pagina is None:
+        if streaming:
+            # Mismo orden que la lista sin paginar; por PK si el queryset no define uno
+            if not queryset.ordered:
+                queryset = queryset.order_by('pk')
+            return respuesta_streaming(request, queryset, serializer_class, **kwargs)
+        return Response(serializer_class(queryset, many=True, **kwargs).data)
+    return paginador.get_paginated_response(serializer_class(pagina, many=True, **kwargs).data)
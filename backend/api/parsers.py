@@ -0,0 +1,28 @@
+# backend/api/parsers.py
+import io
+
+from django.conf import settings
+from rest_framework.parsers import JSONParser
+
+from .renderers import RendererJSONRapido, orjson
+
+
+class ParserJSONRapido(JSONParser):
+    """
+    JSONParser que lee el cuerpo con orjson (UTF-8).
+    Si orjson lo rechaza (JSON inválido, enteros de más de 64 bits, otra codificación)
+    se pasa al JSONParser de DRF, que da el mismo resultado o el mismo ParseError.
+    """
+    renderer_class = RendererJSONRapido
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or encoding.lower() not in ('utf-8', 'utf8'):
+            return super().parse(stream, media_type, parser_context)
+
+        contenido = stream.read()
+        try:
+            return orjson.loads(contenido)
+        except orjson.JSONDecodeError:
+            return super().parse(io.BytesIO(contenido), media_type, parser_context)
@@ -0,0 +1,87 @@
+# backend/api/periodos.py
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from typing import NamedTuple
+from zoneinfo import ZoneInfo
+
+# Hora local del negocio
+ZONA_HONDURAS = ZoneInfo('America/Tegucigalpa')
+
+
+class Periodo(NamedTuple):
+    """
+    Rango semiabierto [inicio, fin) en hora local de Honduras (datetimes naive).
+    Filtrar con campo >= inicio AND campo < fin deja que SQL Server use el
+    índice de la columna; CAST(fecha AS DATE), YEAR(fecha) o fecha__date no.
+    """
+    inicio: datetime
+    fin: datetime
+
+    def filtro(self, campo):
+        """kwargs para .filter() sobre un DateTimeField"""
+        return {f'{campo}__gte': self.inicio, f'{campo}__lt': self.fin}
+
+    def filtro_fecha(self, campo):
+        """kwargs para .filter() sobre un DateField"""
+        return {f'{campo}__gte': self.inicio.date(), f'{campo}__lt': self.fin.date()}
+
+    def en_utc(self):
+        """El mismo periodo expresado en UTC (naive), para fechas guardadas en UTC"""
+        return Periodo(_local_a_utc(self.inicio), _local_a_utc(self.fin))
+
+
+def _local_a_utc(momento):
+    return momento.replace(tzinfo=ZONA_HONDURAS).astimezone(dt_timezone.utc).replace(tzinfo=None)
+
+
+def _medianoche(dia):
+    return datetime.combine(dia, time.min)
+
+
+def ahora_local():
+    """Fecha y hora actual en Honduras (naive)"""
+    return datetime.now(ZONA_HONDURAS).replace(tzinfo=None)
+
+
+def ahora_utc():
+    """Fecha y hora actual en UTC (naive)"""
+    return datetime.now(dt_timezone.utc).replace(tzinfo=None)
+
+
+def hoy_local():
+    """Fecha de hoy en Honduras, sin importar la zona del servidor"""
+    return ahora_local().date()
+
+
+def periodo_dia(dia=None):
+    dia = dia or hoy_local()
+    return Periodo(_medianoche(dia), _medianoche(dia + timedelta(days=1)))
+
+
+def periodo_mes(anio=None, mes=None):
+    hoy = hoy_local()
+    anio = anio or hoy.year
+    mes = mes or hoy.month
+    siguiente = date(anio + 1, 1, 1) if mes == 12 else date(anio, mes + 1, 1)
+    return Periodo(_medianoche(date(anio, mes, 1)), _medianoche(siguiente))
+
+
+def periodo_anio(anio=None):
+    anio = anio or hoy_local().year
+    return Periodo(_medianoche(date(anio, 1, 1)), _medianoche(date(anio + 1, 1, 1)))
+
+
+def periodo_rango(fecha_inicio, fecha_fin):
+    """
+    Rango de fechas inclusivo (como lo envía el frontend) -> [inicio, fin + 1 día).
+    Acepta date o texto 'YYYY-MM-DD'; ValueError si el texto no es una fecha.
+    """
+    if isinstance(fecha_inicio, str):
+        fecha_inicio = datetime.strptime(fecha_inicio, '%Y-%m-%d').date()
+    if isinstance(fecha_fin, str):
+        fecha_fin = datetime.strptime(fecha_fin, '%Y-%m-%d').date()
+    return Periodo(_medianoche(fecha_inicio), _medianoche(fecha_fin + timedelta(days=1)))
+
+
+def utc_a_local(momento):
+    """Datetime naive en UTC -> naive en hora de Honduras"""
+    return momento.replace(tzinfo=dt_timezone.utc).astimezone(ZONA_HONDURAS).replace(tzinfo=None)
@@ -0,0 +1,60 @@
+# backend/api/querysets.py
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, IntegerField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from .models import TblFacturas, TblProvedores, TblStockMateriales, TblStockInsumos
+
+
+def facturas_con_relaciones(queryset=None):
+    """
+    QuerySet de facturas listo para FacturaSerializer.
+    - select_related: cliente y empleado en la misma consulta.
+    - prefetch_related: todos los detalles en una sola consulta.
+    - Los nombres de los ítems de cada detalle los resuelve ResolverNombresItems
+      con un in_bulk por tipo, así que el número de consultas no crece con las filas.
+    """
+    if queryset is None:
+        queryset = TblFacturas.objects.all()
+    return queryset.select_related('id_cliente', 'id_empleado').prefetch_related('tbldetallesfactura_set')
+
+
+def _por_proveedor(modelo, agregado, output_field):
+    """Subconsulta correlacionada: un valor agregado de `modelo` por proveedor (0 si no tiene filas)"""
+    subconsulta = (
+        modelo.objects.filter(codigo_provedor=OuterRef('pk'))
+        .order_by().values('codigo_provedor')
+        .annotate(valor=agregado).values('valor')
+    )
+    return Coalesce(Subquery(subconsulta, output_field=output_field), 0, output_field=output_field)
+
+
+def proveedores_con_totales(queryset=None):
+    """
+    Proveedores anotados con total_productos (materiales + insumos) y
+    valor_total (costo * existencia) usando subconsultas correlacionadas:
+    cada tabla se agrega por separado, sin el JOIN doble que multiplica filas
+    en Count('tblstockmateriales') + Count('tblstockinsumos'), y sin una
+    consulta por proveedor.
+    """
+    if queryset is None:
+        queryset = TblProvedores.objects.all()
+
+    dinero = DecimalField(max_digits=18, decimal_places=2)
+    entero = IntegerField()
+
+    def valor(modelo):
+        return _por_proveedor(
+            modelo,
+            Sum(ExpressionWrapper(F('costo') * F('cantidad_existencia'), output_field=dinero)),
+            dinero
+        )
+
+    return queryset.annotate(
+        total_materiales=_por_proveedor(TblStockMateriales, Count('pk'), entero),
+        total_insumos=_por_proveedor(TblStockInsumos, Count('pk'), entero),
+        valor_materiales=valor(TblStockMateriales),
+        valor_insumos=valor(TblStockInsumos),
+    ).annotate(
+        total_productos=F('total_materiales') + F('total_insumos'),
+        valor_total=ExpressionWrapper(F('valor_materiales') + F('valor_insumos'), output_field=dinero),
+    )
@@ -0,0 +1,123 @@
+# backend/api/renderers.py
+from decimal import Decimal
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional: sin el paquete se usa el JSONRenderer de DRF
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # sin msgpack no se ofrece application/msgpack (ver settings.py)
+    msgpack = None
+
+# Fechas/horas y subclases pasan por el mismo default() que usa DRF: el texto sale igual
+# ('...Z' para UTC, sin microsegundos extra); el resto (str, int, dict, list...) es nativo
+if orjson is not None:
+    OPCIONES_ORJSON = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+_codificar = JSONEncoder().default
+
+
+def _float_como_drf(valor):
+    """
+    orjson escribe igual que json.dumps (repr) los floats en 0 y 1e-4 <= |x| < 1e16.
+    Fuera de ese rango cambia el texto (1e16 frente a 1e+16, 0.00001 frente a 1e-05)
+    y NaN/Infinity salen como null, cuando DRF lanza ValueError.
+    """
+    return valor == 0 or 1e-4 <= abs(valor) < 1e16
+
+
+def _floats_como_drf(data):
+    """False si algún float de la respuesta no sale igual con orjson (ver arriba)"""
+    pendientes = [data]
+    for contenedor in pendientes:
+        for valor in (contenedor.values() if isinstance(contenedor, dict) else contenedor):
+            tipo = type(valor)
+            if tipo is str or tipo is int or valor is None:
+                continue
+            if tipo is float:
+                if not _float_como_drf(valor):
+                    return False
+            elif isinstance(valor, (dict, list, tuple)):
+                pendientes.append(valor)
+    return True
+
+
+def _codificar_json(obj):
+    valor = _codificar(obj)
+    # Decimal sin serializer -> float: la misma revisión que los floats nativos
+    if type(valor) is float and not _float_como_drf(valor):
+        raise TypeError('float que orjson no escribe como DRF')
+    return valor
+
+
+class RendererJSONRapido(JSONRenderer):
+    """
+    JSONRenderer codificado con orjson; la salida es la misma que la de DRF.
+    - Decimal, datetime, date, time, UUID, QuerySet... se convierten con el encoder
+      de DRF (Decimal -> float si llega sin serializer; los DecimalField ya vienen
+      como texto).
+    - Floats: orjson solo escribe igual que DRF los que están en el rango de
+      _float_como_drf(); si la respuesta trae otro (1e16, 1e-05, NaN, Infinity)
+      se usa el JSONRenderer original, que da el texto de DRF o su ValueError.
+    - Con indent (API navegable, 'application/json; indent=4') o si orjson no puede
+      con el dato (enteros de más de 64 bits, etc.) también se usa el original.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if (
+            orjson is None
+            or self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        if not _floats_como_drf(data):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=_codificar_json, option=OPCIONES_ORJSON)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Igual que DRF: U+2028/U+2029 escapados para que el JSON sea JavaScript válido
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+
+def _codificar_msgpack(obj):
+    # Dinero sin pérdida: texto con todos sus decimales (como los DecimalField), nunca float
+    if isinstance(obj, Decimal):
+        return format(obj, 'f')
+    return _codificar(obj)
+
+
+def empaquetador_msgpack():
+    """Packer con las mismas conversiones que RendererMsgPack (también para streaming)"""
+    return msgpack.Packer(default=_codificar_msgpack, use_bin_type=True, datetime=False)
+
+
+class RendererMsgPack(BaseRenderer):
+    """
+    MessagePack para consumidores masivos (scripts de sincronización, reportes).
+    Solo se usa si el cliente lo pide: Accept: application/msgpack (o ?format=msgpack).
+    - Misma estructura que el JSON; números, listas y mapas binarios.
+    - Decimal siempre como texto ('1250.50'), igual que los DecimalField: sin pérdida.
+    - Fechas y demás tipos como en el JSON de DRF.
+    """
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return empaquetador_msgpack().pack(data)
@@ -0,0 +1,127 @@
+# backend/api/resolvers.py
+from collections import defaultdict
+
+from .models import TblStockJoyas, TblServicios, TblStockMateriales, TblStockInsumos
+
+
+class ResolverNombresItems:
+    """
+    Resuelve el nombre de los ítems polimórficos de Tbl_Detalles_Factura
+    (tipo_item / codigo_item).
+    - Agrupa los códigos pendientes por tipo y carga cada tipo con un solo in_bulk.
+    - Guarda los nombres ya consultados para no repetir consultas.
+    """
+    # tipo_item -> (modelo, campo con el nombre, mensaje si no existe)
+    MODELOS = {
+        'JOYA': (TblStockJoyas, 'nombre', 'Joya no encontrada'),
+        'SERVICIO': (TblServicios, 'nombre_servicio', 'Servicio no encontrado'),
+        'MATERIAL': (TblStockMateriales, 'nombre', 'Material no encontrado'),
+        'INSUMO': (TblStockInsumos, 'nombre', 'Insumo no encontrado'),
+    }
+
+    def __init__(self):
+        self._pendientes = defaultdict(set)
+        self._consultados = defaultdict(set)
+        self._nombres = defaultdict(dict)
+
+    def registrar(self, detalles):
+        """Agregar los códigos de una colección de detalles a la siguiente carga"""
+        for detalle in detalles:
+            tipo_item = detalle.tipo_item
+            if tipo_item in self.MODELOS and detalle.codigo_item not in self._consultados[tipo_item]:
+                self._pendientes[tipo_item].add(detalle.codigo_item)
+
+    def resolver(self):
+        """Cargar los códigos pendientes: una consulta in_bulk por tipo de ítem"""
+        for tipo_item, codigos in self._pendientes.items():
+            if not codigos:
+                continue
+            modelo, campo, _ = self.MODELOS[tipo_item]
+            encontrados = modelo.objects.only(campo).in_bulk(list(codigos))
+            for codigo, item in encontrados.items():
+                self._nombres[tipo_item][codigo] = getattr(item, campo)
+            self._consultados[tipo_item].update(codigos)
+        self._pendientes.clear()
+
+    def nombre(self, tipo_item, codigo_item):
+        """Nombre del ítem, o el mensaje de 'no encontrado' de su tipo"""
+        if tipo_item not in self.MODELOS:
+            return None
+
+        if codigo_item not in self._consultados[tipo_item]:
+            self._pendientes[tipo_item].add(codigo_item)
+            self.resolver()
+
+        _, _, no_encontrado = self.MODELOS[tipo_item]
+        return self._nombres[tipo_item].get(codigo_item, no_encontrado)
+
+    @classmethod
+    def desde_contexto(cls, context):
+        """Resolver compartido por todos los serializers de una misma respuesta"""
+        return context.setdefault('resolver_nombres_items', cls())
+
+
+class CargadorRelaciones:
+    """
+    Carga por lotes de relaciones ForeignKey (estilo DataLoader) con un identity map
+    por respuesta.
+    - cargar(filas, 'id_cliente', 'numero_factura__id_cliente') junta las llaves de
+      todas las filas y trae cada tabla relacionada con un solo in_bulk por tramo de la ruta.
+    - El objeto queda en la caché de la relación: obj.id_cliente ya no consulta, así
+      que los serializers y sus campos con source='fk.campo' no cambian.
+    - Un mismo (modelo, llave) es siempre el mismo objeto en toda la respuesta y no
+      se vuelve a pedir (ni lo que vino por select_related).
+    - Si la fila relacionada no existe se deja sin cachear: el acceso se comporta como siempre.
+    """
+
+    def __init__(self):
+        # (modelo, campo llave) -> {valor: instancia o None si no existe}
+        self._objetos = defaultdict(dict)
+
+    def cargar(self, instancias, *rutas):
+        for ruta in rutas:
+            actuales = list(instancias)
+            for nombre in ruta.split('__'):
+                actuales = self._cargar_relacion(actuales, nombre)
+
+    def _cargar_relacion(self, instancias, nombre):
+        """Cachea instancia.<nombre> en todas las instancias; devuelve los objetos relacionados"""
+        if not instancias:
+            return []
+        campo = instancias[0]._meta.get_field(nombre)
+        llave = campo.target_field.attname
+        conocidos = self._objetos[(campo.related_model, llave)]
+
+        pendientes = set()
+        for instancia in instancias:
+            if campo.is_cached(instancia):
+                relacionado = campo.get_cached_value(instancia)
+                if relacionado is not None:
+                    conocidos.setdefault(getattr(relacionado, llave), relacionado)
+                continue
+            valor = getattr(instancia, campo.attname)
+            if valor is not None and valor not in conocidos:
+                pendientes.add(valor)
+
+        if pendientes:
+            encontrados = campo.related_model._base_manager.in_bulk(list(pendientes), field_name=llave)
+            for valor in pendientes:
+                conocidos[valor] = encontrados.get(valor)
+
+        relacionados = {}
+        for instancia in instancias:
+            if campo.is_cached(instancia):
+                relacionado = campo.get_cached_value(instancia)
+            else:
+                relacionado = conocidos.get(getattr(instancia, campo.attname))
+                if relacionado is None:
+                    continue
+                campo.set_cached_value(instancia, relacionado)
+            if relacionado is not None:
+                relacionados[id(relacionado)] = relacionado
+        return list(relacionados.values())
+
+    @classmethod
+    def desde_contexto(cls, context):
+        """Cargador compartido por todos los serializers de una misma respuesta"""
+        return context.setdefault('cargador_relaciones', cls())
@@ -0,0 +1,124 @@
+# backend/api/resumen_ventas.py
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+
+from dashboard.cache import invalidar_kpis
+
+from .configuracion import CONVENCION_UTC, convencion_fechas_facturas
+from .models import TblFacturas, TblResumenVentasDiarias
+from .periodos import utc_a_local
+
+
+# Filas de Tbl_Facturas por vuelta al reconstruir el resumen
+TAMANO_LOTE = 2000
+
+
+def dia_resumen(fecha, convencion=None):
+    """
+    Día del resumen al que pertenece Tbl_Facturas.fecha: la fecha en hora de Honduras.
+    Mientras la convención sea 'utc' (normalizar_fechas_facturas sin terminar) la fecha
+    guardada se pasa a hora local antes de truncarla: una venta de las 20:00 cuenta en
+    su día, no en el siguiente. Los reportes leen el resumen con fechas locales.
+    Única regla para el registro incremental y para reconstruir_resumen().
+    """
+    if isinstance(fecha, datetime):
+        if (convencion or convencion_fechas_facturas()) == CONVENCION_UTC:
+            fecha = utc_a_local(fecha)
+        return fecha.date()
+    return fecha
+
+
+def _clave(fecha, tipo_venta, estado_pago, total, convencion=None):
+    return (dia_resumen(fecha, convencion), tipo_venta, estado_pago, Decimal(str(total or 0)))
+
+
+def clave_factura(factura):
+    """
+    Lo que el resumen necesita de una factura: (día, tipo_venta, estado_pago, total).
+    Tomarla antes de modificar la factura para poder restar su estado anterior.
+    """
+    return _clave(factura.fecha, factura.tipo_venta, factura.estado_pago, factura.total)
+
+
+def _sumar(fecha, tipo_venta, estado_pago, cantidad, total):
+    """UPDATE de la fila del día; si no existe se crea (con reintento si otra transacción la creó)"""
+    filtro = {'fecha': fecha, 'tipo_venta': tipo_venta, 'estado_pago': estado_pago}
+    actualizadas = TblResumenVentasDiarias.objects.filter(**filtro).update(
+        cantidad=F('cantidad') + cantidad,
+        total=F('total') + total
+    )
+    if actualizadas:
+        return
+
+    try:
+        with transaction.atomic():
+            TblResumenVentasDiarias.objects.create(cantidad=cantidad, total=total, **filtro)
+    except IntegrityError:
+        TblResumenVentasDiarias.objects.filter(**filtro).update(
+            cantidad=F('cantidad') + cantidad,
+            total=F('total') + total
+        )
+
+
+@transaction.atomic
+def registrar_cambio_factura(antes=None, despues=None):
+    """
+    Mantener el resumen diario al crear, pagar, anular o convertir facturas.
+    - antes: clave_factura() previa al cambio (None si la factura es nueva).
+    - despues: clave_factura() ya guardada (None si la factura se elimina).
+    Debe llamarse dentro de la misma transacción que guarda la factura.
+    """
+    if antes == despues:
+        return
+    invalidar_kpis()
+    if antes is not None:
+        fecha, tipo_venta, estado_pago, total = antes
+        _sumar(fecha, tipo_venta, estado_pago, -1, -total)
+    if despues is not None:
+        fecha, tipo_venta, estado_pago, total = despues
+        _sumar(fecha, tipo_venta, estado_pago, 1, total)
+
+
+@transaction.atomic
+def reconstruir_resumen():
+    """
+    Recalcular todo el resumen desde Tbl_Facturas.
+    Recorre las facturas por lotes y agrupa con la regla de clave_factura(): el mismo
+    día local y los mismos importes que suma el registro incremental, sin depender
+    de cómo cada base trunca un datetime a fecha.
+    """
+    grupos = defaultdict(lambda: [0, Decimal('0')])
+    convencion = convencion_fechas_facturas()
+    facturas = TblFacturas.objects.order_by().values_list('fecha', 'tipo_venta', 'estado_pago', 'total')
+    for fila in facturas.iterator(chunk_size=TAMANO_LOTE):
+        dia, tipo_venta, estado_pago, total = _clave(*fila, convencion)
+        grupo = grupos[(dia, tipo_venta, estado_pago)]
+        grupo[0] += 1
+        grupo[1] += total
+
+    TblResumenVentasDiarias.objects.all().delete()
+    resumen = TblResumenVentasDiarias.objects.bulk_create([
+        TblResumenVentasDiarias(
+            fecha=dia, tipo_venta=tipo_venta, estado_pago=estado_pago, cantidad=cantidad, total=total
+        )
+        for (dia, tipo_venta, estado_pago), (cantidad, total) in grupos.items()
+    ], batch_size=500)
+    return len(resumen)
+
+
+def resumen_ventas(**filtros):
+    """QuerySet del resumen diario (ej. fecha__gte=..., estado_pago=...)"""
+    return TblResumenVentasDiarias.objects.filter(**filtros)
+
+
+def totales(queryset):
+    """Suma de total y cantidad de facturas de un queryset del resumen"""
+    datos = queryset.aggregate(total=Sum('total'), cantidad=Sum('cantidad'))
+    return {
+        'total': datos['total'] or 0,
+        'cantidad': datos['cantidad'] or 0,
+    }
@@ -1,9 +1,10 @@
 # backend/api/serializers.py
-import requests
 import base64
-from io import BytesIO
+import os
+from collections import defaultdict
 from rest_framework import serializers
-from django.db import transaction
+from django.core.files.storage import default_storage
+from django.db import models, transaction
 from decimal import Decimal
 from datetime import timezone
 from .models import (
@@ -12,6 +13,13 @@ from .models import (
     TblStockMateriales, TblProvedores, PerfilesEmpleados,
     TblOrdenesTrabajo
 )
+from .campos import CamposDinamicosMixin, campo_incluido
+from .resolvers import CargadorRelaciones, ResolverNombresItems
+from .imagenes import (
+    copias_imagenes_joyas, derivados_cotizacion_generados, imagen_joya_en_cache, rutas_derivados_cotizacion,
+)
+from .inventario import MODELOS_DESCUENTO, TAMANO_LOTE, descontar_existencias
+from .resumen_ventas import clave_factura, registrar_cambio_factura
 
 # Campo reutilizable para estados de órdenes: acepta "EN_PROCESO" y "EN PROCESO"
 class EstadoOrdenChoiceField(serializers.ChoiceField):
@@ -25,7 +33,27 @@ class EstadoOrdenChoiceField(serializers.ChoiceField):
             data = data.strip().upper().replace(" ", "_")
         return super().to_internal_value(data)
 
-class ClienteSerializer(serializers.ModelSerializer):
+# Formato de presentación de clientes (ClienteSerializer y su lectura rápida)
+def formatear_identidad(numero):
+    """'0801199912345' -> '0801-1999-12345'; cualquier otro valor sale igual"""
+    if numero and len(numero) == 13:
+        return f"{numero[:4]}-{numero[4:8]}-{numero[8:]}"
+    return numero
+
+def formatear_rtn(rtn):
+    """'08011999123456' -> '0801-1999-12345-6'; cualquier otro valor sale igual"""
+    if rtn and len(rtn) == 14:
+        return f"{rtn[:4]}-{rtn[4:8]}-{rtn[8:13]}-{rtn[13]}"
+    return rtn
+
+def formatear_telefono(telefono):
+    """99887766 -> '9988-7766' (con ceros a la izquierda hasta 8 dígitos); vacío sale igual"""
+    if telefono:
+        telefono_str = str(telefono).zfill(8)
+        return f"{telefono_str[:4]}-{telefono_str[4:]}"
+    return telefono
+
+class ClienteSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     telefono_display = serializers.CharField(
         source='telefono', 
         required=False, 
@@ -51,6 +79,12 @@ class ClienteSerializer(serializers.ModelSerializer):
             'telefono': {'required': False, 'allow_null': True},
             'rtn': {'required': False, 'allow_null': True, 'allow_blank': True}
         }
+        # Lectura rápida (api/lectura_rapida.py): el mismo formato que to_representation
+        lectura_rapida = {
+            'numero_identidad': (('numero_identidad',), formatear_identidad),
+            'rtn': (('rtn',), formatear_rtn),
+            'telefono': (('telefono',), formatear_telefono),
+        }
     
     def validate_numero_identidad(self, value):
         if not value:
@@ -97,19 +131,35 @@ class ClienteSerializer(serializers.ModelSerializer):
     def to_representation(self, instance):
         representation = super().to_representation(instance)
         
-        if instance.numero_identidad and len(instance.numero_identidad) == 13:
-            representation['numero_identidad'] = f"{instance.numero_identidad[:4]}-{instance.numero_identidad[4:8]}-{instance.numero_identidad[8:]}"
+        if 'numero_identidad' in representation:
+            representation['numero_identidad'] = formatear_identidad(instance.numero_identidad)
 
-        if instance.rtn and len(instance.rtn) == 14:
-            representation['rtn'] = f"{instance.rtn[:4]}-{instance.rtn[4:8]}-{instance.rtn[8:13]}-{instance.rtn[13]}"
+        if 'rtn' in representation:
+            representation['rtn'] = formatear_rtn(instance.rtn)
 
-        if instance.telefono:
-            telefono_str = str(instance.telefono).zfill(8)
-            representation['telefono'] = f"{telefono_str[:4]}-{telefono_str[4:]}"
+        if 'telefono' in representation:
+            representation['telefono'] = formatear_telefono(instance.telefono)
         
         return representation
 
-class EmpleadoSerializer(serializers.ModelSerializer):
+class RelacionesListSerializer(serializers.ListSerializer):
+    """
+    Carga en bloque las relaciones que usan los campos de la lista (CargadorRelaciones).
+    Meta.relaciones_por_lote del serializer hijo: {'campo': ('fk', 'fk__otra_fk')};
+    solo se cargan las rutas de los campos que van en la respuesta (?fields=).
+    """
+    def to_representation(self, data):
+        filas = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        campos = self.child.fields
+        rutas = {
+            ruta
+            for campo, rutas_campo in self.child.Meta.relaciones_por_lote.items() if campo in campos
+            for ruta in rutas_campo
+        }
+        CargadorRelaciones.desde_contexto(self.context).cargar(filas, *sorted(rutas))
+        return super().to_representation(filas)
+
+class EmpleadoSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     perfil_nombre = serializers.CharField(source='codigo_perfil.perfil', read_only=True)
     
     class Meta:
@@ -118,41 +168,69 @@ class EmpleadoSerializer(serializers.ModelSerializer):
             'id_empleado', 'codigo_perfil', 'perfil_nombre', 'nombre', 
             'apellido', 'usuario', 'telefono', 'correo', 'salario'
         ]
+        list_serializer_class = RelacionesListSerializer
+        relaciones_por_lote = {'perfil_nombre': ('codigo_perfil',)}
         extra_kwargs = {
             'contrasena': {'write_only': True}
         }
 
 # CORREGIR en serializers.py - StockJoyaSerializer
-class StockJoyaSerializer(serializers.ModelSerializer):
+class StockJoyaSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
+    # Copia local de imagen_url (ver api/imagenes.py): nunca se descarga al listar
+    imagen_local_url = serializers.SerializerMethodField()
+    imagen_miniatura_url = serializers.SerializerMethodField()
     imagen_base64 = serializers.SerializerMethodField()
     
     class Meta:
         model = TblStockJoyas
         fields = [
-            'codigo_joya', 'nombre', 'imagen_url', 'imagen_base64', 'tipo', 
-            'peso', 'material', 'descripcion', 'precio_venta', 'costo', 'cantidad_existencia'
+            'codigo_joya', 'nombre', 'imagen_url', 'imagen_local_url', 'imagen_miniatura_url',
+            'imagen_base64', 'tipo', 'peso', 'material', 'descripcion', 'precio_venta', 'costo',
+            'cantidad_existencia'
         ]
+        # Lee y codifica el archivo de la imagen: solo en el detalle
+        campos_expandibles = ('imagen_base64',)
+        campos_solo_detalle = ('imagen_base64',)
         # AGREGAR ESTO PARA PERMITIR ACTUALIZACIONES:
         extra_kwargs = {
             'costo': {'required': False},
             'precio_venta': {'required': False},
             'cantidad_existencia': {'required': False}
         }
+
+    def _rutas_imagen(self, obj):
+        """Rutas de la copia local de la imagen (None si aún no se ha descargado)"""
+        # Un solo listado de la carpeta por respuesta, compartido por las filas de la lista
+        if 'copias_imagenes_joyas' not in self.context:
+            self.context['copias_imagenes_joyas'] = copias_imagenes_joyas()
+        return imagen_joya_en_cache(obj.imagen_url, self.context['copias_imagenes_joyas'])
+
+    def _url_media(self, ruta):
+        url = default_storage.url(ruta)
+        request = self.context.get('request')
+        if request is not None:
+            return request.build_absolute_uri(url)
+        return url
+
+    def get_imagen_local_url(self, obj):
+        rutas = self._rutas_imagen(obj)
+        return self._url_media(rutas['imagen']) if rutas else None
+
+    def get_imagen_miniatura_url(self, obj):
+        rutas = self._rutas_imagen(obj)
+        return self._url_media(rutas['miniatura']) if rutas else None
     
     def get_imagen_base64(self, obj):
-        if obj.imagen_url:
-            try:
-                # Descargar la imagen desde la URL
-                response = requests.get(obj.imagen_url, timeout=10)
-                response.raise_for_status()
-                
-                # Convertir a base64
-                image_base64 = base64.b64encode(response.content).decode('utf-8')
-                return image_base64
-            except Exception as e:
-                print(f"Error cargando imagen {obj.imagen_url}: {e}")
-                return None
-        return None
+        """Base64 de la copia local; sin copia local devuelve None en vez de descargar"""
+        rutas = self._rutas_imagen(obj)
+        if not rutas:
+            return None
+        try:
+            with default_storage.open(rutas['imagen'], 'rb') as image_file:
+                return base64.b64encode(image_file.read()).decode('utf-8')
+        except Exception as e:
+            print(f"Error leyendo imagen local {rutas['imagen']}: {e}")
+            return None
 
     # AGREGAR MÉTODO UPDATE PARA MANEJAR ACTUALIZACIONES PARCIALES
     def update(self, instance, validated_data):
@@ -163,11 +241,18 @@ class StockJoyaSerializer(serializers.ModelSerializer):
         return instance
     
     
-class ServicioSerializer(serializers.ModelSerializer):
+class ServicioSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = TblServicios
         fields = ['codigo_servicio', 'nombre_servicio', 'descripcion', 'precio_base']
 
+class DetalleFacturaListSerializer(serializers.ListSerializer):
+    """Registra todos los detalles de la lista para resolver sus nombres en bloque"""
+    def to_representation(self, data):
+        detalles = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        ResolverNombresItems.desde_contexto(self.context).registrar(detalles)
+        return super().to_representation(detalles)
+
 class DetalleFacturaSerializer(serializers.ModelSerializer):
     subtotal_calculado = serializers.SerializerMethodField()
     total_calculado = serializers.SerializerMethodField()
@@ -180,6 +265,7 @@ class DetalleFacturaSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = TblDetallesFactura
+        list_serializer_class = DetalleFacturaListSerializer
         fields = [
             'id_detalle', 'numero_factura', 'tipo_item', 'codigo_item',
             'descripcion', 'cantidad', 'precio_unitario', 'descuento',
@@ -196,44 +282,38 @@ class DetalleFacturaSerializer(serializers.ModelSerializer):
         descuento = obj.descuento or 0
         total = subtotal - descuento
         return float(total)
+
+    def _nombre_item(self, obj, tipo_item):
+        """Nombre del ítem si el detalle es del tipo indicado (resuelto en bloque)"""
+        if obj.tipo_item != tipo_item:
+            return None
+        return ResolverNombresItems.desde_contexto(self.context).nombre(obj.tipo_item, obj.codigo_item)
     
     def get_joya_nombre(self, obj):
-        if obj.tipo_item == 'JOYA':
-            try:
-                joya = TblStockJoyas.objects.get(codigo_joya=obj.codigo_item)
-                return joya.nombre
-            except TblStockJoyas.DoesNotExist:
-                return "Joya no encontrada"
-        return None
+        return self._nombre_item(obj, 'JOYA')
     
     def get_servicio_nombre(self, obj):
-        if obj.tipo_item == 'SERVICIO':
-            try:
-                servicio = TblServicios.objects.get(codigo_servicio=obj.codigo_item)
-                return servicio.nombre_servicio
-            except TblServicios.DoesNotExist:
-                return "Servicio no encontrado"
-        return None
+        return self._nombre_item(obj, 'SERVICIO')
     
     def get_material_nombre(self, obj):
-        if obj.tipo_item == 'MATERIAL':
-            try:
-                material = TblStockMateriales.objects.get(codigo_material=obj.codigo_item)
-                return material.nombre
-            except TblStockMateriales.DoesNotExist:
-                return "Material no encontrado"
-        return None
+        return self._nombre_item(obj, 'MATERIAL')
     
     def get_insumo_nombre(self, obj):
-        if obj.tipo_item == 'INSUMO':
-            try:
-                insumo = TblStockInsumos.objects.get(codigo_insumo=obj.codigo_item)
-                return insumo.nombre
-            except TblStockInsumos.DoesNotExist:
-                return "Insumo no encontrado"
-        return None
-
-class FacturaSerializer(serializers.ModelSerializer):
+        return self._nombre_item(obj, 'INSUMO')
+
+class FacturaListSerializer(serializers.ListSerializer):
+    """Registra los detalles precargados de todas las facturas antes de serializarlas"""
+    def to_representation(self, data):
+        facturas = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        resolver = ResolverNombresItems.desde_contexto(self.context)
+        for factura in facturas:
+            # Solo si vienen de prefetch_related, para no consultar dos veces
+            if 'tbldetallesfactura_set' in getattr(factura, '_prefetched_objects_cache', {}):
+                resolver.registrar(factura.tbldetallesfactura_set.all())
+        resolver.resolver()
+        return super().to_representation(facturas)
+
+class FacturaSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     cliente_nombre = serializers.SerializerMethodField()
     cliente_identidad = serializers.CharField(source='id_cliente.numero_identidad', read_only=True)
     empleado_nombre = serializers.SerializerMethodField()
@@ -243,6 +323,7 @@ class FacturaSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = TblFacturas
+        list_serializer_class = FacturaListSerializer
         fields = [
             'numero_factura', 'id_cliente', 'cliente_nombre', 'cliente_identidad',
             'id_empleado', 'empleado_nombre', 'fecha', 'direccion', 'telefono', 'rtn',
@@ -250,6 +331,14 @@ class FacturaSerializer(serializers.ModelSerializer):
             'observaciones', 'estado_pago', 'estado_pago_display', 'fecha_pago', 'metodo_pago',
             'detalles'
         ]
+        campos_expandibles = ('detalles',)
+
+    @classmethod
+    def preparar_queryset(cls, queryset, campos):
+        """Sin detalles en la respuesta no hace falta el prefetch de Tbl_Detalles_Factura"""
+        if not campo_incluido('detalles', campos, cls.Meta.campos_expandibles):
+            return queryset.prefetch_related(None)
+        return queryset
 
     def get_cliente_nombre(self, obj):
         return f"{obj.id_cliente.nombre} {obj.id_cliente.apellido}"
@@ -271,7 +360,7 @@ class FacturaEstadoSerializer(serializers.ModelSerializer):
         model = TblFacturas
         fields = ['estado_pago', 'fecha_pago', 'metodo_pago', 'observaciones']
 
-class CotizacionSerializer(serializers.ModelSerializer):
+class CotizacionSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     cliente_nombre = serializers.SerializerMethodField()
     empleado_nombre = serializers.SerializerMethodField()
     tipo_servicio_display = serializers.CharField(source='get_tipo_servicio_display', read_only=True)
@@ -287,6 +376,8 @@ class CotizacionSerializer(serializers.ModelSerializer):
 
     # NUEVO: Campo para la imagen
     imagen_url = serializers.SerializerMethodField()
+    imagen_miniatura_url = serializers.SerializerMethodField()
+    imagen_media_url = serializers.SerializerMethodField()
     imagen_base64 = serializers.SerializerMethodField()
 
     class Meta:
@@ -300,9 +391,19 @@ class CotizacionSerializer(serializers.ModelSerializer):
             'tipo_servicio', 'tipo_servicio_display',
             'estado', 'estado_display', 'puede_convertir',
             'observaciones', 'numero_factura_conversion', 'fecha_conversion',
-            'imagen_referencia', 'imagen_url', 'imagen_base64'
+            'imagen_referencia', 'imagen_url', 'imagen_miniatura_url', 'imagen_media_url',
+            'imagen_base64'
         ]
         read_only_fields = ['numero_cotizacion', 'fecha_creacion', 'numero_factura_conversion', 'fecha_conversion']
+        campos_expandibles = ('cliente_info', 'empleado_info', 'imagen_base64')
+        campos_solo_detalle = ('imagen_base64',)
+        list_serializer_class = RelacionesListSerializer
+        relaciones_por_lote = {
+            'cliente_nombre': ('id_cliente',),
+            'cliente_info': ('id_cliente',),
+            'empleado_nombre': ('id_empleado',),
+            'empleado_info': ('id_empleado__codigo_perfil',),
+        }
         # AGREGAR ESTO PARA HACER EL CAMPO OPCIONAL:
         extra_kwargs = {
             'imagen_referencia': {'required': False, 'allow_null': True, 'allow_blank': True}
@@ -326,6 +427,16 @@ class CotizacionSerializer(serializers.ModelSerializer):
         """Determinar si la cotización puede convertirse a factura"""
         return obj.estado == 'ACTIVA' and obj.numero_factura_conversion is None
     
+    def get_fields(self):
+        """
+        imagen_base64 solo en el detalle y si se pide: ?imagen_base64=1, o nombrándolo en
+        ?fields= / ?expand= (en listas nunca, ver Meta.campos_solo_detalle)
+        """
+        fields = super().get_fields()
+        if not (self.context.get('incluir_imagen_base64') or self.campo_pedido('imagen_base64')):
+            fields.pop('imagen_base64', None)
+        return fields
+
     # CORREGIDO: Manejar valores NULL de forma segura
     def get_imagen_url(self, obj):
         """Obtener la URL de la imagen de forma segura"""
@@ -339,6 +450,31 @@ class CotizacionSerializer(serializers.ModelSerializer):
             print(f"Error obteniendo URL de imagen: {e}")
         return None
     
+    def _url_derivado(self, obj, tipo):
+        """
+        URL del derivado WebP, o la de la imagen original mientras el hilo de fondo
+        no lo haya generado (recién subida la imagen tarda unos segundos en existir).
+        """
+        if not obj.imagen_referencia:
+            return None
+        # Un solo listado de la carpeta por respuesta, compartido por las filas de la lista
+        if 'derivados_cotizacion' not in self.context:
+            self.context['derivados_cotizacion'] = derivados_cotizacion_generados()
+        ruta = rutas_derivados_cotizacion(obj.imagen_referencia)[tipo]
+        if os.path.basename(ruta) not in self.context['derivados_cotizacion']:
+            return self.get_imagen_url(obj)
+        request = self.context.get('request')
+        url = default_storage.url(ruta)
+        if request is not None:
+            return request.build_absolute_uri(url)
+        return url
+
+    def get_imagen_miniatura_url(self, obj):
+        return self._url_derivado(obj, 'miniatura')
+
+    def get_imagen_media_url(self, obj):
+        return self._url_derivado(obj, 'media')
+
     def get_imagen_base64(self, obj):
         """Convertir imagen a base64 de forma segura"""
         try:
@@ -523,7 +659,17 @@ class CotizacionEstadisticasSerializer(serializers.Serializer):
     cotizaciones_proximas_vencer = serializers.IntegerField()
     tasa_conversion = serializers.FloatField()
 
-class OrdenTrabajoSerializer(serializers.ModelSerializer):
+# get_empleado_nombre / get_cliente_nombre sobre columnas de values() (lectura rápida).
+# La PK del lado relacionado es None si la fila no existe (LEFT JOIN).
+def _nombre_empleado_valores(id_empleado, nombre, apellido):
+    return "" if id_empleado is None else f"{nombre} {apellido}"
+
+def _nombre_cliente_valores(id_cliente, nombre, apellido):
+    if id_cliente is None:
+        return ""
+    return ((nombre or "") + " " + (apellido or "")).strip()
+
+class OrdenTrabajoSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     empleado_nombre = serializers.SerializerMethodField()
     # Ahora armamos nombre + apellido
     cliente_nombre = serializers.SerializerMethodField()
@@ -559,6 +705,22 @@ class OrdenTrabajoSerializer(serializers.ModelSerializer):
             'fecha_inicio': {'read_only': True},  # auto_now_add handles this
             'estado': {'required': False, 'default': 'PENDIENTE'}
         }
+        list_serializer_class = RelacionesListSerializer
+        relaciones_por_lote = {
+            'empleado_nombre': ('id_empleado',),
+            'cliente_nombre': ('numero_factura__id_cliente',),
+        }
+        lectura_rapida = {
+            'empleado_nombre': (
+                ('id_empleado__id_empleado', 'id_empleado__nombre', 'id_empleado__apellido'),
+                _nombre_empleado_valores,
+            ),
+            'cliente_nombre': (
+                ('numero_factura__id_cliente__id_cliente', 'numero_factura__id_cliente__nombre',
+                 'numero_factura__id_cliente__apellido'),
+                _nombre_cliente_valores,
+            ),
+        }
 
     def get_empleado_nombre(self, obj):
         try:
@@ -592,7 +754,7 @@ class OrdenTrabajoSerializer(serializers.ModelSerializer):
 
         return super().create(validated_data)
 
-class StockInsumoSerializer(serializers.ModelSerializer):
+class StockInsumoSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     provedor_nombre = serializers.CharField(source='codigo_provedor.nombre', read_only=True)
 
     class Meta:
@@ -627,7 +789,7 @@ class StockInsumoSerializer(serializers.ModelSerializer):
 
         return data
 
-class StockMaterialSerializer(serializers.ModelSerializer):
+class StockMaterialSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     provedor_nombre = serializers.CharField(source='codigo_provedor.nombre', read_only=True)
 
     class Meta:
@@ -662,12 +824,12 @@ class StockMaterialSerializer(serializers.ModelSerializer):
 
         return data
 
-class ProvedorSerializer(serializers.ModelSerializer):
+class ProvedorSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = TblProvedores
         fields = ['codigo_provedor', 'nombre', 'telefono', 'direccion']
 
-class PerfilEmpleadoSerializer(serializers.ModelSerializer):
+class PerfilEmpleadoSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = PerfilesEmpleados
         fields = ['codigo_perfil', 'perfil', 'rol']
@@ -877,53 +1039,38 @@ class CrearFacturaCompletaSerializer(serializers.Serializer):
             )
             
             print(f"Factura principal creada: #{factura.numero_factura}")
+            registrar_cambio_factura(despues=clave_factura(factura))
             
-            # Crear detalles de factura
+            # Crear detalles de factura (un solo INSERT por lote)
+            TblDetallesFactura.objects.bulk_create([
+                TblDetallesFactura(
+                    numero_factura=factura,
+                    tipo_item=detalle_data.get('tipo_item'),
+                    codigo_item=detalle_data.get('codigo_item'),
+                    descripcion=detalle_data.get('descripcion', ''),
+                    cantidad=detalle_data.get('cantidad', 1),
+                    precio_unitario=detalle_data.get('precio_unitario', 0),
+                    descuento=detalle_data.get('descuento', 0)
+                )
+                for detalle_data in detalles_data
+            ], batch_size=TAMANO_LOTE)
+
+            # Descontar del inventario: un UPDATE por tipo (las joyas las descuenta el trigger
+            # de SQL Server, ver INVENTARIO_DESCUENTO_TRIGGER). Si algún ítem no alcanza se
+            # lanza ExistenciaInsuficiente y la transacción deshace la factura completa
+            por_descontar = {tipo: defaultdict(int) for tipo in MODELOS_DESCUENTO}
             for detalle_data in detalles_data:
-                try:
-                    TblDetallesFactura.objects.create(
-                        numero_factura=factura,
-                        tipo_item=detalle_data.get('tipo_item'),
-                        codigo_item=detalle_data.get('codigo_item'),
-                        descripcion=detalle_data.get('descripcion', ''),
-                        cantidad=detalle_data.get('cantidad', 1),
-                        precio_unitario=detalle_data.get('precio_unitario', 0),
-                        descuento=detalle_data.get('descuento', 0)
-                    )
-                    
-                    # Descontar del inventario si es material o insumo
-                    tipo_item = detalle_data.get('tipo_item')
-                    codigo_item = detalle_data.get('codigo_item')
-                    cantidad = detalle_data.get('cantidad', 0)
-                    
-                    if tipo_item == 'MATERIAL':
-                        try:
-                            material = TblStockMateriales.objects.get(codigo_material=codigo_item)
-                            if material.cantidad_existencia >= cantidad:
-                                material.cantidad_existencia -= cantidad
-                                material.save()
-                                print(f" Material {codigo_item} descontado del inventario")
-                            else:
-                                print(f" Stock insuficiente para material {codigo_item}")
-                        except TblStockMateriales.DoesNotExist:
-                            print(f" Material {codigo_item} no encontrado en inventario")
-                    
-                    elif tipo_item == 'INSUMO':
-                        try:
-                            insumo = TblStockInsumos.objects.get(codigo_insumo=codigo_item)
-                            if insumo.cantidad_existencia >= cantidad:
-                                insumo.cantidad_existencia -= cantidad
-                                insumo.save()
-                                print(f"Insumo {codigo_item} descontado del inventario")
-                            else:
-                                print(f"Stock insuficiente para insumo {codigo_item}")
-                        except TblStockInsumos.DoesNotExist:
-                            print(f"Insumo {codigo_item} no encontrado en inventario")
-                            
-                except Exception as e:
-                    print(f"Error creando detalle: {e}")
-                    continue
-            
+                tipo_item = (detalle_data.get('tipo_item') or '').lower()
+                if tipo_item in por_descontar:
+                    por_descontar[tipo_item][detalle_data.get('codigo_item')] += detalle_data.get('cantidad', 0)
+
+            for tipo_item, cantidades in por_descontar.items():
+                # bulk_create no emite post_save: descontar_existencias sube a mano la marca
+                # del catálogo (GET condicional)
+                descontados = descontar_existencias(tipo_item, cantidades)
+                if descontados:
+                    print(f" {descontados} ítems ({tipo_item}) descontados del inventario")
+
             # Crear orden de trabajo si aplica
             if orden_trabajo_data and validated_data['tipo_venta'] in ['FABRICACION', 'REPARACION']:
                 try:
@@ -1057,6 +1204,7 @@ class CrearFacturaSimpleSerializer(serializers.Serializer):
             factura = TblFacturas.objects.create(**factura_data)
 
             print("Factura #{} creada".format(factura.numero_factura))
+            registrar_cambio_factura(despues=clave_factura(factura))
 
             # Crear detalles de productos
             # IMPORTANTE: Para FABRICACIÓN y REPARACIÓN, los productos son el resultado del trabajo
@@ -0,0 +1,85 @@
+# backend/api/streaming.py
+from itertools import islice
+
+from django.http import StreamingHttpResponse
+
+from .renderers import RendererJSONRapido, RendererMsgPack, empaquetador_msgpack
+
+# Filas que se cargan, serializan y escriben por vuelta
+TAMANO_LOTE = 500
+
+
+def _lotes(iterable, tamano):
+    iterador = iter(iterable)
+    while True:
+        lote = list(islice(iterador, tamano))
+        if not lote:
+            return
+        yield lote
+
+
+def generar_json(queryset, serializer_class, tamano_lote=TAMANO_LOTE, context=None):
+    """
+    Genera un arreglo JSON por fragmentos.
+    - Recorre el queryset con iterator(chunk_size): los prefetch_related se hacen por lote.
+    - Cada lote se serializa con many=True (resolución de nombres en bloque por lote).
+      Todos los lotes comparten un contexto: CargadorRelaciones y ResolverNombresItems
+      son uno por respuesta y lo ya cargado no se vuelve a consultar en el lote siguiente.
+      La memoria crece con las filas relacionadas distintas, no con las facturas.
+    """
+    renderer = RendererJSONRapido()
+    contexto = dict(context or {})
+    primero = True
+
+    yield b'['
+    for lote in _lotes(queryset.iterator(chunk_size=tamano_lote), tamano_lote):
+        data = serializer_class(lote, many=True, context=contexto).data
+        # '[a,b,c]' -> 'a,b,c' para unirlo al arreglo que ya se está escribiendo
+        fragmento = renderer.render(data)[1:-1]
+        if not fragmento:
+            continue
+        if not primero:
+            yield b','
+        yield fragmento
+        primero = False
+    yield b']'
+
+
+def respuesta_json_streaming(queryset, serializer_class, tamano_lote=TAMANO_LOTE, context=None):
+    """StreamingHttpResponse con el mismo JSON que devolvería Response(serializer.data)"""
+    return StreamingHttpResponse(
+        generar_json(queryset, serializer_class, tamano_lote, context),
+        content_type='application/json'
+    )
+
+
+def generar_msgpack(queryset, serializer_class, tamano_lote=TAMANO_LOTE, context=None):
+    """
+    El mismo arreglo en MessagePack, por lotes.
+    - El formato lleva el largo del arreglo al inicio: primero se leen las PK (en el
+      orden de la lista) y después las filas por lotes de PK.
+    - Una fila borrada mientras se descarga sale como nil, para no romper el arreglo.
+    - Un contexto para todos los lotes, como en generar_json.
+    """
+    empaquetador = empaquetador_msgpack()
+    contexto = dict(context or {})
+    pks = list(queryset.prefetch_related(None).values_list('pk', flat=True))
+
+    yield empaquetador.pack_array_header(len(pks))
+    for lote in _lotes(pks, tamano_lote):
+        por_pk = {fila.pk: fila for fila in queryset.filter(pk__in=lote)}
+        filas = [por_pk[pk] for pk in lote if pk in por_pk]
+        datos = iter(serializer_class(filas, many=True, context=contexto).data)
+        yield b''.join(
+            empaquetador.pack(next(datos) if pk in por_pk else None) for pk in lote
+        )
+
+
+def respuesta_streaming(request, queryset, serializer_class, tamano_lote=TAMANO_LOTE, context=None):
+    """JSON o MessagePack por lotes según el formato negociado para la petición"""
+    if isinstance(getattr(request, 'accepted_renderer', None), RendererMsgPack):
+        return StreamingHttpResponse(
+            generar_msgpack(queryset, serializer_class, tamano_lote, context),
+            content_type=RendererMsgPack.media_type
+        )
+    return respuesta_json_streaming(queryset, serializer_class, tamano_lote, context)
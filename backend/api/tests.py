@@ -1,3 +1,1293 @@
-from django.test import TestCase
+"""
+Pruebas de número de consultas, GET condicional, compresión y formatos (JSON, MessagePack).
+Corren sobre la base local del perfil de benchmarks:
+    python manage.py test api --settings=backend.settings_benchmark
+"""
+import gzip
+import io
+import json
+import os
+import tempfile
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import caches
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient, APIRequestFactory
+
+from .models import (
+    PerfilesEmpleados, TblClientes, TblEmpleados, TblFacturas, TblDetallesFactura,
+    TblCotizaciones, TblOrdenesTrabajo, TblProvedores, TblResumenVentasDiarias, TblServicios, TblStockInsumos, TblStockJoyas, TblStockMateriales,
+)
+from .periodos import ahora_local, ahora_utc, utc_a_local
+from . import views
+
+
+class DatosBaseMixin:
+    """Catálogo mínimo: un empleado, clientes, un proveedor y ítems de cada tipo"""
+
+    @classmethod
+    def setUpTestData(cls):
+        PerfilesEmpleados.objects.create(codigo_perfil=1, perfil='Administrador', rol='admin')
+        cls.empleado = TblEmpleados.objects.create(
+            codigo_perfil_id=1, nombre='Ana', apellido='López', usuario='ana', contrasena='x'
+        )
+        cls.clientes = [
+            TblClientes.objects.create(
+                numero_identidad=f'0801199000{i:03d}', nombre=f'Cliente {i}', apellido='Prueba', telefono=99990000 + i
+            )
+            for i in range(3)
+        ]
+        cls.proveedor = TblProvedores.objects.create(nombre='Proveedor')
+        for i in range(3):
+            TblStockJoyas.objects.create(nombre=f'Joya {i}')
+            TblServicios.objects.create(nombre_servicio=f'Servicio {i}')
+            TblStockMateriales.objects.create(
+                nombre=f'Material {i}', codigo_provedor=cls.proveedor, cantidad_existencia=10, costo=Decimal('5')
+            )
+            TblStockInsumos.objects.create(
+                nombre=f'Insumo {i}', codigo_provedor=cls.proveedor, cantidad_existencia=10, costo=Decimal('2')
+            )
+
+    def setUp(self):
+        super().setUp()
+        # La caché compartida (convención de fechas, KPIs) no se deshace con la transacción de la prueba
+        caches['compartida'].clear()
+
+    def crear_facturas(self, cantidad):
+        for n in range(cantidad):
+            factura = TblFacturas.objects.create(
+                id_cliente=self.clientes[n % len(self.clientes)], id_empleado=self.empleado,
+                subtotal=Decimal('100'), isv=Decimal('15'), total=Decimal('115')
+            )
+            TblDetallesFactura.objects.bulk_create([
+                TblDetallesFactura(
+                    numero_factura=factura, tipo_item=tipo, codigo_item=n % 3 + 1,
+                    descripcion=tipo.lower(), cantidad=1, precio_unitario=Decimal('25')
+                )
+                for tipo in ('JOYA', 'SERVICIO', 'MATERIAL', 'INSUMO')
+            ])
+
+
+class ConsultasFacturasTests(DatosBaseMixin, TestCase):
+    """Listas de facturas: las consultas no deben crecer con el número de facturas (sin N+1)"""
+
+    def consultas(self, hacer_peticion):
+        with CaptureQueriesContext(connection) as capturadas:
+            hacer_peticion()
+        return len(capturadas)
+
+    def test_lista_facturas_consultas_constantes(self):
+        client = APIClient()
+
+        self.crear_facturas(2)
+        pocas = self.consultas(lambda: self.assertEqual(client.get('/api/facturas/').status_code, 200))
+
+        self.crear_facturas(8)
+        muchas = self.consultas(lambda: self.assertEqual(len(client.get('/api/facturas/').json()), 10))
+
+        self.assertEqual(pocas, muchas)
+
+    def test_facturas_completas_streaming_consultas_constantes(self):
+        factory = APIRequestFactory()
+
+        def leer():
+            response = views.obtener_facturas_completas(factory.get('/api/facturas/completas/'))
+            return b''.join(response.streaming_content)
+
+        self.crear_facturas(2)
+        pocas = self.consultas(leer)
+
+        self.crear_facturas(8)
+        muchas = self.consultas(leer)
+
+        self.assertEqual(pocas, muchas)
+
+    def test_fields_omite_detalles_y_su_consulta(self):
+        client = APIClient()
+        self.crear_facturas(3)
+
+        with CaptureQueriesContext(connection) as capturadas:
+            datos = client.get('/api/facturas/?fields=numero_factura,total').json()
+        self.assertEqual(datos[0].keys(), {'numero_factura', 'total'})
+        # Sin detalles no hay prefetch de Tbl_Detalles_Factura ni resolución de nombres
+        self.assertEqual(len(capturadas), 1)
+
+        completa = client.get('/api/facturas/?expand=detalles').json()[0]
+        self.assertIn('detalles', completa)
+        self.assertNotIn('detalles', client.get('/api/facturas/?expand=').json()[0])
+
+    def test_proveedores_estadisticas_consultas_constantes(self):
+        factory = APIRequestFactory()
+        pedir = lambda: views.proveedores_estadisticas(factory.get('/api/proveedores/estadisticas/'))
+
+        pocos = self.consultas(pedir)
+        for i in range(10):
+            TblProvedores.objects.create(nombre=f'Proveedor extra {i}')
+        muchos = self.consultas(pedir)
+
+        self.assertEqual(pocos, muchos)
+        self.assertEqual(pedir().data['top_proveedores'][0]['total_productos'], 6)
+
+
+class GetCondicionalTests(DatosBaseMixin, TestCase):
+    """Catálogos: 304 sin serializar mientras la marca de cambio de la tabla no se mueva"""
+
+    def test_lista_sin_cambios_responde_304(self):
+        client = APIClient()
+        etag = client.get('/api/materiales/')['ETag']
+
+        with CaptureQueriesContext(connection) as capturadas:
+            response = client.get('/api/materiales/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        # Solo la lectura de las marcas; ni la tabla ni el serializer
+        self.assertEqual(len(capturadas), 1)
+
+    def test_cambio_en_tabla_relacionada_invalida_etag(self):
+        client = APIClient()
+        etag = client.get('/api/materiales/')['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.proveedor.nombre = 'Proveedor renombrado'
+            self.proveedor.save()
+
+        response = client.get('/api/materiales/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_descuento_de_existencias_invalida_etag(self):
+        from .inventario import descontar_existencias
+
+        client = APIClient()
+        etag = client.get('/api/insumos/')['ETag']
+        insumo = TblStockInsumos.objects.first()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(descontar_existencias('insumo', {insumo.pk: 1}), 1)
+        self.assertEqual(client.get('/api/insumos/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_marca_sube_al_confirmar_la_transaccion(self):
+        from .cambios import marcas, registrar_cambio
+
+        antes = marcas(TblStockInsumos)
+        with self.captureOnCommitCallbacks() as pendientes:
+            registrar_cambio(TblStockInsumos)
+            # Dentro de la transacción la fila de Tbl_Configuracion no se toca
+            self.assertEqual(marcas(TblStockInsumos), antes)
+        self.assertEqual(len(pendientes), 1)
+
+        pendientes[0]()
+        self.assertNotEqual(marcas(TblStockInsumos), antes)
+
+    def test_factura_completa_con_joyas_invalida_etag(self):
+        client = APIClient()
+        etag = client.get('/api/joyas/')['ETag']
+        joya = TblStockJoyas.objects.first()
+        TblStockJoyas.objects.filter(pk=joya.pk).update(cantidad_existencia=1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = client.post('/api/facturas/crear-completa/', {
+                'id_cliente': self.clientes[0].pk, 'id_empleado': self.empleado.pk,
+                'direccion': 'Centro', 'telefono': '99990000', 'tipo_venta': 'VENTA',
+                'detalles': [{'tipo_item': 'JOYA', 'codigo_item': joya.pk, 'descripcion': 'joya',
+                              'cantidad': 1, 'precio_unitario': '100.00'}],
+            }, format='json')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(client.get('/api/joyas/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class DescontarExistenciasTests(DatosBaseMixin, TestCase):
+    """crear-completa descuenta el stock en la misma transacción que la factura"""
+
+    def crear_factura(self, detalles):
+        return APIClient().post('/api/facturas/crear-completa/', {
+            'id_cliente': self.clientes[0].pk, 'id_empleado': self.empleado.pk,
+            'direccion': 'Centro', 'telefono': '99990000', 'tipo_venta': 'VENTA',
+            'detalles': [
+                {'descripcion': 'item', 'precio_unitario': '10.00', **detalle} for detalle in detalles
+            ],
+        }, format='json')
+
+    def existencias(self, modelo):
+        return dict(modelo.objects.values_list('pk', 'cantidad_existencia'))
+
+    def test_descuenta_joyas_materiales_e_insumos(self):
+        joya = TblStockJoyas.objects.first()
+        TblStockJoyas.objects.filter(pk=joya.pk).update(cantidad_existencia=3)
+        material = TblStockMateriales.objects.first()
+        insumo = TblStockInsumos.objects.first()
+
+        response = self.crear_factura([
+            {'tipo_item': 'JOYA', 'codigo_item': joya.pk, 'cantidad': 2},
+            {'tipo_item': 'MATERIAL', 'codigo_item': material.pk, 'cantidad': 4},
+            {'tipo_item': 'MATERIAL', 'codigo_item': material.pk, 'cantidad': 1},
+            {'tipo_item': 'INSUMO', 'codigo_item': insumo.pk, 'cantidad': 10},
+        ])
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.existencias(TblStockJoyas)[joya.pk], 1)
+        self.assertEqual(self.existencias(TblStockMateriales)[material.pk], 5)
+        self.assertEqual(self.existencias(TblStockInsumos)[insumo.pk], 0)
+
+    @override_settings(INVENTARIO_DESCUENTO_TRIGGER=('JOYA',))
+    def test_joyas_del_trigger_solo_se_revisan(self):
+        from .inventario import ExistenciaInsuficiente, descontar_existencias
+
+        joya = TblStockJoyas.objects.first()
+        TblStockJoyas.objects.filter(pk=joya.pk).update(cantidad_existencia=2)
+
+        # Con el trigger la existencia ya viene descontada: la aplicación no la toca
+        self.assertEqual(descontar_existencias('joya', {joya.pk: 1}), 1)
+        self.assertEqual(self.existencias(TblStockJoyas)[joya.pk], 2)
+
+        # ...pero si el trigger la dejó en negativo la venta no sigue
+        TblStockJoyas.objects.filter(pk=joya.pk).update(cantidad_existencia=-1)
+        with self.assertRaises(ExistenciaInsuficiente):
+            descontar_existencias('joya', {joya.pk: 1})
+
+    def test_existencia_insuficiente_deshace_la_factura(self):
+        material = TblStockMateriales.objects.first()
+        insumo = TblStockInsumos.objects.first()
+        antes = (self.existencias(TblStockMateriales), self.existencias(TblStockInsumos))
+        facturas = TblFacturas.objects.count()
+        detalles = TblDetallesFactura.objects.count()
+
+        for detalles_factura in (
+            # El material alcanza y se descuenta antes; el insumo no alcanza
+            [{'tipo_item': 'MATERIAL', 'codigo_item': material.pk, 'cantidad': 3},
+             {'tipo_item': 'INSUMO', 'codigo_item': insumo.pk, 'cantidad': 11}],
+            # Dos líneas del mismo material que juntas superan la existencia
+            [{'tipo_item': 'MATERIAL', 'codigo_item': material.pk, 'cantidad': 6},
+             {'tipo_item': 'MATERIAL', 'codigo_item': material.pk, 'cantidad': 5}],
+            # Ítem que no existe
+            [{'tipo_item': 'INSUMO', 'codigo_item': 999999, 'cantidad': 1}],
+        ):
+            response = self.crear_factura(detalles_factura)
+
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('Existencia insuficiente', response.json()['error'])
+            self.assertEqual(TblFacturas.objects.count(), facturas)
+            self.assertEqual(TblDetallesFactura.objects.count(), detalles)
+            self.assertEqual((self.existencias(TblStockMateriales), self.existencias(TblStockInsumos)), antes)
+
+    def test_update_condicional(self):
+        from .inventario import descontar_existencias
+
+        insumos = list(TblStockInsumos.objects.order_by('pk').values_list('pk', flat=True))
+        with CaptureQueriesContext(connection) as capturadas:
+            descontar_existencias('insumo', {insumos[0]: 2, insumos[1]: 1, insumos[2]: 1})
+
+        updates = [q['sql'] for q in capturadas.captured_queries if q['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 1)
+        # Un WHEN por cantidad distinta, en el SET y en el WHERE; sin leer las existencias
+        self.assertEqual(updates[0].count('WHEN'), 4)
+        self.assertFalse(any(q['sql'].startswith('SELECT') for q in capturadas.captured_queries))
+        self.assertEqual(
+            [self.existencias(TblStockInsumos)[pk] for pk in insumos], [8, 9, 9]
+        )
+
+    def test_lote_que_no_alcanza_no_cambia_nada(self):
+        from .inventario import ExistenciaInsuficiente, descontar_existencias
+
+        material, otro, sin_existencia = TblStockMateriales.objects.order_by('pk')[:3]
+        TblStockMateriales.objects.filter(pk=sin_existencia.pk).update(cantidad_existencia=None)
+        antes = self.existencias(TblStockMateriales)
+
+        with self.assertRaises(ExistenciaInsuficiente) as error:
+            descontar_existencias('material', {material.pk: 10, otro.pk: 11, sin_existencia.pk: 1, 999999: 1})
+
+        self.assertEqual(error.exception.codigos, [otro.pk, sin_existencia.pk, 999999])
+        self.assertEqual(self.existencias(TblStockMateriales), antes)
+
+
+class ActualizarStockMasivoTests(DatosBaseMixin, TestCase):
+    """inventario/actualizar-stock/: los ítems válidos se guardan, los inválidos se reportan por posición"""
+
+    url = '/api/inventario/actualizar-stock/'
+
+    def existencias(self, modelo):
+        return dict(modelo.objects.values_list('pk', 'cantidad_existencia'))
+
+    def test_items_validos_e_invalidos(self):
+        material, otro_material = TblStockMateriales.objects.order_by('pk')[:2]
+        insumo = TblStockInsumos.objects.first()
+        client = APIClient()
+        etag = client.get('/api/materiales/')['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = client.post(self.url, {'updates': [
+                {'tipo': 'material', 'codigo': material.pk, 'cantidad': 25},
+                {'tipo': 'joya', 'codigo': 1, 'cantidad': 1},
+                {'tipo': 'INSUMO', 'codigo': str(insumo.pk), 'cantidad': '7'},
+                {'tipo': 'insumo', 'codigo': 'abc', 'cantidad': 1},
+                {'tipo': 'material', 'codigo': otro_material.pk, 'cantidad': -3},
+                {'tipo': 'material', 'codigo': 999999, 'cantidad': 1},
+                'material',
+                {'tipo': 'material', 'codigo': material.pk, 'cantidad': 30},
+            ]}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        datos = response.json()
+        # El código repetido cuenta una vez (gana el último)
+        self.assertEqual(datos['actualizados'], 2)
+        self.assertEqual([(e['posicion'], e['error']) for e in datos['errores']], [
+            (1, 'Tipo de ítem no válido'),
+            (3, 'Código de ítem no válido'),
+            (4, 'La cantidad debe ser un entero no negativo'),
+            (5, 'Ítem no encontrado'),
+            (6, 'Cada update debe ser un objeto con tipo, codigo y cantidad'),
+        ])
+        self.assertEqual(self.existencias(TblStockMateriales)[material.pk], 30)
+        self.assertEqual(self.existencias(TblStockMateriales)[otro_material.pk], 10)
+        self.assertEqual(self.existencias(TblStockInsumos)[insumo.pk], 7)
+        self.assertEqual(client.get('/api/materiales/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_error_al_guardar_deshace_todo(self):
+        from django.db import DatabaseError
+
+        material = TblStockMateriales.objects.first()
+        insumo = TblStockInsumos.objects.first()
+        antes = (self.existencias(TblStockMateriales), self.existencias(TblStockInsumos))
+
+        # Los materiales se guardan primero; falla el bulk_update de insumos
+        with mock.patch.object(TblStockInsumos.objects, 'bulk_update', side_effect=DatabaseError('sin conexión')):
+            response = APIClient().post(self.url, {'updates': [
+                {'tipo': 'material', 'codigo': material.pk, 'cantidad': 99},
+                {'tipo': 'insumo', 'codigo': insumo.pk, 'cantidad': 99},
+            ]}, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('sin conexión', response.json()['error'])
+        self.assertEqual((self.existencias(TblStockMateriales), self.existencias(TblStockInsumos)), antes)
+
+    def test_updates_no_es_lista(self):
+        response = APIClient().post(self.url, {'updates': {'tipo': 'material'}}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class PaginacionCursorTests(DatosBaseMixin, TestCase):
+    """Paginación por cursor: recorrer todas las páginas trae cada fila una sola vez"""
+
+    def setUp(self):
+        super().setUp()
+        self.crear_facturas(7)
+        # Todas con la misma fecha: la llave del cursor empata en todas las filas
+        TblFacturas.objects.update(fecha=datetime(2026, 1, 15, 10, 30))
+        self.todas = sorted(TblFacturas.objects.values_list('pk', flat=True), reverse=True)
+
+    def test_orden_con_desempate_por_pk(self):
+        from types import SimpleNamespace
+
+        from rest_framework.request import Request
+
+        from .pagination import PaginacionCursor
+
+        factory = APIRequestFactory()
+        vista = SimpleNamespace(orden_cursor='-fecha')
+        url = '/api/facturas/?page_size=2'
+        vistas = []
+        while url:
+            paginador = PaginacionCursor()
+            pagina = paginador.paginate_queryset(TblFacturas.objects.all(), Request(factory.get(url)), vista)
+            self.assertEqual(paginador.ordering, ('-fecha', '-numero_factura'))
+            vistas.extend(factura.pk for factura in pagina)
+            url = paginador.get_next_link()
+
+        self.assertEqual(vistas, self.todas)
+
+    def test_endpoint_paginado(self):
+        client = APIClient()
+        url = '/api/facturas/?page_size=3&fields=numero_factura'
+        vistas = []
+        while url:
+            datos = client.get(url).json()
+            vistas.extend(factura['numero_factura'] for factura in datos['results'])
+            url = datos['next']
+
+        self.assertEqual(vistas, self.todas)
+        # Sin parámetros de paginación sigue siendo la lista completa
+        self.assertEqual(len(client.get('/api/facturas/').json()), len(self.todas))
+
+
+class ResumenVentasTests(DatosBaseMixin, TestCase):
+    """Tbl_Resumen_Ventas_Diarias: lo que suma cada cambio de factura = reconstruir_resumen()"""
+
+    def filas_resumen(self):
+        return sorted(
+            TblResumenVentasDiarias.objects.filter(cantidad__gt=0)
+            .values_list('fecha', 'tipo_venta', 'estado_pago', 'cantidad', 'total')
+        )
+
+    def assertIgualAReconstruir(self):
+        from .resumen_ventas import reconstruir_resumen
+
+        incremental = self.filas_resumen()
+        reconstruir_resumen()
+        self.assertEqual(incremental, self.filas_resumen())
+        return incremental
+
+    def crear_factura(self, total):
+        response = self.client.post('/api/facturas/crear-completa/', {
+            'id_cliente': self.clientes[0].pk, 'id_empleado': self.empleado.pk,
+            'direccion': 'Centro', 'telefono': '99990000', 'tipo_venta': 'VENTA',
+            'detalles': [{'tipo_item': 'SERVICIO', 'codigo_item': 1, 'descripcion': 'servicio',
+                          'cantidad': 1, 'precio_unitario': total}],
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        return TblFacturas.objects.latest('numero_factura')
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+
+    def test_crear_pagar_y_anular(self):
+        pagada = self.crear_factura('100.00')
+        anulada = self.crear_factura('50.00')
+        self.crear_factura('20.00')
+        dia = utc_a_local(pagada.fecha).date()
+
+        response = self.client.post(
+            f'/api/facturas/{pagada.pk}/estado-pago/', {'estado_pago': 'PAGADA', 'metodo_pago': 'EFECTIVO'}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.post(f'/api/facturas/{anulada.pk}/anular/').status_code, 200)
+
+        filas = self.assertIgualAReconstruir()
+        totales = {(f[0], f[2]): (f[3], f[4]) for f in filas}
+        self.assertEqual(totales[(dia, 'PAGADA')][0], 1)
+        self.assertEqual(totales[(dia, 'CANCELADA')][0], 1)
+        self.assertEqual(totales[(dia, 'PENDIENTE')][0], 1)
+        self.assertEqual(sum(cantidad for cantidad, _ in totales.values()), 3)
+
+    def test_convertir_cotizacion(self):
+        cotizacion = TblCotizaciones.objects.create(
+            id_cliente=self.clientes[1], id_empleado=self.empleado, direccion='Centro',
+            telefono='99990000', subtotal=Decimal('100'), isv=Decimal('15'),
+            total=Decimal('115'), tipo_servicio='FABRICACION'
+        )
+
+        response = self.client.post(f'/api/cotizaciones/{cotizacion.pk}/convertir_a_factura/')
+        self.assertEqual(response.status_code, 200)
+
+        filas = self.assertIgualAReconstruir()
+        self.assertEqual([(f[1], f[2], f[3], f[4]) for f in filas],
+                         [('FABRICACION', 'PENDIENTE', 1, Decimal('115.00'))])
+
+    def test_eliminar_factura(self):
+        factura = self.crear_factura('80.00')
+        self.crear_factura('30.00')
+        TblDetallesFactura.objects.filter(numero_factura=factura).delete()
+
+        self.assertEqual(self.client.delete(f'/api/facturas/{factura.pk}/').status_code, 204)
+        self.assertEqual(len(self.assertIgualAReconstruir()), 1)
+
+    def test_dia_local_con_fechas_en_utc(self):
+        from .configuracion import periodo_facturas
+        from .periodos import periodo_dia
+        from .resumen_ventas import reconstruir_resumen
+
+        factura = self.crear_factura('40.00')
+        # Venta de las 20:00 en Honduras guardada en UTC (convención 'utc'): 02:00 del día siguiente
+        TblFacturas.objects.filter(pk=factura.pk).update(fecha=datetime(2025, 3, 10, 2, 0))
+        reconstruir_resumen()
+        self.assertEqual(self.filas_resumen()[0][0], date(2025, 3, 9))
+
+        # Pagarla mueve la fila del mismo día local
+        response = self.client.post(
+            f'/api/facturas/{factura.pk}/estado-pago/', {'estado_pago': 'PAGADA', 'metodo_pago': 'TARJETA'}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.assertIgualAReconstruir(), [(date(2025, 3, 9), 'VENTA', 'PAGADA', 1, Decimal('46.00'))])
+
+        # El resumen y las consultas sobre Tbl_Facturas ven la venta en el mismo día
+        periodo = periodo_facturas(periodo_dia(date(2025, 3, 9)))
+        self.assertTrue(TblFacturas.objects.filter(pk=factura.pk, **periodo.filtro('fecha')).exists())
+
+    def test_dia_segun_la_convencion(self):
+        from . import configuracion
+        from .resumen_ventas import dia_resumen
+
+        self.assertEqual(dia_resumen(datetime(2025, 3, 10, 2, 0)), date(2025, 3, 9))
+        configuracion.guardar(configuracion.CLAVE_CONVENCION_FECHAS, configuracion.CONVENCION_LOCAL)
+        self.assertEqual(dia_resumen(datetime(2025, 3, 10, 2, 0)), date(2025, 3, 10))
+
+
+class MediaTemporalMixin:
+    """MEDIA_ROOT en un directorio temporal por prueba"""
+
+    def setUp(self):
+        super().setUp()
+        self.media = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media.cleanup)
+        ajustes = override_settings(MEDIA_ROOT=self.media.name)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+
+class ServirMediaTests(MediaTemporalMixin, TestCase):
+    """Imágenes de MEDIA_ROOT: ETag + revalidación; immutable solo en rutas que no cambian de contenido"""
+
+    def setUp(self):
+        super().setUp()
+        self.ruta = os.path.join(self.media.name, 'joya.webp')
+        self.escribir(b'imagen original')
+
+    def escribir(self, contenido, mtime_ns=1_700_000_000_000_000_000):
+        with open(self.ruta, 'wb') as archivo:
+            archivo.write(contenido)
+        os.utime(self.ruta, ns=(mtime_ns, mtime_ns))
+
+    def pedir(self, **headers):
+        return views.servir_media(APIRequestFactory().get('/media/joya.webp', **headers), 'joya.webp')
+
+    def test_cabeceras_y_304(self):
+        response = self.pedir()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Cache-Control'], f'public, max-age={views.MEDIA_MAX_AGE_REVALIDAR}')
+
+        revalidada = self.pedir(HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(revalidada.status_code, 304)
+        self.assertEqual(revalidada['ETag'], response['ETag'])
+
+    def test_archivo_sobrescrito_cambia_etag(self):
+        etag = self.pedir()['ETag']
+        self.escribir(b'imagen regenerada', mtime_ns=1_700_000_001_000_000_000)
+
+        response = self.pedir(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(b''.join(response.streaming_content), b'imagen regenerada')
+
+    def test_derivados_immutable_sin_debug(self):
+        from django.conf import settings
+
+        from .imagenes import rutas_derivados_cotizacion
+
+        ruta = rutas_derivados_cotizacion('imagenes_cotizaciones/cotizacion_1_anillo.png')['miniatura']
+        os.makedirs(os.path.join(self.media.name, os.path.dirname(ruta)))
+        with open(os.path.join(self.media.name, ruta), 'wb') as archivo:
+            archivo.write(b'miniatura')
+
+        # La ruta está conectada aunque DEBUG esté apagado (como en producción)
+        self.assertFalse(settings.DEBUG)
+        response = self.client.get(f'{settings.MEDIA_URL}{ruta}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Cache-Control'], f'public, max-age={views.MEDIA_MAX_AGE}, immutable')
+        self.assertEqual(self.client.get('/media/joya.webp')['Cache-Control'],
+                         f'public, max-age={views.MEDIA_MAX_AGE_REVALIDAR}')
+
+
+class ImagenesCotizacionTests(MediaTemporalMixin, DatosBaseMixin, TestCase):
+    """Derivados WebP de las imágenes de cotizaciones: hilo de fondo y comando de relleno"""
+
+    def png(self, ancho=1200, alto=900):
+        from PIL import Image
+
+        salida = io.BytesIO()
+        Image.new('RGB', (ancho, alto), (200, 150, 50)).save(salida, format='PNG')
+        return salida.getvalue()
+
+    def test_derivados_en_hilo_de_fondo(self):
+        from concurrent.futures import ThreadPoolExecutor
+
+        from django.core.files.storage import default_storage
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from PIL import Image
+
+        from . import imagenes
+
+        ejecutor = ThreadPoolExecutor(max_workers=1)
+        with mock.patch.object(imagenes, '_ejecutor_imagenes', ejecutor):
+            ruta = imagenes.guardar_imagen_cotizacion(SimpleUploadedFile('anillo.png', self.png()))
+        ejecutor.shutdown(wait=True)
+
+        self.assertTrue(ruta.startswith(f'{imagenes.CARPETA_COTIZACIONES}/cotizacion_'))
+        for tipo, ruta_derivado in imagenes.derivados_cotizacion_existentes(ruta).items():
+            self.assertIsNotNone(ruta_derivado, tipo)
+            with default_storage.open(ruta_derivado, 'rb') as archivo, Image.open(archivo) as imagen:
+                self.assertEqual(imagen.format, 'WEBP')
+                self.assertLessEqual(max(imagen.size), max(imagenes.DERIVADOS_COTIZACION[tipo]))
+
+    def test_lista_no_revisa_el_disco(self):
+        from django.core.files.base import ContentFile
+        from django.core.files.storage import default_storage
+
+        from .imagenes import VERSION_DERIVADOS
+
+        TblCotizaciones.objects.create(
+            id_cliente=self.clientes[0], id_empleado=self.empleado, direccion='Centro',
+            telefono='99990000', subtotal=Decimal('100'), isv=Decimal('15'), total=Decimal('115'),
+            tipo_servicio='FABRICACION', imagen_referencia='imagenes_cotizaciones/cotizacion_1_anillo.png'
+        )
+
+        def pedir():
+            with mock.patch.object(default_storage, 'exists', side_effect=AssertionError('exists() en la lista')):
+                response = APIClient().get('/api/cotizaciones/')
+            self.assertEqual(response.status_code, 200)
+            return response.json()[0]
+
+        # Sin derivado todavía: la imagen original
+        fila = pedir()
+        self.assertEqual(fila['imagen_miniatura_url'], fila['imagen_url'])
+        self.assertEqual(fila['imagen_media_url'], fila['imagen_url'])
+
+        ruta = f'imagenes_cotizaciones/derivados/cotizacion_1_anillo_png_miniatura.{VERSION_DERIVADOS}.webp'
+        default_storage.save(ruta, ContentFile(b'miniatura'))
+        fila = pedir()
+        self.assertTrue(fila['imagen_miniatura_url'].endswith(ruta))
+        self.assertEqual(fila['imagen_media_url'], fila['imagen_url'])
+
+    def test_derivados_distintos_por_extension(self):
+        from .imagenes import rutas_derivados_cotizacion
+
+        jpg = rutas_derivados_cotizacion('imagenes_cotizaciones/anillo.jpg')
+        png = rutas_derivados_cotizacion('imagenes_cotizaciones/anillo.png')
+        for tipo in jpg:
+            self.assertNotEqual(jpg[tipo], png[tipo])
+
+    def test_comando_genera_los_que_faltan(self):
+        from django.core.files.base import ContentFile
+        from django.core.files.storage import default_storage
+        from django.core.management import call_command
+
+        from .imagenes import derivados_cotizacion_existentes
+
+        rutas = [default_storage.save(f'imagenes_cotizaciones/ref_{n}.png', ContentFile(self.png())) for n in range(2)]
+        for imagen in [*rutas, 'imagenes_cotizaciones/borrada.png']:
+            TblCotizaciones.objects.create(
+                id_cliente=self.clientes[0], id_empleado=self.empleado, direccion='Centro',
+                telefono='99990000', subtotal=Decimal('100'), isv=Decimal('15'), total=Decimal('115'),
+                tipo_servicio='FABRICACION', imagen_referencia=imagen
+            )
+
+        def correr(*args):
+            salida, errores = io.StringIO(), io.StringIO()
+            call_command('generar_derivados_cotizaciones', *args, stdout=salida, stderr=errores)
+            return salida.getvalue(), errores.getvalue()
+
+        salida, errores = correr()
+        self.assertIn('Derivados generados: 2, ya existentes: 0, con error: 1', salida)
+        self.assertIn('borrada.png', errores)
+        self.assertTrue(all(derivados_cotizacion_existentes(rutas[0]).values()))
+
+        self.assertIn('Derivados generados: 0, ya existentes: 2', correr()[0])
+        self.assertIn('Derivados generados: 2, ya existentes: 0', correr('--todas')[0])
+
+
+class ImagenesJoyasTests(MediaTemporalMixin, DatosBaseMixin, TestCase):
+    """Copia local de imagen_url: sin base64 ni exists() por fila en listas, descarga en segundo plano"""
+
+    URL = 'https://ejemplo.com/anillo.png'
+
+    def png(self):
+        from PIL import Image
+
+        salida = io.BytesIO()
+        Image.new('RGB', (400, 300), (10, 120, 200)).save(salida, format='PNG')
+        return salida.getvalue()
+
+    def guardar_copia(self, url):
+        from django.core.files.base import ContentFile
+        from django.core.files.storage import default_storage
+
+        from .imagenes import rutas_imagen_joya
+
+        for ruta in rutas_imagen_joya(url).values():
+            default_storage.save(ruta, ContentFile(b'copia local'))
+
+    def test_lista_sin_base64_ni_exists(self):
+        from django.core.files.storage import default_storage
+
+        joya = TblStockJoyas.objects.first()
+        TblStockJoyas.objects.filter(pk=joya.pk).update(imagen_url=self.URL)
+        self.guardar_copia(self.URL)
+
+        with mock.patch.object(default_storage, 'exists', side_effect=AssertionError('exists() por fila')):
+            filas = APIClient().get('/api/joyas/').json()
+
+        self.assertTrue(all('imagen_base64' not in fila for fila in filas))
+        con_copia = next(fila for fila in filas if fila['codigo_joya'] == joya.pk)
+        self.assertTrue(con_copia['imagen_miniatura_url'].endswith('_miniatura.jpg'))
+        self.assertTrue(all(fila['imagen_local_url'] is None for fila in filas if fila is not con_copia))
+
+    def test_detalle_con_base64(self):
+        import base64
+
+        joya = TblStockJoyas.objects.first()
+        TblStockJoyas.objects.filter(pk=joya.pk).update(imagen_url=self.URL)
+        self.guardar_copia(self.URL)
+
+        detalle = APIClient().get(f'/api/joyas/{joya.pk}/').json()
+        self.assertEqual(base64.b64decode(detalle['imagen_base64']), b'copia local')
+
+    def test_descarga_fuera_de_la_peticion(self):
+        from concurrent.futures import ThreadPoolExecutor
+
+        from . import imagenes
+
+        respuesta_http = mock.Mock(content=self.png())
+        ejecutor = ThreadPoolExecutor(max_workers=1)
+        with mock.patch.object(imagenes.requests, 'get', return_value=respuesta_http) as descargar, \
+                mock.patch.object(imagenes, 'registrar_cambio') as registrar, \
+                mock.patch.object(imagenes, '_ejecutor_imagenes', ejecutor):
+            with self.captureOnCommitCallbacks() as al_confirmar:
+                response = APIClient().post('/api/joyas/', {'nombre': 'Anillo', 'imagen_url': self.URL}, format='json')
+                self.assertEqual(response.status_code, 201)
+            descargar.assert_not_called()
+
+            for callback in al_confirmar:
+                callback()
+            ejecutor.shutdown(wait=True)
+
+        descargar.assert_called_once_with(self.URL, timeout=10)
+        registrar.assert_called_once_with(TblStockJoyas)
+        self.assertIsNotNone(imagenes.imagen_joya_en_cache(self.URL))
+
+
+class CamposDinamicosTests(DatosBaseMixin, TestCase):
+    """?fields= / ?expand=: sin parámetros la respuesta de siempre; imagen_base64 nunca en listas"""
+
+    def test_lista_completa_salvo_que_se_recorte(self):
+        self.crear_facturas(2)
+        client = APIClient()
+
+        self.assertEqual([len(f['detalles']) for f in client.get('/api/facturas/').json()], [4, 4])
+        self.assertTrue(all('detalles' not in f for f in client.get('/api/facturas/?expand=').json()))
+        self.assertEqual(
+            client.get('/api/facturas/?fields=numero_factura,total').json()[0].keys(), {'numero_factura', 'total'}
+        )
+        # facturas/completas existe para dar las líneas: salen aunque ?fields= no las nombre
+        completas = json.loads(b''.join(
+            client.get('/api/facturas/completas/?fields=numero_factura').streaming_content
+        ))
+        self.assertEqual(completas[0].keys(), {'numero_factura', 'detalles'})
+        self.assertEqual(len(completas[0]['detalles']), 4)
+
+    def test_lista_sin_costosos_no_precarga_detalles(self):
+        self.crear_facturas(3)
+        client = APIClient()
+
+        with CaptureQueriesContext(connection) as sin_detalles:
+            client.get('/api/facturas/?expand=')
+        with CaptureQueriesContext(connection) as con_detalles:
+            client.get('/api/facturas/')
+        self.assertLess(len(sin_detalles), len(con_detalles))
+
+    def test_base64_nunca_en_listas(self):
+        client = APIClient()
+        TblCotizaciones.objects.create(
+            id_cliente=self.clientes[0], id_empleado=self.empleado, direccion='Centro',
+            telefono='99990000', subtotal=Decimal('100'), isv=Decimal('15'), total=Decimal('115'),
+            tipo_servicio='FABRICACION'
+        )
+
+        for url in ('/api/joyas/?fields=codigo_joya,imagen_base64', '/api/joyas/?expand=imagen_base64',
+                    '/api/cotizaciones/?fields=numero_cotizacion,imagen_base64',
+                    '/api/cotizaciones/?expand=imagen_base64'):
+            filas = client.get(url).json()
+            self.assertTrue(filas, url)
+            self.assertTrue(all('imagen_base64' not in fila for fila in filas), url)
+
+        cotizacion = client.get('/api/cotizaciones/').json()[0]
+        self.assertEqual(cotizacion['cliente_info']['nombre'], 'Cliente 0')
+        self.assertIn('empleado_info', cotizacion)
+        numero = cotizacion['numero_cotizacion']
+        detalle = client.get(f'/api/cotizaciones/{numero}/?imagen_base64=1').json()
+        self.assertIn('imagen_base64', detalle)
+        self.assertEqual(detalle['cliente_info']['nombre'], 'Cliente 0')
+
+
+class NormalizarFechasTests(DatosBaseMixin, TestCase):
+    """normalizar_fechas_facturas: por lotes, reanudable, y la convención cambia solo al terminar"""
+
+    UTC = datetime(2024, 3, 1, 2, 30)
+    LOCAL = datetime(2024, 2, 29, 20, 30)
+
+    def setUp(self):
+        super().setUp()
+        self.crear_facturas(5)
+        TblFacturas.objects.update(fecha=self.UTC)
+
+    def correr(self, *args):
+        salida = io.StringIO()
+        call_command('normalizar_fechas_facturas', *args, '--espera', '0', stdout=salida)
+        return salida.getvalue()
+
+    def nueva_factura(self):
+        return TblFacturas.objects.create(
+            id_cliente=self.clientes[0], id_empleado=self.empleado, subtotal=Decimal('1'),
+            isv=Decimal('0'), total=Decimal('1')
+        )
+
+    def test_factura_anterior_a_la_primera_ejecucion(self):
+        from . import configuracion
+
+        # Desplegado el código y sin correr el backfill: la factura se guarda en UTC
+        antes = ahora_utc()
+        nueva = self.nueva_factura()
+        self.assertGreaterEqual(nueva.fecha, antes)
+        self.assertLessEqual(nueva.fecha, ahora_utc())
+
+        self.correr('--origen', 'utc')
+
+        # Convertida una sola vez, como el historial
+        nueva.refresh_from_db()
+        self.assertLess(abs(nueva.fecha - ahora_local()), timedelta(minutes=1))
+        self.assertEqual(configuracion.convencion_fechas_facturas(), 'local')
+        # Con la convención en hora local las nuevas ya se guardan así
+        self.assertLess(abs(self.nueva_factura().fecha - ahora_local()), timedelta(minutes=1))
+
+    def test_corrige_facturas_guardadas_en_utc_tras_el_cambio(self):
+        self.correr('--origen', 'utc')
+
+        # Una venta que leyó 'utc' antes del cambio y confirmó después del último lote
+        tardia = self.nueva_factura()
+        fecha_utc = ahora_utc().replace(microsecond=0)
+        TblFacturas.objects.filter(pk=tardia.pk).update(fecha=fecha_utc)
+
+        self.assertIn('1 facturas recientes corregidas', self.correr())
+        tardia.refresh_from_db()
+        self.assertEqual(tardia.fecha, utc_a_local(fecha_utc))
+        # El historial (fechas pasadas) no se toca
+        self.assertEqual(set(TblFacturas.objects.exclude(pk=tardia.pk).values_list('fecha', flat=True)), {self.LOCAL})
+
+    def test_sin_convencion_es_utc(self):
+        from .configuracion import convencion_fechas_facturas
+
+        self.assertEqual(convencion_fechas_facturas(), 'utc')
+
+    def test_reanuda_sin_convertir_dos_veces(self):
+        from . import configuracion
+        from .management.commands.normalizar_fechas_facturas import CLAVE_ULTIMA
+
+        numeros = list(TblFacturas.objects.order_by('numero_factura').values_list('numero_factura', flat=True))
+        bulk_update = TblFacturas.objects.bulk_update
+        lotes = []
+
+        def cortar_en_el_segundo_lote(*args, **kwargs):
+            lotes.append(1)
+            if len(lotes) == 2:
+                raise RuntimeError('corte')
+            return bulk_update(*args, **kwargs)
+
+        with mock.patch.object(TblFacturas.objects, 'bulk_update', side_effect=cortar_en_el_segundo_lote):
+            with self.assertRaises(RuntimeError):
+                self.correr('--origen', 'utc', '--lote', '2')
+
+        # Primer lote convertido y registrado; el resto sigue en UTC y la convención también
+        self.assertEqual(configuracion.obtener(CLAVE_ULTIMA), str(numeros[1]))
+        self.assertEqual(configuracion.convencion_fechas_facturas(), 'utc')
+        fechas = dict(TblFacturas.objects.values_list('numero_factura', 'fecha'))
+        self.assertEqual([fechas[n] for n in numeros], [self.LOCAL] * 2 + [self.UTC] * 3)
+
+        # Una factura nueva durante el backfill se guarda en UTC como el resto y también se convierte
+        nueva = self.nueva_factura()
+        fecha_nueva = nueva.fecha
+
+        self.correr('--lote', '2')
+        fechas = dict(TblFacturas.objects.values_list('numero_factura', 'fecha'))
+        self.assertEqual([fechas[n] for n in numeros], [self.LOCAL] * 5)
+        self.assertEqual(fechas[nueva.pk], utc_a_local(fecha_nueva))
+        self.assertEqual(configuracion.convencion_fechas_facturas(), 'local')
+        self.assertIsNone(configuracion.obtener(CLAVE_ULTIMA))
+
+        with self.assertRaises(CommandError):
+            self.correr('--origen', 'utc')
+        self.assertIn('ya están en hora local', self.correr())
+
+    def test_todos_los_procesos_ven_el_cambio(self):
+        from . import configuracion
+        from .models import TblConfiguracion
+
+        # Otro proceso termina el backfill: esta caché local no se entera del guardar()
+        self.assertEqual(configuracion.convencion_fechas_facturas(), 'utc')
+        TblConfiguracion.objects.create(clave=configuracion.CLAVE_CONVENCION_FECHAS, valor='local')
+        self.assertEqual(configuracion.convencion_fechas_facturas(), 'local')
+
+
+class GenerarDatosSinteticosTests(MediaTemporalMixin, TestCase):
+    """El generador conserva sus fechas sin tocar FechaHoraLocalField ni auto_now_add"""
+
+    def test_fechas_generadas(self):
+        from django.db.models import F, Max, Min
+
+        call_command(
+            'generar_datos_sinteticos', '--facturas', '200', '--cotizaciones', '40', '--clientes', '20',
+            '--joyas', '10', '--imagenes', '2', '--lote', '50', stdout=io.StringIO()
+        )
+
+        rango = TblFacturas.objects.aggregate(desde=Min('fecha'), hasta=Max('fecha'))
+        self.assertGreater((rango['hasta'] - rango['desde']).days, 60)
+        self.assertFalse(TblOrdenesTrabajo.objects.exclude(fecha_inicio=F('numero_factura__fecha')).exists())
+        self.assertEqual(TblCotizaciones.objects.values('fecha_creacion').distinct().count(), 40)
+
+        # Los campos quedan como los definen los modelos: lo que guarda la aplicación sigue con la hora actual
+        self.assertTrue(TblCotizaciones._meta.get_field('fecha_creacion').auto_now_add)
+        factura = TblFacturas.objects.create(
+            id_cliente_id=TblClientes.objects.first().pk, id_empleado_id=TblEmpleados.objects.first().pk,
+            fecha=rango['desde'], subtotal=Decimal('1'), isv=Decimal('0'), total=Decimal('1')
+        )
+        self.assertNotEqual(factura.fecha, rango['desde'])
+
+
+class StreamingContextoTests(DatosBaseMixin, TestCase):
+    """Un contexto por respuesta: lo cargado en un lote no se vuelve a pedir en los siguientes"""
+
+    def consultas_por_tabla(self, generador):
+        with CaptureQueriesContext(connection) as capturadas:
+            contenido = b''.join(generador)
+        tablas = ('Tbl_Stock_Joyas', 'Tbl_Servicios')
+        return contenido, {tabla: sum(tabla in q['sql'] for q in capturadas.captured_queries) for tabla in tablas}
+
+    def preparar(self):
+        from .campos import campos_lista
+        from .querysets import facturas_con_relaciones
+        from .serializers import FacturaSerializer
+
+        # 9 facturas en lotes de 3: los mismos 3 códigos de ítem en cada lote
+        self.crear_facturas(9)
+        context = {'campos': campos_lista(None, ('detalles',))}
+        queryset = FacturaSerializer.preparar_queryset(facturas_con_relaciones(), context['campos'])
+        esperado = FacturaSerializer(queryset, many=True, context=dict(context)).data
+        return queryset, FacturaSerializer, context, esperado
+
+    def test_json_un_contexto_para_todos_los_lotes(self):
+        from .streaming import generar_json
+
+        queryset, serializer_class, context, esperado = self.preparar()
+        contenido, consultas = self.consultas_por_tabla(generar_json(queryset, serializer_class, 3, context))
+
+        self.assertEqual(json.loads(contenido), json.loads(json.dumps(esperado)))
+        self.assertEqual(consultas, {'Tbl_Stock_Joyas': 1, 'Tbl_Servicios': 1})
+        # El contexto del llamador no se modifica
+        self.assertEqual(context.keys(), {'campos'})
+
+    def test_msgpack_un_contexto_para_todos_los_lotes(self):
+        from .renderers import msgpack
+        if msgpack is None:
+            self.skipTest('msgpack no está instalado')
+        from .streaming import generar_msgpack
+
+        queryset, serializer_class, context, esperado = self.preparar()
+        contenido, consultas = self.consultas_por_tabla(generar_msgpack(queryset, serializer_class, 3, context))
+
+        self.assertEqual(len(msgpack.unpackb(contenido)), len(esperado))
+        self.assertEqual(consultas, {'Tbl_Stock_Joyas': 1, 'Tbl_Servicios': 1})
+
+
+class CompresionTests(DatosBaseMixin, TestCase):
+    """gzip negociado: el cuerpo descomprimido es idéntico al de la respuesta sin comprimir"""
+
+    def test_streaming_comprimido_por_lotes(self):
+        client = APIClient()
+        self.crear_facturas(20)
+
+        plano = b''.join(client.get('/api/facturas/completas/').streaming_content)
+        response = client.get('/api/facturas/completas/', HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), plano)
+
+    def test_respuestas_pequenas_sin_comprimir(self):
+        response = APIClient().get('/api/hello/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+
+class InstrumentacionSQLTests(DatosBaseMixin, TestCase):
+    """InstrumentacionSQLMiddleware: solo si SQL_PRESUPUESTO['activo'], y cuenta también el streaming"""
+
+    @override_settings(SQL_PRESUPUESTO={'activo': True})
+    def test_cabeceras_con_las_consultas(self):
+        with CaptureQueriesContext(connection) as capturadas:
+            response = APIClient().get('/api/facturas/')
+
+        self.assertEqual(response['X-DB-Queries'], str(len(capturadas)))
+        self.assertEqual(response['X-DB-Duplicates'], '0')
+        self.assertTrue(response.has_header('X-DB-Time-ms'))
+
+    @override_settings(SQL_PRESUPUESTO={'activo': False})
+    def test_inactivo_sin_cabeceras(self):
+        response = APIClient().get('/api/facturas/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('X-DB-Queries'))
+
+    @override_settings(SQL_PRESUPUESTO={'activo': True})
+    def test_streaming_cuenta_todos_los_lotes(self):
+        self.crear_facturas(3)
+
+        with self.assertLogs('api.sql', level='INFO') as logs, CaptureQueriesContext(connection) as capturadas:
+            response = APIClient().get('/api/facturas/completas/')
+            # Las cabeceras ya salieron cuando se ejecutan las consultas de los lotes
+            self.assertFalse(response.has_header('X-DB-Queries'))
+            self.assertEqual(logs.records, [])
+            b''.join(response.streaming_content)
+
+        self.assertEqual(logs.records[-1].sql['consultas'], len(capturadas))
+        self.assertGreater(len(capturadas), 1)
+
+    @override_settings(SQL_PRESUPUESTO={'activo': True, 'consultas': 0, 'estricto': True})
+    def test_presupuesto_estricto(self):
+        from .middleware import PresupuestoSQLExcedido
+
+        with self.assertRaises(PresupuestoSQLExcedido), self.assertLogs('api.sql', level='WARNING'):
+            APIClient().get('/api/facturas/')
+
+
+class RendererJSONTests(DatosBaseMixin, TestCase):
+    """RendererJSONRapido (orjson) debe dar el mismo JSON que el JSONRenderer de DRF"""
+
+    def test_comando_medir_renderers(self):
+        from .renderers import orjson
+        if orjson is None:
+            self.skipTest('orjson no está instalado')
+
+        self.crear_facturas(3)
+        salida = io.StringIO()
+        call_command('medir_renderers', facturas=3, iteraciones=1, stdout=salida)
+        self.assertIn('3 facturas, 12 detalles', salida.getvalue())
+
+    def test_mismo_json_que_drf(self):
+        from rest_framework.renderers import JSONRenderer
+
+        from .renderers import RendererJSONRapido
+        from .serializers import FacturaSerializer
+
+        self.crear_facturas(3)
+        data = {
+            'facturas': FacturaSerializer(TblFacturas.objects.all(), many=True).data,
+            'total': Decimal('115.50'),
+            'texto': 'línea nueva',
+        }
+        self.assertEqual(RendererJSONRapido().render(data), JSONRenderer().render(data))
+
+    def test_floats_como_drf(self):
+        from rest_framework.renderers import JSONRenderer
+
+        from .renderers import RendererJSONRapido
+
+        for valor in (0.0, -0.0, 1.5, 0.0001, 9999999999999998.0, 1e16, -1e22, 1e-05, 2.5e-07,
+                      Decimal('1E+16'), Decimal('0.00001')):
+            data = {'valor': valor, 'lista': [1, valor, {'anidado': valor}]}
+            self.assertEqual(RendererJSONRapido().render(data), JSONRenderer().render(data), valor)
+
+        for valor in (float('nan'), float('inf'), float('-inf'), Decimal('NaN')):
+            with self.assertRaises(ValueError):
+                JSONRenderer().render({'valor': valor})
+            with self.assertRaises(ValueError):
+                RendererJSONRapido().render({'filas': [{'valor': valor}]})
+
+
+class CargadorRelacionesTests(DatosBaseMixin, TestCase):
+    """Relaciones de las listas: una consulta por tabla relacionada, no una por fila"""
+
+    def crear_cotizaciones(self, cantidad):
+        for n in range(cantidad):
+            TblCotizaciones.objects.create(
+                id_cliente=self.clientes[n % len(self.clientes)], id_empleado=self.empleado,
+                direccion='Centro', telefono='99990000', subtotal=Decimal('100'),
+                isv=Decimal('15'), total=Decimal('115'), tipo_servicio='FABRICACION'
+            )
+
+    def test_lista_cotizaciones_consultas_constantes(self):
+        client = APIClient()
+
+        url = '/api/cotizaciones/?expand=cliente_info,empleado_info'
+        self.crear_cotizaciones(2)
+        with CaptureQueriesContext(connection) as pocas:
+            self.assertEqual(client.get(url).status_code, 200)
+
+        self.crear_cotizaciones(7)
+        with CaptureQueriesContext(connection) as muchas:
+            response = client.get(url)
+        self.assertEqual(len(response.json()), 9)
+        self.assertEqual(len(pocas), len(muchas))
+        self.assertEqual(response.json()[0]['empleado_info']['perfil_nombre'], 'Administrador')
+
+    def test_mismo_objeto_para_la_misma_llave(self):
+        from .resolvers import CargadorRelaciones
+
+        self.crear_cotizaciones(6)
+        cotizaciones = list(TblCotizaciones.objects.all())
+        cargador = CargadorRelaciones()
+
+        with self.assertNumQueries(3):
+            cargador.cargar(cotizaciones, 'id_cliente', 'id_empleado__codigo_perfil')
+        # Otra tanda de la misma respuesta: los clientes ya están en el identity map
+        otra_tanda = list(TblCotizaciones.objects.all())
+        with self.assertNumQueries(0):
+            cargador.cargar(otra_tanda, 'id_cliente')
+            self.assertIs(cotizaciones[0].id_cliente, cotizaciones[3].id_cliente)
+            self.assertIs(otra_tanda[0].id_cliente, cotizaciones[0].id_cliente)
+            self.assertEqual(cotizaciones[5].id_empleado.codigo_perfil.perfil, 'Administrador')
+
+
+class LecturaRapidaTests(DatosBaseMixin, TestCase):
+    """LectorValores (values()) debe dar exactamente el JSON de los serializers"""
+
+    def test_mismo_json_que_el_serializer(self):
+        from .lectura_rapida import LectorValores
+        from .renderers import RendererJSONRapido
+        from .serializers import ClienteSerializer, OrdenTrabajoSerializer, StockMaterialSerializer
+
+        TblClientes.objects.create(numero_identidad='1234', rtn='08011990123456', nombre='Sin', telefono=None)
+        self.crear_facturas(2)
+        for estado in ('PENDIENTE', 'EN_PROCESO'):
+            TblOrdenesTrabajo.objects.create(
+                numero_factura=TblFacturas.objects.first(), id_empleado=self.empleado,
+                tipo_orden='REPARACION', estado=estado, costo_mano_obra=Decimal('10.5')
+            )
+
+        renderer = RendererJSONRapido()
+        for serializer_class in (ClienteSerializer, OrdenTrabajoSerializer, StockMaterialSerializer):
+            queryset = serializer_class.Meta.model.objects.order_by('pk')
+            lector = LectorValores(serializer_class)
+            with self.subTest(serializer_class.__name__):
+                self.assertEqual(
+                    renderer.render(lector.representar(lector.valores(queryset))),
+                    renderer.render(serializer_class(queryset, many=True).data),
+                )
+
+    def test_lista_ordenes_una_consulta_por_pagina(self):
+        self.crear_facturas(3)
+        for factura in TblFacturas.objects.all():
+            TblOrdenesTrabajo.objects.create(numero_factura=factura, id_empleado=self.empleado, tipo_orden='AJUSTE')
+
+        with CaptureQueriesContext(connection) as consultas:
+            response = APIClient().get('/api/ordenes-trabajo/?page_size=2&fields=id_orden,cliente_nombre')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(consultas), 1)
+        ultima = TblOrdenesTrabajo.objects.select_related('numero_factura__id_cliente').latest('id_orden')
+        self.assertEqual(response.json()['results'][0], {
+            'id_orden': ultima.id_orden,
+            'cliente_nombre': f'{ultima.numero_factura.id_cliente.nombre} Prueba',
+        })
+
+
+class MsgPackTests(DatosBaseMixin, TestCase):
+    """Accept: application/msgpack: mismos datos que el JSON, dinero como texto exacto"""
+
+    def setUp(self):
+        super().setUp()
+        from .renderers import msgpack
+        if msgpack is None:
+            self.skipTest('msgpack no está instalado')
+        self.msgpack = msgpack
+
+    def test_streaming_mismos_datos_que_json(self):
+        client = APIClient()
+        self.crear_facturas(5)
+
+        como_json = json.loads(b''.join(client.get('/api/facturas/completas/').streaming_content))
+        response = client.get('/api/facturas/completas/', HTTP_ACCEPT='application/msgpack')
+
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+        self.assertEqual(self.msgpack.unpackb(b''.join(response.streaming_content)), como_json)
+
+    def test_decimal_sin_perdida(self):
+        from .renderers import RendererMsgPack
+
+        datos = self.msgpack.unpackb(RendererMsgPack().render({'total': Decimal('12345678901234.57')}))
+        self.assertEqual(datos, {'total': '12345678901234.57'})
+
+
+class PeriodosTests(SimpleTestCase):
+    """api/periodos.py: rangos semiabiertos [inicio, fin) en los cambios de mes y de año"""
+
+    def test_periodo_mes(self):
+        from .periodos import Periodo, periodo_mes
+
+        self.assertEqual(periodo_mes(2026, 1), Periodo(datetime(2026, 1, 1), datetime(2026, 2, 1)))
+        # Diciembre termina en el 1 de enero del año siguiente
+        self.assertEqual(periodo_mes(2025, 12), Periodo(datetime(2025, 12, 1), datetime(2026, 1, 1)))
+        # Febrero bisiesto y no bisiesto
+        self.assertEqual(periodo_mes(2024, 2).fin, datetime(2024, 3, 1))
+        self.assertEqual((periodo_mes(2024, 2).fin - periodo_mes(2024, 2).inicio).days, 29)
+        self.assertEqual((periodo_mes(2025, 2).fin - periodo_mes(2025, 2).inicio).days, 28)
+
+    def test_periodo_anio(self):
+        from .periodos import Periodo, periodo_anio
+
+        self.assertEqual(periodo_anio(2025), Periodo(datetime(2025, 1, 1), datetime(2026, 1, 1)))
+        self.assertEqual((periodo_anio(2024).fin - periodo_anio(2024).inicio).days, 366)
+
+    def test_por_defecto_el_mes_y_anio_de_honduras(self):
+        from . import periodos
+
+        # 31 de diciembre 23:30 en Honduras (ya es 1 de enero en UTC)
+        with mock.patch.object(periodos, 'ahora_local', return_value=datetime(2025, 12, 31, 23, 30)):
+            self.assertEqual(periodos.periodo_mes(), periodos.periodo_mes(2025, 12))
+            self.assertEqual(periodos.periodo_anio(), periodos.periodo_anio(2025))
+            self.assertEqual(periodos.periodo_dia(), periodos.Periodo(datetime(2025, 12, 31), datetime(2026, 1, 1)))
+
+    def test_periodo_rango_inclusivo(self):
+        from .periodos import Periodo, periodo_rango
+
+        esperado = Periodo(datetime(2025, 12, 1), datetime(2026, 1, 1))
+        self.assertEqual(periodo_rango('2025-12-01', '2025-12-31'), esperado)
+        self.assertEqual(periodo_rango(date(2025, 12, 1), date(2025, 12, 31)), esperado)
+        with self.assertRaises(ValueError):
+            periodo_rango('2025-02-30', '2025-03-01')
+
+    def test_en_utc(self):
+        from .periodos import Periodo, periodo_anio, utc_a_local
+
+        # Honduras es UTC-6 todo el año (sin horario de verano)
+        self.assertEqual(periodo_anio(2025).en_utc(), Periodo(datetime(2025, 1, 1, 6), datetime(2026, 1, 1, 6)))
+        self.assertEqual(utc_a_local(datetime(2026, 1, 1, 3)), datetime(2025, 12, 31, 21))
+
+    def test_filtros(self):
+        from .periodos import periodo_mes
+
+        periodo = periodo_mes(2025, 12)
+        self.assertEqual(periodo.filtro('fecha'), {
+            'fecha__gte': datetime(2025, 12, 1), 'fecha__lt': datetime(2026, 1, 1),
+        })
+        self.assertEqual(periodo.filtro_fecha('fecha_gasto'), {
+            'fecha_gasto__gte': date(2025, 12, 1), 'fecha_gasto__lt': date(2026, 1, 1),
+        })
+
+
+class PeriodosConsultaTests(DatosBaseMixin, TestCase):
+    """Los filtros de Periodo en consultas: el último instante del mes entra, la medianoche siguiente no"""
+
+    def test_bordes_de_mes_y_anio(self):
+        from .periodos import periodo_anio, periodo_mes
+
+        self.crear_facturas(4)
+        fechas = [
+            datetime(2025, 11, 30, 23, 59, 59),
+            datetime(2025, 12, 1),
+            datetime(2025, 12, 31, 23, 59, 59),
+            datetime(2026, 1, 1),
+        ]
+        facturas = list(TblFacturas.objects.order_by('pk'))
+        for factura, fecha in zip(facturas, fechas):
+            TblFacturas.objects.filter(pk=factura.pk).update(fecha=fecha)
+            TblOrdenesTrabajo.objects.create(
+                numero_factura=factura, id_empleado=self.empleado, tipo_orden='AJUSTE', fecha_estimada=fecha.date()
+            )
+
+        def facturas_en(periodo):
+            return list(TblFacturas.objects.filter(**periodo.filtro('fecha')).order_by('pk').values_list('pk', flat=True))
+
+        def ordenes_en(periodo):
+            return list(
+                TblOrdenesTrabajo.objects.filter(**periodo.filtro_fecha('fecha_estimada'))
+                .order_by('numero_factura').values_list('numero_factura', flat=True)
+            )
+
+        pks = [factura.pk for factura in facturas]
+        self.assertEqual(facturas_en(periodo_mes(2025, 12)), pks[1:3])
+        self.assertEqual(facturas_en(periodo_anio(2025)), pks[:3])
+        self.assertEqual(facturas_en(periodo_mes(2026, 1)), pks[3:])
+        self.assertEqual(ordenes_en(periodo_mes(2025, 12)), pks[1:3])
+        self.assertEqual(ordenes_en(periodo_anio(2026)), pks[3:])
@@ -1,5 +1,5 @@
 # backend/api/urls.py
-from django.urls import path, include
+from django.urls import path, re_path, include
 from django.contrib import admin
 from rest_framework.routers import DefaultRouter
 from . import views
@@ -39,6 +39,10 @@ urlpatterns = [
     # ========================================
     path('facturas/completas/', views.obtener_facturas_completas, name='obtener-facturas-completas'),
     path('facturas/crear-simple/', views.crear_factura_simple, name='crear-factura-simple'),
+    path('facturas/crear-completa/', views.crear_factura_completa, name='crear-factura-completa'),
+    # Igual para proveedores: el router tomaría 'estadisticas' y 'buscar' como pk
+    path('proveedores/estadisticas/', views.proveedores_estadisticas, name='proveedores-estadisticas'),
+    path('proveedores/buscar/', views.proveedores_buscar, name='proveedores-buscar'),
     
     # ========================================
     # RUTAS DEL ROUTER (VIEWSETS)
@@ -65,9 +69,6 @@ urlpatterns = [
     # OTRAS RUTAS DE FACTURAS
     # ========================================
     
-    # Creación de facturas completas
-    path('facturas/crear-completa/', views.crear_factura_completa, name='crear-factura-completa'),
-    
     # Estados y pagos
     path('facturas/<int:numero_factura>/estado-pago/', views.actualizar_estado_pago, name='actualizar-estado-pago'),
     path('facturas/<int:numero_factura>/anular/', views.anular_factura, name='anular-factura'),
@@ -141,14 +142,11 @@ path('gastos/mes/', views.gastos_mes, name='gastos-mes'),
 # ========================================
 # RUTAS DE PROVEEDORES
 # ========================================
-path('proveedores/estadisticas/', views.proveedores_estadisticas, name='proveedores-estadisticas'),
-path('proveedores/buscar/', views.proveedores_buscar, name='proveedores-buscar'),
 path('proveedores/<int:codigo_provedor>/detalle/', views.ProvedorViewSet.as_view({'get': 'retrieve'}), name='proveedor-detalle'),
 ]
 
 # Configuración para el nombre de la app
 app_name = 'api'
 
-# SERVIR ARCHIVOS EN DESARROLLO
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+# SERVIR ARCHIVOS DE MEDIA (con ETag y Cache-Control, ver views.servir_media)
+urlpatterns += [re_path(r'^%s(?P<path>.*)$' % settings.MEDIA_URL.lstrip('/'), views.servir_media)]
\ No newline at end of file
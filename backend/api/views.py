@@ -1,21 +1,27 @@
 # backend/api/views.py
-import os
+import posixpath
+from collections import Counter
+from pathlib import Path
 from django.conf import settings
-from django.core.files.storage import default_storage
 from django.db.models.functions import TruncDate
-from django.db import models
+from django.db import models, transaction
 from rest_framework import viewsets, status
 from rest_framework.decorators import api_view, action
 from rest_framework.response import Response
-from django.db.models import Sum, Count, Q, F, Avg
-from datetime import date, timedelta
+from django.db.models import Sum, Count, Q
+from datetime import datetime, timedelta
 from django.utils import timezone
 from decimal import Decimal
-from django.db.models import Value, CharField, DecimalField,F, ExpressionWrapper
+from django.db.models import Value, CharField, DecimalField, ExpressionWrapper
 from django.db.models.functions import Coalesce
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
+from django.http import HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.http import parse_etags
+from django.views.static import serve
 
+from dashboard.cache import invalidar_kpis
 from .models import (
     TblClientes, TblEmpleados, TblStockJoyas, TblServicios,
     TblFacturas, TblCotizaciones, TblStockInsumos, 
@@ -31,14 +37,32 @@ from .serializers import (
     ActualizarEstadoOrdenSerializer, CrearFacturaSimpleSerializer,
     CrearCotizacionSerializer, ActualizarCotizacionSerializer, ConvertirCotizacionSerializer
 )
+from .cambios import RespuestaCondicionalMixin
+from .campos import parametros_campos
+from .lectura_rapida import LecturaRapidaMixin
+from .querysets import facturas_con_relaciones, proveedores_con_totales
+from .imagenes import encargar_imagen_joya, guardar_imagen_cotizacion, ruta_inmutable
+from .configuracion import periodo_facturas
+from .inventario import actualizar_existencias
+from .pagination import respuesta_lista
+from .periodos import periodo_mes, periodo_rango
+from .resumen_ventas import clave_factura, registrar_cambio_factura, resumen_ventas, totales
+
+# Caché del navegador para archivos de MEDIA_ROOT:
+# - derivados de cotizaciones y copias de joyas (imagenes.CARPETAS_INMUTABLES): un año, immutable
+# - el resto: corta, después se revalida con el ETag
+MEDIA_MAX_AGE = 60 * 60 * 24 * 365
+MEDIA_MAX_AGE_REVALIDAR = 60 * 10
 
 # ========================================
 # VIEWSETS PRINCIPALES
 # ========================================
 
-class ClienteViewSet(viewsets.ModelViewSet):
+class ClienteViewSet(RespuestaCondicionalMixin, LecturaRapidaMixin, viewsets.ModelViewSet):
     queryset = TblClientes.objects.all()
     serializer_class = ClienteSerializer
+    tablas_condicionales = (TblClientes,)
+    orden_cursor = '-id_cliente'
 
     def destroy(self, request, *args, **kwargs):
         """Verificar que el cliente no tenga facturas o cotizaciones antes de eliminar"""
@@ -69,13 +93,24 @@ class EmpleadoViewSet(viewsets.ModelViewSet):
     queryset = TblEmpleados.objects.all()
     serializer_class = EmpleadoSerializer
 
-class StockJoyaViewSet(viewsets.ModelViewSet):
+class StockJoyaViewSet(RespuestaCondicionalMixin, viewsets.ModelViewSet):
     serializer_class = StockJoyaSerializer
+    tablas_condicionales = (TblStockJoyas,)
+    orden_cursor = '-codigo_joya'
 
     def get_queryset(self):
         """Optimizar query - solo campos necesarios y ordenar"""
         return TblStockJoyas.objects.all().order_by('-codigo_joya')
 
+    def perform_create(self, serializer):
+        joya = serializer.save()
+        # Copia local de imagen_url en segundo plano (no en cada listado ni en esta petición)
+        encargar_imagen_joya(joya.imagen_url)
+
+    def perform_update(self, serializer):
+        joya = serializer.save()
+        encargar_imagen_joya(joya.imagen_url)
+
     # AGREGAR ESTOS MÉTODOS PARA MEJORAR LAS ACTUALIZACIONES:
     def update(self, request, *args, **kwargs):
         partial = kwargs.pop('partial', True)  # Permitir actualizaciones parciales
@@ -140,20 +175,54 @@ class StockJoyaViewSet(viewsets.ModelViewSet):
                 'error': f'Error en actualización masiva: {str(e)}'
             }, status=status.HTTP_400_BAD_REQUEST)
 
-class ServicioViewSet(viewsets.ModelViewSet):
+class ServicioViewSet(RespuestaCondicionalMixin, viewsets.ModelViewSet):
     queryset = TblServicios.objects.all()
     serializer_class = ServicioSerializer
+    tablas_condicionales = (TblServicios,)
 
 class FacturaViewSet(viewsets.ModelViewSet):
-    queryset = TblFacturas.objects.all()
     serializer_class = FacturaSerializer
+    orden_cursor = '-numero_factura'
+
+    def get_queryset(self):
+        """Cliente, empleado y detalles precargados: consultas constantes por lista"""
+        campos = parametros_campos(self.request)
+        return FacturaSerializer.preparar_queryset(facturas_con_relaciones(), campos)
+
+    # Mantener el resumen diario de ventas también en el CRUD genérico
+    @transaction.atomic
+    def perform_create(self, serializer):
+        factura = serializer.save()
+        registrar_cambio_factura(despues=clave_factura(factura))
+
+    @transaction.atomic
+    def perform_update(self, serializer):
+        antes = clave_factura(serializer.instance)
+        factura = serializer.save()
+        registrar_cambio_factura(antes, clave_factura(factura))
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        antes = clave_factura(instance)
+        instance.delete()
+        registrar_cambio_factura(antes=antes)
 
 class CotizacionViewSet(viewsets.ModelViewSet):
     queryset = TblCotizaciones.objects.all()
+    orden_cursor = ('-fecha_creacion', '-numero_cotizacion')
     # serializer_class = CotizacionSerializer
 
     # Metodos Personalizados
 
+    def get_serializer_context(self):
+        """La imagen en base64 solo se envía en el detalle y si se pide: ?imagen_base64=1"""
+        context = super().get_serializer_context()
+        context['incluir_imagen_base64'] = (
+            self.action == 'retrieve'
+            and self.request.query_params.get('imagen_base64') in ('1', 'true')
+        )
+        return context
+
     def get_serializer_class(self):
         # Usar CrearCotizacionSerializer para creación
         if self.action == 'create':
@@ -168,13 +237,8 @@ class CotizacionViewSet(viewsets.ModelViewSet):
             imagen_path = None
 
             if imagen_file:
-                # Guardar la imagen en la carpeta que creaste
-                filename = f"cotizacion_{timezone.now().strftime('%Y%m%d_%H%M%S')}_{imagen_file.name}"
-                filepath = os.path.join('imagenes_cotizaciones', filename)
-
-                # Guardar el archivo
-                saved_path = default_storage.save(filepath, imagen_file)
-                imagen_path = saved_path  # Esta es la ruta que guardaremos en la BD
+                # Guardar la imagen; miniatura y versión media se generan en segundo plano
+                imagen_path = guardar_imagen_cotizacion(imagen_file)  # Esta es la ruta que guardaremos en la BD
 
                 # Reemplazar el archivo por la ruta en los datos
                 request.data._mutable = True
@@ -198,13 +262,8 @@ class CotizacionViewSet(viewsets.ModelViewSet):
             imagen_path = None
 
             if imagen_file:
-                # Guardar la imagen en la carpeta que creaste
-                filename = f"cotizacion_{timezone.now().strftime('%Y%m%d_%H%M%S')}_{imagen_file.name}"
-                filepath = os.path.join('imagenes_cotizaciones', filename)
-
-                # Guardar el archivo
-                saved_path = default_storage.save(filepath, imagen_file)
-                imagen_path = saved_path
+                # Guardar la imagen; miniatura y versión media se generan en segundo plano
+                imagen_path = guardar_imagen_cotizacion(imagen_file)
 
                 # Reemplazar el archivo por la ruta en los datos
                 request.data._mutable = True
@@ -250,27 +309,29 @@ class CotizacionViewSet(viewsets.ModelViewSet):
                     'error': 'Esta cotización ya fue convertida anteriormente'
                 }, status=status.HTTP_400_BAD_REQUEST)
 
-            # Crear factura a partir de la cotización
-            factura = TblFacturas.objects.create(
-                id_cliente=cotizacion.id_cliente,
-                id_empleado=cotizacion.id_empleado,
-                direccion=cotizacion.direccion,
-                telefono=cotizacion.telefono,
-                rtn=cotizacion.rtn,
-                subtotal=cotizacion.subtotal,
-                descuento=cotizacion.descuento,
-                isv=cotizacion.isv,
-                total=cotizacion.total,
-                tipo_venta=cotizacion.tipo_servicio,
-                observaciones=cotizacion.observaciones,
-                estado_pago='PENDIENTE'
-            )
+            with transaction.atomic():
+                # Crear factura a partir de la cotización
+                factura = TblFacturas.objects.create(
+                    id_cliente=cotizacion.id_cliente,
+                    id_empleado=cotizacion.id_empleado,
+                    direccion=cotizacion.direccion,
+                    telefono=cotizacion.telefono,
+                    rtn=cotizacion.rtn,
+                    subtotal=cotizacion.subtotal,
+                    descuento=cotizacion.descuento,
+                    isv=cotizacion.isv,
+                    total=cotizacion.total,
+                    tipo_venta=cotizacion.tipo_servicio,
+                    observaciones=cotizacion.observaciones,
+                    estado_pago='PENDIENTE'
+                )
+                registrar_cambio_factura(despues=clave_factura(factura))
 
-            # Actualizar cotización
-            cotizacion.numero_factura_conversion = factura
-            cotizacion.fecha_conversion = timezone.now()
-            cotizacion.estado = 'CONVERTIDA'
-            cotizacion.save()
+                # Actualizar cotización
+                cotizacion.numero_factura_conversion = factura
+                cotizacion.fecha_conversion = timezone.now()
+                cotizacion.estado = 'CONVERTIDA'
+                cotizacion.save()
 
             return Response({
                 'success': True,
@@ -289,8 +350,7 @@ class CotizacionViewSet(viewsets.ModelViewSet):
     def activas(self, request):
         """Obtener solo cotizaciones activas"""
         cotizaciones = TblCotizaciones.objects.filter(estado='ACTIVA').order_by('-fecha_creacion')
-        serializer = self.get_serializer(cotizaciones, many=True)
-        return Response(serializer.data)
+        return self._lista(cotizaciones)
     
     @action(detail=False, methods=['get'])
     def vencidas(self, request):
@@ -300,8 +360,7 @@ class CotizacionViewSet(viewsets.ModelViewSet):
             fecha_vencimiento__lt=hoy,
             estado='ACTIVA'
         ).order_by('-fecha_creacion')
-        serializer = self.get_serializer(cotizaciones, many=True)
-        return Response(serializer.data)
+        return self._lista(cotizaciones)
     
     @action(detail=False, methods=['get'])
     def por_cliente(self, request):
@@ -313,35 +372,61 @@ class CotizacionViewSet(viewsets.ModelViewSet):
             }, status=status.HTTP_400_BAD_REQUEST)
         
         cotizaciones = TblCotizaciones.objects.filter(id_cliente=id_cliente)
+        return self._lista(cotizaciones)
+
+    def _lista(self, cotizaciones):
+        """Respuesta de lista con la paginación por cursor opcional del ViewSet"""
+        pagina = self.paginate_queryset(cotizaciones)
+        if pagina is not None:
+            return self.get_paginated_response(self.get_serializer(pagina, many=True).data)
         serializer = self.get_serializer(cotizaciones, many=True)
         return Response(serializer.data)
 
-class OrdenTrabajoViewSet(viewsets.ModelViewSet):
+class OrdenTrabajoViewSet(LecturaRapidaMixin, viewsets.ModelViewSet):
     queryset = TblOrdenesTrabajo.objects.all()
     serializer_class = OrdenTrabajoSerializer
+    orden_cursor = '-id_orden'
+
+    # Los KPIs del dashboard cuentan órdenes por estado
+    def perform_create(self, serializer):
+        serializer.save()
+        invalidar_kpis()
+
+    def perform_update(self, serializer):
+        serializer.save()
+        invalidar_kpis()
+
+    def perform_destroy(self, instance):
+        instance.delete()
+        invalidar_kpis()
 
 # ViewSets de inventario
-class StockInsumoViewSet(viewsets.ModelViewSet):
+class StockInsumoViewSet(RespuestaCondicionalMixin, viewsets.ModelViewSet):
     serializer_class = StockInsumoSerializer
+    # provedor_nombre sale de Tbl_Provedores
+    tablas_condicionales = (TblStockInsumos, TblProvedores)
 
     def get_queryset(self):
         """Optimizar query con select_related para cargar proveedor en una sola query"""
         return TblStockInsumos.objects.select_related('codigo_provedor').order_by('-codigo_insumo')
 
-class StockMaterialViewSet(viewsets.ModelViewSet):
+class StockMaterialViewSet(RespuestaCondicionalMixin, LecturaRapidaMixin, viewsets.ModelViewSet):
     serializer_class = StockMaterialSerializer
+    tablas_condicionales = (TblStockMateriales, TblProvedores)
 
     def get_queryset(self):
         """Optimizar query con select_related para cargar proveedor en una sola query"""
         return TblStockMateriales.objects.select_related('codigo_provedor').order_by('-codigo_material')
 
-class ProvedorViewSet(viewsets.ModelViewSet):
+class ProvedorViewSet(RespuestaCondicionalMixin, viewsets.ModelViewSet):
     queryset = TblProvedores.objects.all()
     serializer_class = ProvedorSerializer
+    tablas_condicionales = (TblProvedores,)
 
-class PerfilEmpleadoViewSet(viewsets.ModelViewSet):
+class PerfilEmpleadoViewSet(RespuestaCondicionalMixin, viewsets.ModelViewSet):
     queryset = PerfilesEmpleados.objects.all()
     serializer_class = PerfilEmpleadoSerializer
+    tablas_condicionales = (PerfilesEmpleados,)
 
 # ========================================
 # VISTAS ESPECIALES (API VIEWS)
@@ -422,6 +507,36 @@ def login(request):
             'error': f'Error en el login: {str(e)}'
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
         
+# ========================================
+# ARCHIVOS MEDIA (IMÁGENES)
+# ========================================
+
+def servir_media(request, path):
+    """
+    Servir archivos de MEDIA_ROOT con ETag fuerte y Cache-Control.
+    Las rutas que nunca cambian de contenido (derivados versionados, copias de joyas)
+    van con MEDIA_MAX_AGE e immutable; las demás con MEDIA_MAX_AGE_REVALIDAR, pasado
+    el cual el navegador revalida y recibe 304 mientras el archivo no cambie
+    (el ETag lleva tamaño y mtime).
+    """
+    ruta = Path(safe_join(settings.MEDIA_ROOT, posixpath.normpath(path).lstrip('/')))
+    if not ruta.is_file():
+        return serve(request, path, document_root=settings.MEDIA_ROOT)
+
+    stat = ruta.stat()
+    etag = f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+    if etag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+        response = HttpResponseNotModified()
+    else:
+        response = serve(request, path, document_root=settings.MEDIA_ROOT)
+
+    response['ETag'] = etag
+    if ruta_inmutable(path):
+        response['Cache-Control'] = f'public, max-age={MEDIA_MAX_AGE}, immutable'
+    else:
+        response['Cache-Control'] = f'public, max-age={MEDIA_MAX_AGE_REVALIDAR}'
+    return response
+
 # ========================================
 # DASHBOARD Y REPORTES
 # ========================================
@@ -433,22 +548,15 @@ def dashboard_general(request):
         # Estadísticas básicas
         total_clientes = TblClientes.objects.count()
         total_empleados = TblEmpleados.objects.count()
-        total_facturas = TblFacturas.objects.count()
 
-        # Ventas del mes actual
-        hoy = timezone.now()
-        primer_dia_mes = hoy.replace(day=1)
-        ventas_mes = TblFacturas.objects.filter(
-            fecha__gte=primer_dia_mes
-        ).aggregate(
-            total_ventas=Sum('total'),
-            cantidad_ventas=Count('numero_factura')
-        )
+        # Conteos y ventas de facturas desde el resumen diario
+        total_facturas = totales(resumen_ventas())['cantidad']
+
+        # Ventas del mes actual (Honduras)
+        ventas_mes = totales(resumen_ventas(**periodo_mes().filtro_fecha('fecha')))
 
         # Facturas pendientes de pago
-        facturas_pendientes = TblFacturas.objects.filter(
-            estado_pago='PENDIENTE'
-        ).count()
+        facturas_pendientes = totales(resumen_ventas(estado_pago='PENDIENTE'))['cantidad']
 
         # Órdenes de trabajo pendientes
         ordenes_pendientes = TblOrdenesTrabajo.objects.filter(
@@ -460,8 +568,8 @@ def dashboard_general(request):
                 'total_clientes': total_clientes,
                 'total_empleados': total_empleados,
                 'total_facturas': total_facturas,
-                'ventas_mes_actual': ventas_mes['total_ventas'] or 0,
-                'cantidad_ventas_mes': ventas_mes['cantidad_ventas'] or 0,
+                'ventas_mes_actual': ventas_mes['total'],
+                'cantidad_ventas_mes': ventas_mes['cantidad'],
                 'facturas_pendientes_pago': facturas_pendientes,
                 'ordenes_trabajo_pendientes': ordenes_pendientes
             }
@@ -476,19 +584,20 @@ def dashboard_general(request):
 def ventas_dashboard(request):
     """Dashboard específico de ventas"""
     try:
-        # Ventas por tipo
-        ventas_por_tipo = TblFacturas.objects.values('tipo_venta').annotate(
+        # Ventas por tipo (resumen diario)
+        ventas_por_tipo = resumen_ventas().values('tipo_venta').annotate(
             total=Sum('total'),
-            cantidad=Count('numero_factura')
-        )
+            cantidad=Sum('cantidad')
+        ).order_by('tipo_venta')
 
         # Ventas últimos 7 días
-        fecha_inicio = timezone.now() - timedelta(days=7)
-        ventas_ultima_semana = TblFacturas.objects.filter(
-            fecha__gte=fecha_inicio
-        ).values('fecha__date').annotate(
-            total_dia=Sum('total')
-        ).order_by('fecha__date')
+        fecha_inicio = (timezone.now() - timedelta(days=7)).date()
+        ventas_ultima_semana = [
+            {'fecha__date': dia['fecha'], 'total_dia': dia['total_dia']}
+            for dia in resumen_ventas(fecha__gte=fecha_inicio).values('fecha').annotate(
+                total_dia=Sum('total')
+            ).order_by('fecha')
+        ]
         
         # Top productos más vendidos (a través de detalles de factura)
         top_productos = TblDetallesFactura.objects.values(
@@ -500,7 +609,7 @@ def ventas_dashboard(request):
         
         return Response({
             'ventas_por_tipo': list(ventas_por_tipo),
-            'ventas_ultima_semana': list(ventas_ultima_semana),
+            'ventas_ultima_semana': ventas_ultima_semana,
             'top_productos': list(top_productos)
         })
         
@@ -522,24 +631,25 @@ def ventas_reporte_periodo(request):
             }, status=status.HTTP_400_BAD_REQUEST)
         
         # Convertir fechas
-        fecha_inicio = date.strptime(fecha_inicio, '%Y-%m-%d')
-        fecha_fin = date.strptime(fecha_fin, '%Y-%m-%d')
+        fecha_inicio = datetime.strptime(fecha_inicio, '%Y-%m-%d').date()
+        fecha_fin = datetime.strptime(fecha_fin, '%Y-%m-%d').date()
+        periodo = periodo_rango(fecha_inicio, fecha_fin)
         
-        ventas_periodo = TblFacturas.objects.filter(
-            fecha__date__gte=fecha_inicio,
-            fecha__date__lte=fecha_fin
-        )
+        # Filas del resumen diario en lugar de recorrer todas las facturas
+        ventas_periodo = resumen_ventas(**periodo.filtro_fecha('fecha'))
         
-        total_ventas = ventas_periodo.aggregate(
-            total=Sum('total'),
-            cantidad=Count('numero_factura'),
-            promedio=Avg('total')
+        total_ventas = totales(ventas_periodo)
+        total_ventas['promedio'] = (
+            total_ventas['total'] / total_ventas['cantidad'] if total_ventas['cantidad'] else None
         )
         
-        ventas_por_dia = ventas_periodo.values('fecha__date').annotate(
-            total_dia=Sum('total'),
-            cantidad_dia=Count('numero_factura')
-        ).order_by('fecha__date')
+        ventas_por_dia = [
+            {'fecha__date': dia['fecha'], 'total_dia': dia['total_dia'], 'cantidad_dia': dia['cantidad_dia']}
+            for dia in ventas_periodo.values('fecha').annotate(
+                total_dia=Sum('total'),
+                cantidad_dia=Sum('cantidad')
+            ).order_by('fecha')
+        ]
         
         return Response({
             'periodo': {
@@ -547,7 +657,7 @@ def ventas_reporte_periodo(request):
                 'fecha_fin': fecha_fin.strftime('%Y-%m-%d')
             },
             'resumen': total_ventas,
-            'ventas_por_dia': list(ventas_por_dia)
+            'ventas_por_dia': ventas_por_dia
         })
         
     except Exception as e:
@@ -653,10 +763,13 @@ def actualizar_estado_pago(request, numero_factura):
     serializer = ActualizarEstadoPagoSerializer(data=request.data)
     
     if serializer.is_valid():
+        antes = clave_factura(factura)
         factura.estado_pago = serializer.validated_data['estado_pago']
         factura.metodo_pago = serializer.validated_data.get('metodo_pago', '')
         factura.fecha_pago = serializer.validated_data.get('fecha_pago')
-        factura.save()
+        with transaction.atomic():
+            factura.save()
+            registrar_cambio_factura(antes, clave_factura(factura))
         
         return Response({
             'success': True,
@@ -671,9 +784,12 @@ def anular_factura(request, numero_factura):
     """Anular una factura"""
     try:
         factura = TblFacturas.objects.get(numero_factura=numero_factura)
+        antes = clave_factura(factura)
         factura.estado_pago = 'CANCELADA'
         factura.observaciones = request.data.get('observaciones', 'Factura anulada')
-        factura.save()
+        with transaction.atomic():
+            factura.save()
+            registrar_cambio_factura(antes, clave_factura(factura))
         
         return Response({
             'success': True,
@@ -687,24 +803,23 @@ def anular_factura(request, numero_factura):
 
 @api_view(['GET'])
 def obtener_facturas_completas(request):
-    """Obtener facturas con todos sus detalles"""
-    facturas = TblFacturas.objects.all().prefetch_related('tbldetallesfactura_set')
-    serializer = FacturaSerializer(facturas, many=True)
-    return Response(serializer.data)
+    """Obtener facturas con todos sus detalles (por lotes: la memoria no crece con el historial)"""
+    facturas = facturas_con_relaciones()
+    return respuesta_lista(
+        request, facturas, FacturaSerializer, '-numero_factura', streaming=True, expandir=('detalles',)
+    )
 
 @api_view(['GET'])
 def facturas_pendientes_pago(request):
     """Obtener facturas pendientes de pago"""
-    facturas = TblFacturas.objects.filter(estado_pago='PENDIENTE')
-    serializer = FacturaSerializer(facturas, many=True)
-    return Response(serializer.data)
+    facturas = facturas_con_relaciones().filter(estado_pago='PENDIENTE')
+    return respuesta_lista(request, facturas, FacturaSerializer, '-numero_factura')
 
 @api_view(['GET'])
 def facturas_por_cliente(request, id_cliente):
     """Obtener facturas por cliente"""
-    facturas = TblFacturas.objects.filter(id_cliente=id_cliente)
-    serializer = FacturaSerializer(facturas, many=True)
-    return Response(serializer.data)
+    facturas = facturas_con_relaciones().filter(id_cliente=id_cliente)
+    return respuesta_lista(request, facturas, FacturaSerializer, '-numero_factura')
 
 @api_view(['POST'])
 def facturas_por_fecha(request):
@@ -717,12 +832,16 @@ def facturas_por_fecha(request):
             'error': 'Fecha inicio y fecha fin son requeridas'
         }, status=status.HTTP_400_BAD_REQUEST)
     
-    facturas = TblFacturas.objects.filter(
-        fecha__date__gte=fecha_inicio,
-        fecha__date__lte=fecha_fin
-    )
-    serializer = FacturaSerializer(facturas, many=True)
-    return Response(serializer.data)
+    try:
+        periodo = periodo_rango(fecha_inicio, fecha_fin)
+    except (TypeError, ValueError):
+        return Response({
+            'error': 'Formato de fecha inválido, use YYYY-MM-DD'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    # Rango semiabierto sobre la columna: usa el índice de fecha
+    facturas = facturas_con_relaciones().filter(**periodo_facturas(periodo).filtro('fecha'))
+    return respuesta_lista(request, facturas, FacturaSerializer, ('-fecha', '-numero_factura'))
 
 @api_view(['GET'])
 def obtener_detalles_factura(request, numero_factura):
@@ -759,27 +878,29 @@ def convertir_cotizacion_a_factura(request, numero_cotizacion):
                 'error': 'Esta cotización ya fue convertida anteriormente'
             }, status=status.HTTP_400_BAD_REQUEST)
 
-        # Crear factura a partir de la cotización
-        factura = TblFacturas.objects.create(
-            id_cliente=cotizacion.id_cliente,
-            id_empleado=cotizacion.id_empleado,
-            direccion=cotizacion.direccion,
-            telefono=cotizacion.telefono,
-            rtn=cotizacion.rtn,
-            subtotal=cotizacion.subtotal,
-            descuento=cotizacion.descuento,
-            isv=cotizacion.isv,
-            total=cotizacion.total,
-            tipo_venta=cotizacion.tipo_servicio,
-            observaciones=cotizacion.observaciones,
-            estado_pago='PENDIENTE'
-        )
+        with transaction.atomic():
+            # Crear factura a partir de la cotización
+            factura = TblFacturas.objects.create(
+                id_cliente=cotizacion.id_cliente,
+                id_empleado=cotizacion.id_empleado,
+                direccion=cotizacion.direccion,
+                telefono=cotizacion.telefono,
+                rtn=cotizacion.rtn,
+                subtotal=cotizacion.subtotal,
+                descuento=cotizacion.descuento,
+                isv=cotizacion.isv,
+                total=cotizacion.total,
+                tipo_venta=cotizacion.tipo_servicio,
+                observaciones=cotizacion.observaciones,
+                estado_pago='PENDIENTE'
+            )
+            registrar_cambio_factura(despues=clave_factura(factura))
 
-        # Actualizar cotización
-        cotizacion.numero_factura_conversion = factura
-        cotizacion.fecha_conversion = timezone.now()
-        cotizacion.estado = 'CONVERTIDA'
-        cotizacion.save()
+            # Actualizar cotización
+            cotizacion.numero_factura_conversion = factura
+            cotizacion.fecha_conversion = timezone.now()
+            cotizacion.estado = 'CONVERTIDA'
+            cotizacion.save()
 
         print(f"✅ DEBUG: Factura #{factura.numero_factura} creada exitosamente")
 
@@ -814,8 +935,7 @@ def cotizaciones_vencidas(request):
         fecha_vencimiento__lt=hoy,
         estado='ACTIVA'
     )
-    serializer = CotizacionSerializer(cotizaciones, many=True)
-    return Response(serializer.data)
+    return respuesta_lista(request, cotizaciones, CotizacionSerializer, ('-fecha_creacion', '-numero_cotizacion'))
 
 @api_view(['POST'])
 def crear_cotizacion_completa(request):
@@ -826,13 +946,8 @@ def crear_cotizacion_completa(request):
         imagen_path = None
 
         if imagen_file:
-            # Guardar la imagen en la carpeta que creaste
-            filename = f"cotizacion_{timezone.now().strftime('%Y%m%d_%H%M%S')}_{imagen_file.name}"
-            filepath = os.path.join('imagenes_cotizaciones', filename)
-
-            # Guardar el archivo
-            saved_path = default_storage.save(filepath, imagen_file)
-            imagen_path = saved_path
+            # Guardar la imagen; miniatura y versión media se generan en segundo plano
+            imagen_path = guardar_imagen_cotizacion(imagen_file)
 
         # Validar datos requeridos
         required_fields = ['id_cliente', 'id_empleado', 'subtotal', 'isv', 'total']
@@ -1046,35 +1161,32 @@ def insumos_por_categoria(request):
 
 @api_view(['POST'])
 def actualizar_stock_masivo(request):
-    """Actualizar stock de múltiples items"""
-    try:
-        updates = request.data.get('updates', [])
-        
-        for update in updates:
-            tipo = update.get('tipo')
-            codigo = update.get('codigo')
-            cantidad = update.get('cantidad')
-            
-            if tipo == 'material':
-                item = TblStockMateriales.objects.get(codigo_material=codigo)
-            elif tipo == 'insumo':
-                item = TblStockInsumos.objects.get(codigo_insumo=codigo)
-            else:
-                continue
-                
-            item.cantidad_existencia = cantidad
-            item.save()
-        
+    """
+    Actualizar stock de múltiples items (ej. conteo físico).
+    Carga y guarda por tipo en bloque y en una sola transacción;
+    los códigos desconocidos o inválidos se reportan en 'errores'.
+    """
+    updates = request.data.get('updates', [])
+    if not isinstance(updates, list):
         return Response({
-            'success': True,
-            'message': 'Stock actualizado exitosamente'
-        })
-        
+            'error': 'updates debe ser una lista'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        actualizados, errores = actualizar_existencias(updates)
     except Exception as e:
+        print(f"Error al actualizar stock: {str(e)}")
         return Response({
             'error': f'Error al actualizar stock: {str(e)}'
         }, status=status.HTTP_400_BAD_REQUEST)
 
+    return Response({
+        'success': True,
+        'message': 'Stock actualizado exitosamente',
+        'actualizados': actualizados,
+        'errores': errores
+    })
+
 # ========================================
 # ÓRDENES DE TRABAJO
 # ========================================
@@ -1083,8 +1195,7 @@ def actualizar_stock_masivo(request):
 def ordenes_trabajo_pendientes(request):
     """Obtener órdenes de trabajo pendientes"""
     ordenes = TblOrdenesTrabajo.objects.filter(estado='PENDIENTE')
-    serializer = OrdenTrabajoSerializer(ordenes, many=True)
-    return Response(serializer.data)
+    return respuesta_lista(request, ordenes, OrdenTrabajoSerializer, '-id_orden', lectura_rapida=True)
 
 @api_view(['POST'])
 def actualizar_estado_orden_trabajo(request, id_orden):
@@ -1103,6 +1214,7 @@ def actualizar_estado_orden_trabajo(request, id_orden):
         if serializer.validated_data.get('descripcion'):
             orden.descripcion = serializer.validated_data['descripcion']
         orden.save()
+        invalidar_kpis()
         
         return Response({
             'success': True,
@@ -1119,6 +1231,7 @@ def completar_orden_trabajo(request, id_orden):
         orden = TblOrdenesTrabajo.objects.get(id_orden=id_orden)
         orden.estado = 'COMPLETADA'
         orden.save()
+        invalidar_kpis()
         
         return Response({
             'success': True,
@@ -1134,15 +1247,13 @@ def completar_orden_trabajo(request, id_orden):
 def ordenes_trabajo_por_factura(request, numero_factura):
     """Obtener órdenes de trabajo por factura"""
     ordenes = TblOrdenesTrabajo.objects.filter(numero_factura=numero_factura)
-    serializer = OrdenTrabajoSerializer(ordenes, many=True)
-    return Response(serializer.data)
+    return respuesta_lista(request, ordenes, OrdenTrabajoSerializer, '-id_orden', lectura_rapida=True)
 
 @api_view(['GET'])
 def ordenes_trabajo_por_empleado(request, id_empleado):
     """Obtener órdenes de trabajo por empleado"""
     ordenes = TblOrdenesTrabajo.objects.filter(id_empleado=id_empleado)
-    serializer = OrdenTrabajoSerializer(ordenes, many=True)
-    return Response(serializer.data)
+    return respuesta_lista(request, ordenes, OrdenTrabajoSerializer, '-id_orden', lectura_rapida=True)
 
 # ========================================
 # DETALLES DE FACTURA
@@ -1270,7 +1381,7 @@ def listar_facturas(request):
 def obtener_factura_detalle(request, numero_factura):
     """Obtener detalle de factura (compatibilidad)"""
     try:
-        factura = TblFacturas.objects.get(numero_factura=numero_factura)
+        factura = facturas_con_relaciones().get(numero_factura=numero_factura)
         serializer = FacturaSerializer(factura)
         return Response(serializer.data)
     except TblFacturas.DoesNotExist:
@@ -1458,11 +1569,10 @@ def eliminar_empleado(request, pk):
 @api_view(['GET'])
 def gastos_mes(request):
     try:
-        hoy = timezone.now()
-        inicio_mes = hoy.replace(day=1)
+        del_mes = periodo_mes().filtro_fecha('fecha_gasto')
 
         gastos = TblGastos.objects.filter(
-            fecha_gasto__gte=inicio_mes
+            **del_mes
         ).values(
             'id_gasto',
             'fecha_gasto',
@@ -1475,7 +1585,7 @@ def gastos_mes(request):
         )
 
         total_gastos = TblGastos.objects.filter(
-            fecha_gasto__gte=inicio_mes
+            **del_mes
         ).aggregate(
             total=Sum('monto')
         )['total'] or 0
@@ -1496,35 +1606,27 @@ def proveedores_estadisticas(request):
     try:
         total_proveedores = TblProvedores.objects.count()
         
+        proveedores = proveedores_con_totales()
+
         # Proveedores con más productos
-        proveedores_top = TblProvedores.objects.annotate(
-            total_productos=Count('tblstockmateriales') + Count('tblstockinsumos')
-        ).order_by('-total_productos')[:5]
-        
-        # Distribución por cantidad de productos
-        distribucion = TblProvedores.objects.annotate(
-            total_productos=Count('tblstockmateriales') + Count('tblstockinsumos')
-        ).values('total_productos').annotate(
-            cantidad_proveedores=Count('codigo_provedor')
-        ).order_by('total_productos')
-        
-        # Valor total en inventario por proveedor
-        proveedores_valor = []
-        for proveedor in TblProvedores.objects.all():
-            valor_materiales = TblStockMateriales.objects.filter(
-                codigo_provedor=proveedor
-            ).aggregate(total=Sum(F('costo') * F('cantidad_existencia')))['total'] or 0
-            
-            valor_insumos = TblStockInsumos.objects.filter(
-                codigo_provedor=proveedor
-            ).aggregate(total=Sum(F('costo') * F('cantidad_existencia')))['total'] or 0
-            
-            proveedores_valor.append({
-                'proveedor': proveedor.nombre,
-                'valor_total': float(valor_materiales + valor_insumos)
-            })
+        proveedores_top = proveedores.order_by('-total_productos')[:5]
+        
+        # Distribución por cantidad de productos (SQL Server no agrupa por subconsultas:
+        # se trae una columna por proveedor y se cuenta aquí)
+        conteo = Counter(proveedores.values_list('total_productos', flat=True))
+        distribucion = [
+            {'total_productos': total, 'cantidad_proveedores': cantidad}
+            for total, cantidad in sorted(conteo.items())
+        ]
         
-        proveedores_valor.sort(key=lambda x: x['valor_total'], reverse=True)
+        # Valor total en inventario por proveedor (Top 10)
+        proveedores_valor = [
+            {
+                'proveedor': proveedor['nombre'],
+                'valor_total': float(proveedor['valor_total'])
+            }
+            for proveedor in proveedores.order_by('-valor_total').values('nombre', 'valor_total')[:10]
+        ]
         
         return Response({
             'total_proveedores': total_proveedores,
@@ -1534,8 +1636,8 @@ def proveedores_estadisticas(request):
                     'total_productos': p.total_productos
                 } for p in proveedores_top
             ],
-            'distribucion_productos': list(distribucion),
-            'valor_inventario': proveedores_valor[:10]  # Top 10
+            'distribucion_productos': distribucion,
+            'valor_inventario': proveedores_valor
         })
         
     except Exception as e:
@@ -1577,9 +1679,7 @@ def proveedores_buscar(request):
         if orden == 'nombre':
             proveedores = proveedores.order_by('nombre')
         elif orden == 'productos':
-            proveedores = proveedores.annotate(
-                total_productos=Count('tblstockmateriales') + Count('tblstockinsumos')
-            ).order_by('-total_productos')
+            proveedores = proveedores_con_totales(proveedores).order_by('-total_productos')
         
         serializer = ProvedorSerializer(proveedores, many=True)
         return Response(serializer.data)
@@ -1595,19 +1695,14 @@ def proveedores_buscar(request):
 def contabilidad_resumen(request):
     """Resumen contable: ingresos, gastos y movimientos recientes."""
 
-    hoy = timezone.now().date()
-    inicio_mes = hoy.replace(day=1)
+    mes = periodo_mes()
 
     # ========== INGRESOS DEL MES ==========
-    ingresos_mes = TblFacturas.objects.filter(
-        fecha__date__gte=inicio_mes
-    ).aggregate(
-        suma=Sum('total')
-    )['suma'] or 0
+    ingresos_mes = totales(resumen_ventas(**mes.filtro_fecha('fecha')))['total']
 
     # ========== GASTOS DEL MES ==========
     gastos_mes = TblGastos.objects.filter(
-        fecha_gasto__gte=inicio_mes
+        **mes.filtro_fecha('fecha_gasto')
     ).aggregate(
         suma=Sum('monto')
     )['suma'] or 0
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import importlib.util
 import os
 from pathlib import Path
 
@@ -46,6 +47,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.InstrumentacionSQLMiddleware',
+    'api.middleware.CompresionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -137,8 +140,80 @@ STATIC_URL = 'static/'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+REST_FRAMEWORK = {
+    # Paginación por cursor opcional: solo se activa con ?cursor= o ?page_size=
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.PaginacionCursor',
+    'PAGE_SIZE': 50,
+    # JSON con orjson; mismo resultado que los de DRF (ver api/renderers.py)
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.RendererJSONRapido',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'api.parsers.ParserJSONRapido',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+}
+
+# MessagePack opcional para consumidores masivos: Accept: application/msgpack
+if importlib.util.find_spec('msgpack') is not None:
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'].append('api.renderers.RendererMsgPack')
+
+# Compresión gzip/Brotli de respuestas JSON (api/middleware.py)
+COMPRESION = {
+    'minimo_bytes': 1024,
+    'nivel_gzip': 6,
+    'calidad_brotli': 5,
+    'calidad_brotli_cache': 9,
+    'cache_segundos': 3600,
+}
+
+# Cachés
+# - default: memoria de cada proceso (cuerpos comprimidos por ETag, api/middleware.py).
+# - compartida: la ven todos los workers de gunicorn (KPIs del dashboard y
+#   Tbl_Configuracion): invalidar o cambiar un valor se nota en todos a la vez.
+#   Crear la tabla una vez con: python manage.py createcachetable
+CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'compartida': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'Tbl_Cache_Compartida',
+    },
+}
+
+# Presupuesto de consultas por petición (api/middleware.py); solo en desarrollo
+SQL_PRESUPUESTO = {
+    'activo': DEBUG,
+    'consultas': 50,
+    'tiempo_ms': 500,
+    'estricto': False,
+    'por_vista': {},
+}
+
+# Tipos de ítem que el trigger de SQL Server ya descuenta del stock al insertar
+# el detalle de factura; los demás los descuenta la aplicación (api/inventario.py)
+INVENTARIO_DESCUENTO_TRIGGER = ('JOYA',)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'api.sql': {'handlers': ['console'], 'level': 'INFO' if DEBUG else 'WARNING', 'propagate': False},
+    },
+}
+
 CORS_ALLOW_ALL_ORIGINS = True
 
+# Las cabeceras de InstrumentacionSQLMiddleware solo existen (y se exponen) si está activo
+CORS_EXPOSE_HEADERS = (
+    ['X-DB-Queries', 'X-DB-Time-ms', 'X-DB-Slowest-ms', 'X-DB-Duplicates']
+    if SQL_PRESUPUESTO['activo'] else []
+)
+
 CORS_ALLOW_METHODS = [
     'DELETE',
     'GET',
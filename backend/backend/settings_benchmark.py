@@ -0,0 +1,45 @@
+"""
+Perfil local para benchmarks y pruebas de número de consultas.
+
+Usa SQLite en lugar de SQL Server, con el mismo código ORM:
+    python manage.py crear_esquema_local --settings=backend.settings_benchmark
+    python manage.py test api --settings=backend.settings_benchmark
+
+Los modelos Tbl_* son managed = False; sus tablas las crea crear_esquema_local
+(y el runner de pruebas en la base de datos de test).
+"""
+
+import os
+
+from .settings import *  # noqa: F401,F403
+
+DEBUG = False
+
+ALLOWED_HOSTS = ['*']
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ.get('BENCHMARK_DB', os.path.join(BASE_DIR, 'benchmark.sqlite3')),
+    }
+}
+
+# Las migraciones de api describen el esquema viejo (Tbl_Ventas, Tbl_Ordenes...):
+# aquí las tablas managed se crean directamente desde los modelos actuales
+MIGRATION_MODULES = {'api': None}
+
+TEST_RUNNER = 'api.esquema_local.RunnerEsquemaLocal'
+
+MEDIA_ROOT = os.environ.get('BENCHMARK_MEDIA', os.path.join(BASE_DIR, 'media_benchmark'))
+
+# SQLite no tiene el trigger de Tbl_Detalles_Factura: la aplicación descuenta también las joyas
+INVENTARIO_DESCUENTO_TRIGGER = ()
+
+# Un solo proceso: la caché compartida también puede vivir en memoria
+CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'compartida': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'compartida'},
+}
+
+# Solo advertencias del middleware SQL (no una línea por petición)
+LOGGING['loggers']['api.sql']['level'] = 'WARNING'
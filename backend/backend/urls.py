@@ -1,8 +1,9 @@
-from django.urls import path, include
+from django.urls import path, re_path, include
 from django.contrib import admin
 from django.http import HttpResponseRedirect
 from django.conf import settings
 from django.conf.urls.static import static
+from api.views import servir_media
 
 urlpatterns = [
     # Redirige al frontend en lugar del admin
@@ -12,6 +13,8 @@ urlpatterns = [
     path('api/dashboard/', include('dashboard.urls')),
 ]
 
+# Media con ETag y Cache-Control (ver views.servir_media), también con DEBUG apagado
+urlpatterns += [re_path(r'^%s(?P<path>.*)$' % settings.MEDIA_URL.lstrip('/'), servir_media)]
+
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
\ No newline at end of file
@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class DashboardConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'dashboard'
+
+    def ready(self):
+        # productos_en_stock y clientes_activos: invalidar los KPIs al escribir joyas o clientes
+        from .cache import conectar_senales
+        conectar_senales()
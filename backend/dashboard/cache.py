@@ -0,0 +1,92 @@
+# backend/dashboard/cache.py
+import threading
+import time
+import zlib
+
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.utils.connection import ConnectionProxy
+
+# Caché de todos los workers (settings.CACHES): la versión que sube invalidar_kpis()
+# y los KPIs calculados los ven todos los procesos
+cache = ConnectionProxy(caches, "compartida")
+
+# Segundos que un KPI se sirve desde caché aunque nadie escriba
+TTL_KPIS = 60
+
+_CLAVE_VERSION = "dashboard:kpis:version"
+
+# Candados fijos repartidos por hash de la clave: nunca se crean ni se borran,
+# así dos peticiones con la misma clave siempre esperan el mismo candado
+_candados = tuple(threading.Lock() for _ in range(16))
+
+
+def _version():
+    version = cache.get(_CLAVE_VERSION)
+    if version is None:
+        _iniciar_version()
+        version = cache.get(_CLAVE_VERSION, 0)
+    return version
+
+
+def _iniciar_version():
+    # Basada en la hora: si la caché perdió la versión no se reusan claves viejas
+    cache.add(_CLAVE_VERSION, int(time.time()), timeout=None)
+
+
+def _candado(clave):
+    return _candados[zlib.crc32(clave.encode("utf-8")) % len(_candados)]
+
+
+def kpi_en_cache(nombre, calcular, ttl=TTL_KPIS):
+    """
+    Devuelve el KPI `nombre` desde caché o lo calcula con `calcular()`.
+    - La clave lleva la versión actual: invalidar_kpis() la sube y todas las
+      claves anteriores dejan de usarse (expiran solas).
+    - Si varias peticiones de un mismo proceso llegan con la caché vacía, solo una
+      calcula; las demás esperan el candado y leen el valor que ésta guardó. Entre
+      procesos no hay candado: a lo sumo un cálculo por worker, y el primero que
+      termina deja el valor para todos.
+    """
+    clave = f"dashboard:kpis:{_version()}:{nombre}"
+    datos = cache.get(clave)
+    if datos is not None:
+        return datos
+
+    with _candado(clave):
+        datos = cache.get(clave)
+        if datos is None:
+            datos = calcular()
+            cache.set(clave, datos, ttl)
+    return datos
+
+
+def _subir_version():
+    try:
+        cache.incr(_CLAVE_VERSION)
+    except ValueError:
+        _iniciar_version()
+
+
+def invalidar_kpis():
+    """
+    Descartar los KPIs del dashboard tras escribir facturas, órdenes de trabajo,
+    joyas o clientes.
+    Dentro de una transacción espera al COMMIT, así nadie vuelve a guardar
+    en caché datos anteriores al cambio.
+    """
+    transaction.on_commit(_subir_version)
+
+
+def _cambio_en_kpis(sender, **kwargs):
+    invalidar_kpis()
+
+
+def conectar_senales():
+    """Joyas y clientes se escriben desde muchas vistas: save()/delete() invalidan solos"""
+    from api.models import TblClientes, TblStockJoyas
+
+    for modelo in (TblStockJoyas, TblClientes):
+        post_save.connect(_cambio_en_kpis, sender=modelo, dispatch_uid=f"kpis_{modelo.__name__}_save")
+        post_delete.connect(_cambio_en_kpis, sender=modelo, dispatch_uid=f"kpis_{modelo.__name__}_delete")
@@ -1,3 +1,110 @@
+# backend/dashboard/tests.py
+import threading
+import time
+from decimal import Decimal
+
 from django.test import TestCase
 
-# Create your tests here.
+from api import configuracion
+from api.models import PerfilesEmpleados, TblClientes, TblEmpleados, TblFacturas, TblOrdenesTrabajo, TblStockJoyas
+from api.periodos import ahora_local
+
+from .cache import cache, kpi_en_cache
+
+
+class DashboardKpisTests(TestCase):
+    """KPIs del dashboard con el ORM: mismos números en SQL Server y en la base local"""
+
+    @classmethod
+    def setUpTestData(cls):
+        # Facturas escritas por la aplicación (hora local), sin historial en UTC
+        configuracion.guardar(configuracion.CLAVE_CONVENCION_FECHAS, configuracion.CONVENCION_LOCAL)
+        PerfilesEmpleados.objects.create(codigo_perfil=1, perfil='Administrador', rol='admin')
+        empleado = TblEmpleados.objects.create(
+            codigo_perfil_id=1, nombre='Ana', apellido='López', usuario='ana', contrasena='x'
+        )
+        cliente = TblClientes.objects.create(numero_identidad='0801199000001', nombre='Cliente')
+        factura = TblFacturas.objects.create(
+            id_cliente=cliente, id_empleado=empleado, fecha=ahora_local(),
+            subtotal=Decimal('100'), isv=Decimal('15'), total=Decimal('115.50')
+        )
+        for estado in ('PENDIENTE', ' pendiente ', 'COMPLETADA', 'EN_PROCESO'):
+            TblOrdenesTrabajo.objects.create(
+                numero_factura=factura, id_empleado=empleado, tipo_orden='AJUSTE', estado=estado
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_kpis(self):
+        response = self.client.get('/api/dashboard/kpis/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {
+            'ventas_hoy': 115.5,
+            'ordenes_pendientes': 2,
+            'productos_en_stock': 0,
+            'clientes_activos': 1,
+        })
+
+    def test_ordenes_por_estado(self):
+        response = self.client.get('/api/dashboard/ordenes-estado/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json()['ordenes_por_estado'],
+            {'COMPLETADA': 1, 'EN PROCESO': 1, 'PENDIENTE': 2},
+        )
+
+    def test_joyas_y_clientes_invalidan_kpis(self):
+        self.assertEqual(self.client.get('/api/dashboard/kpis/').json()['productos_en_stock'], 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            TblStockJoyas.objects.create(nombre='Anillo')
+            TblClientes.objects.create(numero_identidad='0801199000002', nombre='Otro')
+
+        kpis = self.client.get('/api/dashboard/kpis/').json()
+        self.assertEqual(kpis['productos_en_stock'], 1)
+        self.assertEqual(kpis['clientes_activos'], 2)
+
+
+class KpiEnCacheTests(TestCase):
+    """Con la caché vacía, muchas peticiones a la vez calculan el KPI una sola vez"""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_kpis_en_la_cache_compartida(self):
+        from django.core.cache import caches
+
+        kpi_en_cache('prueba', lambda: {'valor': 1})
+        # La caché de memoria del proceso no guarda KPIs: otro worker los encontraría igual
+        caches['default'].clear()
+        self.assertEqual(kpi_en_cache('prueba', lambda: {'valor': 2}), {'valor': 1})
+
+    def test_un_calculo_por_clave(self):
+        calculos = []
+
+        def calcular():
+            calculos.append(1)
+            time.sleep(0.05)
+            return {'valor': 1}
+
+        def pedir():
+            inicio.wait()
+            resultados.append(kpi_en_cache('prueba', calcular))
+
+        for _ in range(3):
+            # Varias rondas: los candados son fijos, no se crean ni se borran entre peticiones
+            cache.clear()
+            calculos.clear()
+            resultados = []
+            inicio = threading.Barrier(8)
+            hilos = [threading.Thread(target=pedir) for _ in range(8)]
+            for hilo in hilos:
+                hilo.start()
+            for hilo in hilos:
+                hilo.join()
+
+            self.assertEqual(len(calculos), 1)
+            self.assertEqual(resultados, [{'valor': 1}] * 8)
@@ -1,6 +1,19 @@
 # backend/dashboard/views.py
+from decimal import Decimal
+
 from django.http import JsonResponse
-from django.db import connection
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Count, DecimalField, Sum, Value
+from django.db.models.functions import Coalesce, ExtractMonth, Trim, Upper
+from django.utils import timezone
+
+from api.models import TblClientes, TblFacturas, TblOrdenesTrabajo, TblStockJoyas
+
+from api.configuracion import convencion_fechas_facturas, periodo_facturas
+from api.periodos import periodo_anio, periodo_dia
+from api.resumen_ventas import resumen_ventas
+
+from .cache import kpi_en_cache
 
 
 def _json_ok(data, safe=True):
@@ -15,142 +28,122 @@ def _json_ok(data, safe=True):
 # =========================================================
 def dashboard_kpis(request):
     """
-    - Ventas Hoy: suma de Tbl_Facturas.total para el día local (Honduras).
-      Tolera si 'fecha' está guardada en hora local o en UTC.
+    - Ventas Hoy: suma de Tbl_Facturas.total para el día local (Honduras),
+      según la convención de fechas registrada (ver normalizar_fechas_facturas).
     - Órdenes Pendientes: estado LIKE 'PENDIENTE%'.
     - Productos en stock: COUNT(*) Tbl_Stock_Joyas.
     - Clientes activos: COUNT(*) Tbl_Clientes o DISTINCT en Facturas si no existe.
+    Se sirve desde caché (ver dashboard/cache.py); ?debug=1 siempre recalcula.
     """
-    debug = request.GET.get("debug")
-
-    with connection.cursor() as cur:
-        # Día local de Honduras (00:00 a 24:00)
-        cur.execute("""
-            DECLARE @tz NVARCHAR(50) = 'Central America Standard Time';
-            SELECT CAST(SYSDATETIMEOFFSET() AT TIME ZONE @tz AS DATE);
-        """)
-        hoy_local = str(cur.fetchone()[0])
-
-        # 1) Si 'fecha' ya está guardada en HORA LOCAL: compara por DATE
-        cur.execute(f"""
-            DECLARE @hoy DATE = '{hoy_local}';
-            SELECT ISNULL(SUM(CAST(total AS DECIMAL(18,2))), 0)
-            FROM dbo.Tbl_Facturas
-            WHERE CAST(fecha AS DATE) = @hoy;
-        """)
-        total_local = float(cur.fetchone()[0] or 0)
-
-        # 2) Si 'fecha' está en UTC: conviértela a Honduras y compara por DATE
-        cur.execute(f"""
-            DECLARE @tz NVARCHAR(50) = 'Central America Standard Time';
-            DECLARE @hoy DATE = '{hoy_local}';
-            SELECT ISNULL(SUM(CAST(total AS DECIMAL(18,2))), 0)
-            FROM dbo.Tbl_Facturas
-            WHERE CAST(((fecha AT TIME ZONE 'UTC') AT TIME ZONE @tz) AS DATE) = @hoy;
-        """)
-        total_as_utc = float(cur.fetchone()[0] or 0)
-
-        ventas_hoy = total_local if total_local > 0 else total_as_utc
-
-        # Órdenes PENDIENTES
-        cur.execute("""
-            SELECT COUNT(*)
-            FROM dbo.Tbl_Ordenes_Trabajo
-            WHERE UPPER(LTRIM(RTRIM(estado))) LIKE 'PENDIENTE%';
-        """)
-        ordenes_pendientes = int(cur.fetchone()[0] or 0)
-
-        # Productos en stock (joyas registradas)
-        cur.execute("SELECT COUNT(*) FROM dbo.Tbl_Stock_Joyas;")
-        productos_en_stock = int(cur.fetchone()[0] or 0)
-
-        # Clientes activos (fallback si no existe Tbl_Clientes)
-        try:
-            cur.execute("SELECT COUNT(*) FROM dbo.Tbl_Clientes;")
-            clientes_activos = int(cur.fetchone()[0] or 0)
-        except Exception:
-            cur.execute("SELECT COUNT(DISTINCT id_cliente) FROM dbo.Tbl_Facturas;")
-            clientes_activos = int(cur.fetchone()[0] or 0)
-
-        extra = {}
-        if debug:
-            cur.execute("SELECT SYSDATETIMEOFFSET();")
-            server_now = str(cur.fetchone()[0])
-            extra = {
-                "diag": {
-                    "server_now": server_now,
-                    "hoy_local": hoy_local,
-                    "total_local": total_local,
-                    "total_as_utc": total_as_utc,
-                    "modo": "local" if total_local > 0 else "utc",
-                }
+    if request.GET.get("debug"):
+        return _json_ok(_calcular_kpis(debug=True))
+    return _json_ok(kpi_en_cache("kpis", _calcular_kpis))
+
+
+def _calcular_kpis(debug=False):
+    # Día local de Honduras [00:00, 24:00) en la convención de Tbl_Facturas.fecha
+    hoy_local = periodo_dia()
+    dia = periodo_facturas(hoy_local)
+
+    # ORM en lugar de SQL propio de SQL Server (ISNULL, dbo.): también corre en la base local
+    ventas_hoy = TblFacturas.objects.filter(**dia.filtro("fecha")).aggregate(
+        suma=Coalesce(Sum("total"), Value(Decimal("0")), output_field=DecimalField(max_digits=18, decimal_places=2))
+    )["suma"]
+
+    # Órdenes PENDIENTES
+    ordenes_pendientes = (
+        _ordenes_con_estado_normalizado()
+        .filter(estado_normalizado__startswith="PENDIENTE")
+        .count()
+    )
+
+    # Productos en stock (joyas registradas)
+    productos_en_stock = TblStockJoyas.objects.count()
+
+    # Clientes activos (fallback si no existe Tbl_Clientes)
+    try:
+        with transaction.atomic():
+            clientes_activos = TblClientes.objects.count()
+    except DatabaseError:
+        clientes_activos = TblFacturas.objects.values("id_cliente").distinct().count()
+
+    extra = {}
+    if debug:
+        extra = {
+            "diag": {
+                "server_now": _hora_servidor(),
+                "hoy_local": str(hoy_local.inicio.date()),
+                "rango": [str(dia.inicio), str(dia.fin)],
+                "modo": convencion_fechas_facturas(),
             }
+        }
 
-    return _json_ok({
-        "ventas_hoy": round(ventas_hoy, 2),
+    return {
+        "ventas_hoy": round(float(ventas_hoy or 0), 2),
         "ordenes_pendientes": ordenes_pendientes,
         "productos_en_stock": productos_en_stock,
         "clientes_activos": clientes_activos,
         **extra,
-    })
+    }
+
+
+def _ordenes_con_estado_normalizado():
+    """Órdenes con UPPER(TRIM(estado)) como estado_normalizado"""
+    return TblOrdenesTrabajo.objects.annotate(estado_normalizado=Upper(Trim("estado")))
+
+
+def _hora_servidor():
+    """Hora del servidor de base de datos (diagnóstico de ?debug=1)"""
+    if connection.vendor == "microsoft":
+        with connection.cursor() as cur:
+            cur.execute("SELECT SYSDATETIMEOFFSET();")
+            return str(cur.fetchone()[0])
+    return str(timezone.now())
 
 
 # =========================================================
 #  Serie "Ventas Mensuales" (Ene..Dic)
-#  Usa el juego (local/UTC) que tenga datos (o mayor suma).
+#  Lee el resumen diario de ventas (fecha tal como se guarda).
 # =========================================================
 def ventas_mensuales(request):
-    def _rows_to_map(rows):
-        return {int(m): float(t or 0.0) for m, t in rows}
-
-    with connection.cursor() as cur:
-        # Agrupación asumiendo HORA LOCAL
-        cur.execute("""
-            DECLARE @tz NVARCHAR(50) = 'Central America Standard Time';
-            DECLARE @anio INT = YEAR(CAST(SYSDATETIMEOFFSET() AT TIME ZONE @tz AS DATE));
-            SELECT MONTH(fecha) AS mes, SUM(CAST(total AS DECIMAL(18,2))) AS total
-            FROM dbo.Tbl_Facturas
-            WHERE YEAR(fecha) = @anio
-            GROUP BY MONTH(fecha)
-            ORDER BY mes;
-        """)
-        rows_local = cur.fetchall()
-
-        # Agrupación asumiendo UTC → Honduras
-        cur.execute("""
-            DECLARE @tz NVARCHAR(50) = 'Central America Standard Time';
-            DECLARE @anio INT = YEAR(CAST(SYSDATETIMEOFFSET() AT TIME ZONE @tz AS DATE));
-            SELECT MONTH(CAST(((fecha AT TIME ZONE 'UTC') AT TIME ZONE @tz) AS DATE)) AS mes,
-                   SUM(CAST(total AS DECIMAL(18,2))) AS total
-            FROM dbo.Tbl_Facturas
-            WHERE YEAR(CAST(((fecha AT TIME ZONE 'UTC') AT TIME ZONE @tz) AS DATE)) = @anio
-            GROUP BY MONTH(CAST(((fecha AT TIME ZONE 'UTC') AT TIME ZONE @tz) AS DATE))
-            ORDER BY mes;
-        """)
-        rows_utc = cur.fetchall()
-
-    sum_local = sum(float(t or 0) for _, t in rows_local) if rows_local else 0.0
-    sum_utc = sum(float(t or 0) for _, t in rows_utc) if rows_utc else 0.0
-    rows = rows_local if sum_local >= sum_utc else rows_utc
-
-    mapa = _rows_to_map(rows)
+    """
+    Total por mes del año en curso (Honduras), leído del resumen diario de
+    ventas (Tbl_Resumen_Ventas_Diarias) en lugar de recorrer Tbl_Facturas.
+    """
+    return _json_ok(kpi_en_cache("ventas_mensuales", _calcular_ventas_mensuales))
+
+
+def _calcular_ventas_mensuales():
+    rows = (
+        resumen_ventas(**periodo_anio().filtro_fecha("fecha"))
+        .annotate(mes=ExtractMonth("fecha"))
+        .values("mes")
+        .annotate(suma=Sum("total"))
+        .order_by("mes")
+    )
+
+    mapa = {int(r["mes"]): float(r["suma"] or 0.0) for r in rows}
     etiquetas = ["Ene","Feb","Mar","Abr","May","Jun","Jul","Ago","Sep","Oct","Nov","Dic"]
     serie = [{"label": etiquetas[i-1], "total": round(mapa.get(i, 0.0), 2)} for i in range(1, 13)]
 
-    return _json_ok({"ventas_mensuales": serie})
+    return {"ventas_mensuales": serie}
 
 
 # =========================================================
 #  Donut "Órdenes por Estado"
 # =========================================================
 def ordenes_por_estado(request):
-    with connection.cursor() as cur:
-        cur.execute("""
-            SELECT UPPER(LTRIM(RTRIM(estado))) AS estado, COUNT(*) AS cantidad
-            FROM dbo.Tbl_Ordenes_Trabajo
-            GROUP BY UPPER(LTRIM(RTRIM(estado)));
-        """)
-        rows = cur.fetchall()
+    return _json_ok(kpi_en_cache("ordenes_por_estado", _calcular_ordenes_por_estado))
+
+
+def _calcular_ordenes_por_estado():
+    rows = (
+        _ordenes_con_estado_normalizado()
+        .order_by()
+        .values("estado_normalizado")
+        .annotate(cantidad=Count("pk"))
+        .values_list("estado_normalizado", "cantidad")
+    )
 
     buckets = {"COMPLETADA": 0, "EN PROCESO": 0, "PENDIENTE": 0}
     for estado, cantidad in rows:
@@ -165,4 +158,4 @@ def ordenes_por_estado(request):
         else:
             buckets["EN PROCESO"] += n  # bucket por defecto
 
-    return _json_ok({"ordenes_por_estado": buckets})
+    return {"ordenes_por_estado": buckets}